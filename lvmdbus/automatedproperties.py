@@ -9,9 +9,15 @@
 
 import dbus
 from . import cfg
-from .utils import get_properties, add_properties, get_object_property_diff, \
-	log_debug
+from .utils import get_class_properties, add_properties, \
+	get_object_property_diff, get_property_values, log_debug
 from .state import State
+from . import signalbatch
+
+
+# (class, child node names) -> Introspect XML with a placeholder for the path
+_introspect_cache = {}
+_PATH_PLACEHOLDER = '@OBJECT_PATH@'
 
 
 # noinspection PyPep8Naming,PyUnresolvedReferences
@@ -23,6 +29,10 @@ class AutomatedProperties(dbus.service.Object):
 	Other classes inherit from it to get the same behavior
 	"""
 
+	# The object manager can cache our properties as long as every change
+	# to them goes through PropertiesChanged
+	_ap_cache_props = True
+
 	def __init__(self, object_path, search_method=None):
 		dbus.service.Object.__init__(self, cfg.bus, object_path)
 		self._ap_interface = []
@@ -81,9 +91,9 @@ class AutomatedProperties(dbus.service.Object):
 	def GetAll(self, interface_name):
 		if interface_name in self.interface(True):
 			# Using introspection, lets build this dynamically
-			properties = get_properties(self)
+			properties = get_property_values(self, interface_name)
 			if interface_name in properties:
-				return properties[interface_name][1]
+				return properties[interface_name]
 			return {}
 		raise dbus.exceptions.DBusException(
 			self._ap_interface,
@@ -99,22 +109,43 @@ class AutomatedProperties(dbus.service.Object):
 
 	# As dbus-python does not support introspection for properties we will
 	# get the autogenerated xml and then add our wanted properties to it.
+	# The result only depends on the class and the child nodes, so it's
+	# built once for each combination and the object path filled in.
 	@dbus.service.method(dbus_interface=dbus.INTROSPECTABLE_IFACE,
 							out_signature='s')
 	def Introspect(self):
+		children = tuple(
+			cfg.bus.list_exported_child_objects(self._ap_o_path))
+		key = (self.__class__, children)
+
+		template = _introspect_cache.get(key)
+		if template is None:
+			template = self._introspect_template()
+			_introspect_cache[key] = template
+
+		return template.replace(_PATH_PLACEHOLDER, self._ap_o_path, 1)
+
+	def _introspect_template(self):
 		r = dbus.service.Object.Introspect(self, self._ap_o_path, cfg.bus)
 		# Look at the properties in the class
-		props = get_properties(self)
+		props = get_class_properties(self.__class__)
 
 		for int_f, v in props.items():
-			r = add_properties(r, int_f, v[0])
+			r = add_properties(r, int_f, v)
 
-		return r
+		if isinstance(r, bytes):
+			r = r.decode('utf-8')
+
+		return r.replace(
+			'name="%s"' % self._ap_o_path,
+			'name="%s"' % _PATH_PLACEHOLDER, 1)
 
 	@dbus.service.signal(dbus_interface=dbus.PROPERTIES_IFACE,
 							signature='sa{sv}as')
 	def PropertiesChanged(self, interface_name, changed_properties,
 							invalidated_properties):
+		if cfg.om:
+			cfg.om.invalidate(self._ap_o_path)
 		log_debug(('SIGNAL: PropertiesChanged(%s, %s, %s, %s)' %
 					(str(self._ap_o_path), str(interface_name),
 					str(changed_properties), str(invalidated_properties))))
@@ -127,6 +158,10 @@ class AutomatedProperties(dbus.service.Object):
 		:param search_key: The value to use to search for
 		:param object_state: Use this as the new object state
 		"""
+		with cfg.load_lock:
+			return self._refresh(search_key, object_state)
+
+	def _refresh(self, search_key, object_state):
 		num_changed = 0
 
 		# If we can't do a lookup, bail now, this happens if we blindly walk
@@ -154,22 +189,27 @@ class AutomatedProperties(dbus.service.Object):
 		# look-ups will happen correctly
 		old_id = self.state.identifiers()
 		new_id = new_state.identifiers()
-		if old_id[0] != new_id[0] or old_id[1] != new_id[1]:
-			cfg.om.lookup_update(self, new_id[0], new_id[1])
+		moved = self.state.containing_vg_uuid() != \
+			new_state.containing_vg_uuid()
 
 		# Grab the properties values, then replace the state of the object
 		# and retrieve the new values
 		# TODO: We need to add locking to prevent concurrent access to the
 		# properties so that a client is not accessing while we are
 		# replacing.
-		o_prop = get_properties(self)
+		o_prop = get_property_values(self)
 		self.state = new_state
-		n_prop = get_properties(self)
+		n_prop = get_property_values(self)
+
+		# The object manager indexes objects by these too
+		if old_id[0] != new_id[0] or old_id[1] != new_id[1] or moved or \
+				cfg.om.query_keys_changed(self):
+			cfg.om.lookup_update(self, new_id[0], new_id[1])
 
 		changed = get_object_property_diff(o_prop, n_prop)
 
 		if changed:
 			for int_f, v in changed.items():
-				self.PropertiesChanged(int_f, v, [])
+				signalbatch.properties_changed(self, int_f, v)
 			num_changed += 1
 		return num_changed
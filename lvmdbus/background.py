@@ -11,11 +11,14 @@ import threading
 import subprocess
 from . import cfg
 import time
+import functools
+from . import cmdhandler
 from .cmdhandler import options_to_cli_args
 import dbus
 from .job import Job, JobState
 from .utils import pv_range_append, pv_dest_ranges
 from .request import RequestEntry
+from . import stats
 
 _rlock = threading.RLock()
 _thread_list = list()
@@ -48,11 +51,32 @@ def _create_background_dbus_job(job_state):
 	return job_obj.dbus_object_path()
 
 
-def _move_merge(interface_name, cmd, time_out, skip_first_line=False):
-	# Create job object to be used while running the command
+def _abort(interface_name, pv_source):
+	rc, out, err = cmdhandler.pv_move_abort(pv_source)
+	if rc != 0:
+		raise dbus.exceptions.DBusException(
+			interface_name,
+			'Exit code %s, stderr = %s' % (str(rc), err))
+
+
+def _abort_queue(interface_name, pv_source, vg_uuid, cb, cbe):
+	r = RequestEntry(
+		-1, _abort, (interface_name, pv_source), cb, cbe, False,
+		lock_key=vg_uuid)
+	cfg.worker_q.put(r)
+
+
+def _move_merge(interface_name, cmd, vg_uuid, time_out, skip_first_line=False,
+				abort_pv=None):
+	# Create job object to be used while running the command, a move can be
+	# aborted, a merge can't
 	rc = '/'
-	job_state = JobState(None)
-	add(cmd, job_state, skip_first_line)
+	cancel = None
+	if abort_pv:
+		cancel = functools.partial(
+			_abort_queue, interface_name, abort_pv, vg_uuid)
+	job_state = JobState(None, cancel)
+	add(cmd, job_state, vg_uuid, skip_first_line)
 
 	if time_out == -1:
 		# Waiting forever
@@ -111,7 +135,9 @@ def move(interface_name, lv_name, pv_src_obj, pv_source_range,
 								pv_source_range,
 								pv_dests)
 
-		return _move_merge(interface_name, cmd, time_out)
+		return _move_merge(interface_name, cmd,
+							pv_src.state.containing_vg_uuid(), time_out,
+							abort_pv=pv_src.lvm_id)
 	else:
 		raise dbus.exceptions.DBusException(
 			interface_name, 'pv_src_obj (%s) not found' % pv_src_obj)
@@ -122,7 +148,8 @@ def merge(interface_name, lv_uuid, lv_name, merge_options, time_out):
 	dbo = cfg.om.get_object_by_uuid_lvm_id(lv_uuid, lv_name)
 	if dbo:
 		cmd = lv_merge_cmd(merge_options, dbo.lvm_id)
-		return _move_merge(interface_name, cmd, time_out, True)
+		return _move_merge(interface_name, cmd,
+							dbo.state.containing_vg_uuid(), time_out, True)
 	else:
 		raise dbus.exceptions.DBusException(
 			interface_name,
@@ -142,8 +169,9 @@ def background_reaper():
 		time.sleep(3)
 
 
-def process_background_result(job_object, exit_code, error_msg):
-	cfg.load()
+def process_background_result(job_object, exit_code, error_msg, vg_uuid):
+	# A move or merge doesn't reach outside of the VG
+	cfg.load(vg_uuids=[vg_uuid])
 	job_object.set_result(exit_code, error_msg)
 	return None
 
@@ -153,11 +181,16 @@ def empty_cb(disregard):
 	pass
 
 
-def background_execute(command, background_job, skip_first_line=False):
+def background_execute(command, background_job, vg_uuid,
+						skip_first_line=False):
+	start = time.time()
+	stdout_bytes = 0
 	process = subprocess.Popen(command, stdout=subprocess.PIPE,
 								stderr=subprocess.PIPE, close_fds=True)
 	lines_iterator = iter(process.stdout.readline, b"")
 	for line in lines_iterator:
+		stdout_bytes += len(line)
+
 		# Merge ouputs a line before updates, move does not
 		if skip_first_line:
 			skip_first_line = False
@@ -168,6 +201,8 @@ def background_execute(command, background_job, skip_first_line=False):
 			background_job.Percent = round(float(percentage.strip()[:-1]), 1)
 
 	out = process.communicate()
+	stats.command_done(command[0], time.time() - start, 0.0,
+						stdout_bytes + len(out[0]), process.returncode)
 
 	# print "DEBUG: EC %d, STDOUT %s, STDERR %s" % \
 	#      (process.returncode, out[0], out[1])
@@ -178,17 +213,17 @@ def background_execute(command, background_job, skip_first_line=False):
 	# Queue up the result so that it gets executed in same thread as others.
 	r = RequestEntry(
 		-1, process_background_result,
-		(background_job, process.returncode, out[1]),
-		empty_cb, empty_cb, False)
+		(background_job, process.returncode, out[1], vg_uuid),
+		empty_cb, empty_cb, False, lock_key=vg_uuid)
 	cfg.worker_q.put(r)
 
 
-def add(command, reporting_job, skip_first_line=False):
+def add(command, reporting_job, vg_uuid, skip_first_line=False):
 	# Create the thread, get it running and then add it to the list
 	t = threading.Thread(
 		target=background_execute,
 		name="thread: " + ' '.join(command),
-		args=(command, reporting_job, skip_first_line))
+		args=(command, reporting_job, vg_uuid, skip_first_line))
 	t.start()
 
 	with _rlock:
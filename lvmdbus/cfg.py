@@ -9,7 +9,7 @@
 
 import os
 import multiprocessing
-import queue
+import threading
 import itertools
 try:
 	from . import path
@@ -33,11 +33,41 @@ DEBUG = True
 # Use lvm shell
 USE_SHELL = False
 
+# Number of lvm shells to run report commands on concurrently
+SHELL_POOL_SIZE = 4
+
+# Seconds to wait for a command on the lvm shell before giving up on it
+SHELL_CMD_TIMEOUT = 300
+
 # Lock used by pprint
 stdout_lock = multiprocessing.Lock()
 
 kick_q = multiprocessing.Queue()
-worker_q = queue.Queue()
+
+# Request executor (executor.RequestExecutor), created at startup
+worker_q = None
+
+# Number of threads executing requests
+WORKER_THREADS = 4
+
+# External events are collapsed into one refresh once no new ones have
+# arrived for the quiet period, or the max latency after the first one
+EVENT_QUIET_PERIOD = 0.5
+EVENT_MAX_LATENCY = 5.0
+
+# Most signals a load pass will queue up before sending them
+SIGNAL_BATCH_MAX = 1000
+
+# Number of completed requests whose traces are kept (see requesttrace.py)
+TRACE_BUFFER_SIZE = 1000
+
+# Where the lvm state and object paths are saved so the next start up can
+# serve from them straight away, empty to not use one (see snapshot.py)
+SNAPSHOT_FILE = '/var/cache/lvmdbus/snapshot.json'
+
+# Serializes updating the cached lvm state and the dbus objects built from
+# it, as requests on different VGs update them concurrently
+load_lock = threading.RLock()
 
 # Main event loop
 loop = None
@@ -11,27 +11,67 @@ from subprocess import Popen, PIPE
 import time
 import threading
 from itertools import chain
+import json
+import io
+import re
 
 try:
 	from . import cfg
 	from .utils import pv_dest_ranges, log_debug, log_error
-	from .lvm_shell_proxy import LVMShellProxy
+	from .lvm_shell_proxy import LVMShellPool
+	from . import stats
+	from . import requesttrace
 except SystemError:
 	import cfg
 	from utils import pv_dest_ranges, log_debug, log_error
-	from lvm_shell_proxy import LVMShellProxy
+	from lvm_shell_proxy import LVMShellPool
+	import stats
+	import requesttrace
 
 SEP = '{|}'
 
+# First lvm release with a usable '--reportformat json'
+JSON_MIN_VERSION = (2, 2, 158)
+
+# None until we have asked lvm which version it is
+_json_supported = None
+
+# Report columns, the segment ones are separate reports with fullreport
+PV_COLUMNS = ['pv_name', 'pv_uuid', 'pv_fmt', 'pv_size', 'pv_free',
+				'pv_used', 'dev_size', 'pv_mda_size', 'pv_mda_free',
+				'pv_ba_start', 'pv_ba_size', 'pe_start', 'pv_pe_count',
+				'pv_pe_alloc_count', 'pv_attr', 'pv_tags', 'vg_name',
+				'vg_uuid']
+
+PV_SEG_COLUMNS = ['pv_seg_start', 'pvseg_size', 'segtype']
+
+VG_COLUMNS = ['vg_name', 'vg_uuid', 'vg_fmt', 'vg_size', 'vg_free',
+				'vg_sysid', 'vg_extent_size', 'vg_extent_count',
+				'vg_free_count', 'vg_profile', 'max_lv', 'max_pv',
+				'pv_count', 'lv_count', 'snap_count', 'vg_seqno',
+				'vg_mda_count', 'vg_mda_free', 'vg_mda_size',
+				'vg_mda_used_count', 'vg_attr', 'vg_tags']
+
+LV_COLUMNS = ['lv_uuid', 'lv_name', 'lv_path', 'lv_size',
+				'vg_name', 'pool_lv_uuid', 'pool_lv', 'origin_uuid',
+				'origin', 'data_percent',
+				'lv_attr', 'lv_tags', 'vg_uuid', 'lv_active', 'data_lv',
+				'metadata_lv', 'lv_parent', 'lv_role', 'lv_layout']
+
+LV_SEG_COLUMNS = ['seg_pe_ranges', 'segtype']
+
 total_time = 0.0
 total_count = 0
+stats_lock = threading.Lock()
 
-# We need to prevent different threads from using the same lvm shell
-# at the same time.
+# Protects switching between forking and the lvm shell.  Commands run
+# concurrently, ordering of the ones which modify the same VG is taken care
+# of by the request executor.
 cmd_lock = threading.Lock()
 
 # The actual method which gets called to invoke the lvm command, can vary
-# from forking a new process to using lvm shell
+# from forking a new process to using lvm shell.  Only ever replaced with a
+# single assignment as commands are running while it's switched.
 _t_call = None
 
 
@@ -73,41 +113,59 @@ def call_lvm(command, debug=False):
 	return process.returncode, stdout_text, stderr_text
 
 
-def _shell_cfg():
-	global _t_call
-	log_debug('Using lvm shell!')
-	lvm_shell = LVMShellProxy()
-	_t_call = lvm_shell.call_lvm
+def _shell_pool(t_call):
+	"""
+	:return: The LVMShellPool t_call belongs to, None when forking
+	"""
+	pool = getattr(t_call, '__self__', None)
+	if isinstance(pool, LVMShellPool):
+		return pool
+	return None
+
 
+def _execution(shell):
+	if shell:
+		log_debug('Using lvm shell! (pool of %d)' % cfg.SHELL_POOL_SIZE)
+		return LVMShellPool(cfg.SHELL_POOL_SIZE).call_lvm
+	return call_lvm
 
-if cfg.USE_SHELL:
-	_shell_cfg()
-else:
-	_t_call = call_lvm
+
+_t_call = _execution(cfg.USE_SHELL)
 
 
 def set_execution(shell):
 	global _t_call
 	with cmd_lock:
-		_t_call = None
-		if shell:
-			log_debug('Using lvm shell!')
-			lvm_shell = LVMShellProxy()
-			_t_call = lvm_shell.call_lvm
-		else:
-			_t_call = call_lvm
+		old_pool = _shell_pool(_t_call)
+		_t_call = _execution(shell)
+
+		# Commands still running on the old shells finish first
+		if old_pool:
+			old_pool.close()
 
 
 def time_wrapper(command, debug=False):
 	global total_time
 	global total_count
 
-	with cmd_lock:
-		start = time.time()
-		results = _t_call(command, debug)
-		total_time += (time.time() - start)
+	# call_lvm puts the lvm binary in front of the command
+	name = command[0]
+	t_call = _t_call
+	pool = _shell_pool(t_call)
+
+	start = time.time()
+	results = t_call(command, debug)
+	end = time.time()
+	elapsed = end - start
+
+	with stats_lock:
+		total_time += elapsed
 		total_count += 1
 
+	stats.command_done(name, elapsed, pool.wait_time() if pool else 0.0,
+						len(results[1]), results[0])
+	requesttrace.lvm_done(start, end)
+
 	return results
 
 
@@ -155,6 +213,130 @@ def parse_column_names(out, column_names):
 	return rc
 
 
+# Decodes a report row to a list of (column, value) in output order
+_json_row_decoder = json.JSONDecoder(object_pairs_hook=list)
+
+# What can come between two rows on the same line
+_json_row_gap = re.compile(r'[\s,]*')
+
+
+# JSON report defaults, the separator and heading options don't apply
+def _dj(cmd, args):
+	c = [cmd, '--nosuffix', '--units', 'b', '--reportformat', 'json']
+	c.extend(args)
+	return c
+
+
+def _json_report_lines(out):
+	report = None
+
+	for line in io.StringIO(out):
+		line = line.strip()
+
+		if line.startswith('{"'):
+			if report is None:
+				raise ValueError('row outside of a report')
+
+			# raw_decode stops at the end of the object, anything after it
+			# is either the comma before the next row or the next row
+			pos = 0
+			while pos < len(line):
+				pairs, pos = _json_row_decoder.raw_decode(line, pos)
+				yield report, [v for k, v in pairs]
+				pos = _json_row_gap.match(line, pos).end()
+		elif line.endswith('[') and line.startswith('"'):
+			report = line[1:line.index('"', 1)]
+		elif line.strip('{}[], '):
+			# Part of a row spread over lines
+			raise ValueError('unexpected line %s' % line)
+
+
+def _json_report_document(out):
+	# Everything decodes to lists of (key, value) pairs with the list hook
+	for k, reports in json.loads(out, object_pairs_hook=list):
+		if k != 'report':
+			continue
+		for section in reports:
+			for report, rows in section:
+				for pairs in rows:
+					yield report, [v for k, v in pairs]
+
+
+def parse_json_report(out):
+	"""
+	Walk the output of a '--reportformat json' command one line at a time
+	instead of handing the whole document to json.loads.  Lvm writes each
+	report row on a line of its own, so we only ever decode one small
+	object at a time.  Should some lvm lay the rows out differently we fall
+	back to decoding the whole document.
+	:param out:     Command output
+	:return: List of (report name, list of column values), the values
+				are in the order the columns were requested
+	"""
+	try:
+		return list(_json_report_lines(out))
+	except ValueError:
+		log_debug('json report rows not one per line, decoding it whole')
+		return list(_json_report_document(out))
+
+
+def parse_json_column_names(out, column_names, report=None):
+	"""
+	Same as parse_column_names, but for json report output.  The column
+	names lvm uses in the output are the canonical ones which may differ
+	from what we asked for, so we key the rows by position instead.
+	:param out:             Command output
+	:param column_names:    Columns in the order requested with -o
+	:param report:          Only return rows for this report, eg. 'lv'
+	:return: List of dicts keyed by column name
+	"""
+	rc = []
+
+	for name, values in parse_json_report(out):
+		if report is None or name == report:
+			rc.append(dict(zip(column_names, values)))
+
+	return rc
+
+
+def supports_json():
+	"""
+	Check once if the installed lvm can produce json reports.
+	:return: True if it can
+	"""
+	global _json_supported
+
+	if _json_supported is None:
+		_json_supported = False
+
+		rc, out, err = call(['version'])
+		if rc == 0:
+			m = re.search(r'LVM version:\s+(\d+)\.(\d+)\.(\d+)', out)
+			if m:
+				version = tuple(int(x) for x in m.groups())
+				_json_supported = version >= JSON_MIN_VERSION
+
+		log_debug('lvm json report support = %s' % str(_json_supported))
+
+	return _json_supported
+
+
+def _report(cmd, columns, args):
+	"""
+	Run a report command.  The separator output is used even when lvm can
+	do json, it is less than half the size and parses faster (see
+	test/report_parse_bench.py).
+	:param cmd:     One of pvs, vgs or lvs
+	:param columns: List of columns to retrieve
+	:param args:    Additional arguments, options before positional
+	:return: (exit code, list of dicts keyed by column name)
+	"""
+	rc, out, err = call(_dc(cmd, ['-o', ','.join(columns)] + args))
+	if rc == 0:
+		return rc, parse_column_names(out, columns)
+	return rc, []
+
+
 def options_to_cli_args(options):
 	rc = []
 	for k, v in list(dict(options).items()):
@@ -386,28 +568,34 @@ def lv_detach_cache(lv_full_name, detach_options, destroy_cache):
 	return call(cmd)
 
 
-def pv_retrieve_with_segs(device=None):
+def _vg_uuid_selection(vg_uuids):
+	# Select the PVs belonging to the VGs in question, orphan PVs are
+	# always included as they are what VGs give and take PVs from
+	sel = ['vg_uuid=%s' % u for u in sorted(vg_uuids) if u]
+	sel.append('vg_uuid=""')
+	return ['-S', ' || '.join(sel)]
+
+
+def pv_retrieve_with_segs(device=None, vg_uuids=None):
 	d = []
 
-	columns = ['pv_name', 'pv_uuid', 'pv_fmt', 'pv_size', 'pv_free',
-				'pv_used', 'dev_size', 'pv_mda_size', 'pv_mda_free',
-				'pv_ba_start', 'pv_ba_size', 'pe_start', 'pv_pe_count',
-				'pv_pe_alloc_count', 'pv_attr', 'pv_tags', 'vg_name',
-				'vg_uuid', 'pv_seg_start', 'pvseg_size', 'segtype']
+	columns = PV_COLUMNS + PV_SEG_COLUMNS
 
 	# Lvm has some issues where it returns failure when querying pvs when other
 	# operations are in process, see:
 	# https://bugzilla.redhat.com/show_bug.cgi?id=1274085
 	while True:
-		cmd = _dc('pvs', ['-o', ','.join(columns)])
+		args = []
+
+		if vg_uuids is not None:
+			args.extend(_vg_uuid_selection(vg_uuids))
 
 		if device:
-			cmd.extend(device)
+			args.extend(device)
 
-		rc, out, err = call(cmd)
+		rc, d = _report('pvs', columns, args)
 
 		if rc == 0:
-			d = parse_column_names(out, columns)
 			break
 		else:
 			time.sleep(0.2)
@@ -428,6 +616,14 @@ def pv_resize(device, size_bytes, create_options):
 	return call(cmd)
 
 
+def pv_move_abort(pv_source):
+	"""
+	Abort the moves off a PV, what has already moved stays moved unless
+	they were started with --atomic
+	"""
+	return call(['pvmove', '--abort', pv_source])
+
+
 def pv_create(create_options, devices):
 	cmd = ['pvcreate', '-ff']
 	cmd.extend(options_to_cli_args(create_options))
@@ -573,43 +769,125 @@ def vg_retrieve(vg_specific):
 	if vg_specific:
 		assert isinstance(vg_specific, list)
 
-	columns = ['vg_name', 'vg_uuid', 'vg_fmt', 'vg_size', 'vg_free',
-				'vg_sysid', 'vg_extent_size', 'vg_extent_count',
-				'vg_free_count', 'vg_profile', 'max_lv', 'max_pv',
-				'pv_count', 'lv_count', 'snap_count', 'vg_seqno',
-				'vg_mda_count', 'vg_mda_free', 'vg_mda_size',
-				'vg_mda_used_count', 'vg_attr', 'vg_tags']
+	args = []
+	if vg_specific:
+		args.extend(vg_specific)
 
-	cmd = _dc('vgs', ['-o', ','.join(columns)])
+	rc, d = _report('vgs', VG_COLUMNS, args)
+	return d
 
-	if vg_specific:
-		cmd.extend(vg_specific)
 
-	d = []
-	rc, out, err = call(cmd)
+def vg_seqno_retrieve():
+	"""
+	Cheap probe of the VGs and their metadata sequence numbers, used to
+	figure out which VGs have changed since we last looked.
+	:return: List of dicts or None if the command failed
+	"""
+	columns = ['vg_uuid', 'vg_name', 'vg_seqno']
+
+	rc, d = _report('vgs', columns, [])
 	if rc == 0:
-		d = parse_column_names(out, columns)
+		return d
+	return None
+
+
+def lv_retrieve_with_segments(vg_specific=None):
+	if vg_specific:
+		assert isinstance(vg_specific, list)
+
+	args = ['-a']
+	if vg_specific:
+		args.extend(vg_specific)
 
+	rc, d = _report('lvs', LV_COLUMNS + LV_SEG_COLUMNS, args)
 	return d
 
 
-def lv_retrieve_with_segments():
-	columns = ['lv_uuid', 'lv_name', 'lv_path', 'lv_size',
-				'vg_name', 'pool_lv_uuid', 'pool_lv', 'origin_uuid',
-				'origin', 'data_percent',
-				'lv_attr', 'lv_tags', 'vg_uuid', 'lv_active', 'data_lv',
-				'metadata_lv', 'seg_pe_ranges', 'segtype', 'lv_parent',
-				'lv_role', 'lv_layout']
+def _join_segments(records, segments, key, empty):
+	"""
+	Expand each record into one record per segment, which is the form the
+	separate pvs/lvs commands return them in.
+	:param records:     List of dicts
+	:param segments:    Dict of key -> list of segment dicts
+	:param key:         Column which ties a segment to its record
+	:param empty:       Segment to use for a record which has none
+	:return: List of dicts
+	"""
+	rc = []
+	for r in records:
+		for seg in segments.get(r[key], [empty]):
+			row = dict(r)
+			row.update(seg)
+			rc.append(row)
+	return rc
 
-	cmd = _dc('lvs', ['-a', '-o', ','.join(columns)])
-	rc, out, err = call(cmd)
 
-	d = []
+def lvm_full_report(vg_specific=None):
+	"""
+	Retrieve the PVs, VGs, LVs and their segments with one lvm fullreport
+	invocation, so the devices only get scanned once.
+	:param vg_specific: List of VG names to limit the report to, note that
+						orphan PVs are only included when this is None
+	:return: (pvs, vgs, lvs) lists of dicts in the same form that
+				pv_retrieve_with_segs, vg_retrieve and
+				lv_retrieve_with_segments return, None if lvm can't
+				produce this report or the command failed.
+	"""
+	if vg_specific:
+		assert isinstance(vg_specific, list)
 
-	if rc == 0:
-		d = parse_column_names(out, columns)
+	# Both fullreport and json output arrived in the same lvm release.  The
+	# json output is bigger than the separator one, but it is the only way
+	# to tell which report a fullreport row belongs to, and one command
+	# instead of three saves scanning the devices twice.
+	if not supports_json():
+		return None
 
-	return d
+	pv_seg_columns = PV_SEG_COLUMNS + ['pv_uuid']
+	lv_seg_columns = LV_SEG_COLUMNS + ['lv_uuid']
+
+	args = ['-a',
+			'--configreport', 'pv', '-o', ','.join(PV_COLUMNS),
+			'--configreport', 'pvseg', '-o', ','.join(pv_seg_columns),
+			'--configreport', 'vg', '-o', ','.join(VG_COLUMNS),
+			'--configreport', 'lv', '-o', ','.join(LV_COLUMNS),
+			'--configreport', 'seg', '-o', ','.join(lv_seg_columns)]
+
+	if vg_specific:
+		args.extend(vg_specific)
+
+	rc, out, err = call(_dj('fullreport', args))
+	if rc != 0:
+		return None
+
+	pvs = []
+	pv_segs = {}
+	vgs = []
+	lvs = []
+	lv_segs = {}
+
+	for report, values in parse_json_report(out):
+		if report == 'pv':
+			pvs.append(dict(zip(PV_COLUMNS, values)))
+		elif report == 'pvseg':
+			seg = dict(zip(pv_seg_columns, values))
+			pv_segs.setdefault(seg.pop('pv_uuid'), []).append(seg)
+		elif report == 'vg':
+			vgs.append(dict(zip(VG_COLUMNS, values)))
+		elif report == 'lv':
+			lvs.append(dict(zip(LV_COLUMNS, values)))
+		elif report == 'seg':
+			seg = dict(zip(lv_seg_columns, values))
+			lv_segs.setdefault(seg.pop('lv_uuid'), []).append(seg)
+
+	return (
+		_join_segments(
+			pvs, pv_segs, 'pv_uuid',
+			dict(pv_seg_start='0', pvseg_size='0', segtype='free')),
+		vgs,
+		_join_segments(
+			lvs, lv_segs, 'lv_uuid',
+			dict(seg_pe_ranges='', segtype='')))
 
 
 if __name__ == '__main__':
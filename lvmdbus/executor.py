@@ -0,0 +1,242 @@
+# Copyright (C) 2015-2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Runs the queued requests on a number of worker threads.  Each request
+# carries a lock key (the uuid of the VG it operates on), requests with
+# the same key run one at a time in the order they were queued, requests
+# with different keys run in parallel.  A request can have a tuple of
+# keys, eg. moving PVs between a VG and the orphans ('') takes both, it is
+# then ordered against the requests of each of them.  A request with a key
+# of None is global, it waits for everything queued before it to finish and
+# nothing queued after it starts until it is done.
+#
+# Requests which haven't started running can be cancelled through their job,
+# and are dropped when the client which made them disconnects from the bus
+# without having been given a job for them.
+
+import threading
+import time
+import sys
+import traceback
+from collections import deque
+from . import cfg
+from . import requesttrace
+from .utils import log_debug
+
+
+def _keys(request):
+	"""
+	:return: Tuple of the request's lock keys, None if it is global
+	"""
+	if request.lock_key is None or isinstance(request.lock_key, tuple):
+		return request.lock_key
+	return (request.lock_key,)
+
+
+class RequestExecutor(object):
+
+	def __init__(self, num_workers):
+		self.num_workers = max(1, num_workers)
+		self._cond = threading.Condition()
+		self._pending = deque()		# (request, time queued)
+		self._running = set()		# lock keys of the running requests
+		self._num_running = 0
+		self._global_running = False
+
+		# Metrics
+		self._max_depth = 0
+		self._wait_total = 0.0
+		self._wait_max = 0.0
+		self._run_total = 0.0
+		self._started = 0
+		self._completed = 0
+		self._cancelled = 0
+		self._dropped = 0
+
+	def put(self, request):
+		"""
+		Queue a request for execution
+		:param request: RequestEntry
+		"""
+		now = time.time()
+		request.trace.mark('enqueue', now)
+
+		with self._cond:
+			self._pending.append((request, now))
+			self._max_depth = max(self._max_depth, len(self._pending))
+			self._cond.notify()
+
+	def _remove(self, requests):
+		"""
+		Take the requests out of the queue, caller must hold the condition.
+		:return: List of those which were queued
+		"""
+		ids = set(id(r) for r in requests)
+		removed = [e[0] for e in self._pending if id(e[0]) in ids]
+		if removed:
+			self._pending = deque(
+				e for e in self._pending if id(e[0]) not in ids)
+
+			# What was queued behind them may be able to run now
+			self._cond.notify_all()
+		return removed
+
+	def cancel(self, request):
+		"""
+		Drop a request which hasn't started running yet, it completes with
+		an error.
+		:param request: RequestEntry
+		:return: True if it was dropped, False if it isn't in the queue
+		"""
+		with self._cond:
+			if not self._remove([request]):
+				return False
+			self._cancelled += 1
+
+		request.register_error(-1, 'Job was cancelled')
+		return True
+
+	def caller_gone(self, sender):
+		"""
+		Drop the queued requests of a client which has disconnected, except
+		those it was given a job for as anyone can still look at the job.
+		:param sender: Unique bus name of the client
+		:return: Number of requests dropped
+		"""
+		with self._cond:
+			dropped = self._remove(
+				[e[0] for e in self._pending
+					if e[0].sender == sender and not e[0].has_job()])
+			self._dropped += len(dropped)
+
+		for r in dropped:
+			# Also stops the timer which would give it a job
+			r.register_error(-1, 'Caller %s disconnected' % sender)
+
+		if dropped:
+			log_debug("Dropped %d requests of %s which disconnected" %
+						(len(dropped), sender))
+		return len(dropped)
+
+	def _runnable(self):
+		"""
+		Find the oldest request which is allowed to run now and remove it
+		from the queue, caller must hold the condition.
+		:return: (request, time queued) or None
+		"""
+		if self._global_running:
+			return None
+
+		blocked = set()
+
+		for i, entry in enumerate(self._pending):
+			keys = _keys(entry[0])
+
+			if keys is None:
+				# Global requests act as a barrier to everything after them
+				if i == 0 and not self._num_running:
+					del self._pending[i]
+					return entry
+				return None
+
+			if blocked.isdisjoint(keys) and self._running.isdisjoint(keys):
+				del self._pending[i]
+				return entry
+
+			# Later requests for these keys need to stay behind this one
+			blocked.update(keys)
+
+		return None
+
+	def _get(self, timeout):
+		with self._cond:
+			entry = self._runnable()
+			if entry is None:
+				self._cond.wait(timeout)
+				entry = self._runnable()
+
+			if entry is not None:
+				keys = _keys(entry[0])
+				if keys is None:
+					self._global_running = True
+				else:
+					self._running.update(keys)
+				self._num_running += 1
+
+				wait = time.time() - entry[1]
+				self._started += 1
+				self._wait_total += wait
+				self._wait_max = max(self._wait_max, wait)
+
+			return entry
+
+	def _done(self, request, run_time):
+		with self._cond:
+			keys = _keys(request)
+			if keys is None:
+				self._global_running = False
+			else:
+				self._running.difference_update(keys)
+			self._num_running -= 1
+
+			self._run_total += run_time
+			self._completed += 1
+
+			# What can run next may have changed for all the workers
+			self._cond.notify_all()
+
+	def _worker(self):
+		while cfg.run.value != 0:
+			try:
+				entry = self._get(5)
+				if entry is None:
+					continue
+
+				req = entry[0]
+				log_debug(
+					"Running method: %s with args %s" %
+					(str(req.method), str(req.arguments)))
+
+				start = time.time()
+				requesttrace.started(req)
+				try:
+					req.run_cmd()
+				finally:
+					requesttrace.finished(req)
+					self._done(req, time.time() - start)
+
+				log_debug("Complete ")
+			except Exception:
+				traceback.print_exc(file=sys.stdout)
+
+	def threads(self):
+		"""
+		:return: List of the (unstarted) worker threads
+		"""
+		return [threading.Thread(target=self._worker,
+					name='request_worker_%d' % i)
+				for i in range(0, self.num_workers)]
+
+	def statistics(self):
+		"""
+		:return: dict of queue depth and timing information
+		"""
+		with self._cond:
+			return dict(
+				workers=self.num_workers,
+				queue_depth=len(self._pending),
+				max_queue_depth=self._max_depth,
+				running=self._num_running,
+				completed=self._completed,
+				cancelled=self._cancelled,
+				dropped=self._dropped,
+				wait_total=self._wait_total,
+				wait_max=self._wait_max,
+				wait_avg=self._wait_total / max(1, self._started),
+				run_total=self._run_total)
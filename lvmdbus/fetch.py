@@ -11,20 +11,51 @@ from .pv import load_pvs
 from .vg import load_vgs
 from .lv import load_lvs
 from . import cfg
+from . import refresh as refresh_events
+from . import signalbatch
 
 
-def load(refresh=True, emit_signal=True, cache_refresh=True, log=True):
+def load(refresh=True, emit_signal=True, cache_refresh=True, log=True,
+			vg_uuids=None):
+	"""
+	Update the dbus objects with what lvm has, the signals for the
+	changes are coalesced and sent at the end
+	:param vg_uuids: When supplied, only the objects belonging to these VGs
+					(and to any others lvm reports as changed) along with
+					the orphan PVs are updated
+	"""
+	with cfg.load_lock, signalbatch.batched():
+		return _load(refresh, emit_signal, cache_refresh, log, vg_uuids)
+
+
+def _load(refresh, emit_signal, cache_refresh, log, vg_uuids):
 	num_total_changes = 0
 
 	# Go through and load all the PVs, VGs and LVs
 	if cache_refresh:
-		cfg.db.refresh(log)
+		if vg_uuids is None:
+			refresh_events.full_load_started()
+
+		changed = cfg.db.refresh(
+			log, incremental=vg_uuids is not None, vg_uuids=vg_uuids)
+
+		# The data store may have decided it needed to re-read everything
+		if changed is None:
+			vg_uuids = None
+		else:
+			vg_uuids = changed
+
+	if vg_uuids is not None:
+		# Orphan PVs are always considered as PVs come and go from VGs
+		vg_uuids = set(vg_uuids)
+		vg_uuids.add('')
 
 	num_total_changes += load_pvs(refresh=refresh, emit_signal=emit_signal,
-									cache_refresh=False)[1]
+									cache_refresh=False, vg_uuids=vg_uuids)[1]
 	num_total_changes += load_vgs(refresh=refresh, emit_signal=emit_signal,
-									cache_refresh=False)[1]
+									cache_refresh=False, vg_uuids=vg_uuids)[1]
 	num_total_changes += load_lvs(refresh=refresh, emit_signal=emit_signal,
-									cache_refresh=False)[1]
+									cache_refresh=False, vg_uuids=vg_uuids)[1]
+	cfg.db.loaded(vg_uuids)
 
 	return num_total_changes
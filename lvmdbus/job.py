@@ -17,7 +17,13 @@ import threading
 
 # noinspection PyPep8Naming
 class JobState(object):
-	def __init__(self, request):
+	def __init__(self, request, cancel=None):
+		"""
+		:param request: RequestEntry the job is for, None for a background
+						job which reports its result with set_result
+		:param cancel:  For a background job, called with (cb, cbe) to
+						cancel it, None if it can't be
+		"""
 		self.rlock = threading.RLock()
 
 		self._percent = 0
@@ -26,6 +32,8 @@ class JobState(object):
 		self._cond = threading.Condition(self.rlock)
 		self._ec = 0
 		self._stderr = ''
+		self._cancel = cancel
+		self._cancelled = False
 
 		# This is an lvm command that is just taking too long and doesn't
 		# support background operation
@@ -73,10 +81,38 @@ class JobState(object):
 
 	def set_result(self, ec, msg):
 		with self.rlock:
+			if self._cancelled:
+				ec = ec or -1
+				msg = '\n'.join(m for m in ('Job was cancelled', msg) if m)
 			self.Complete = True
 			self._ec = ec
 			self._stderr = msg
 
+	def Cancel(self, cb, cbe):
+		with self.rlock:
+			request = self._request
+			cancel = self._cancel
+
+		if self.Complete:
+			cbe(dbus.exceptions.DBusException(
+				JOB_INTERFACE, 'Job is complete!'))
+		elif request:
+			if cfg.worker_q.cancel(request):
+				cb()
+			else:
+				cbe(dbus.exceptions.DBusException(
+					JOB_INTERFACE, 'Job is running and can\'t be cancelled'))
+		elif cancel:
+			def cancelled(*args):
+				with self.rlock:
+					self._cancelled = True
+				cb()
+
+			cancel(cancelled, cbe)
+		else:
+			cbe(dbus.exceptions.DBusException(
+				JOB_INTERFACE, 'Job can\'t be cancelled'))
+
 	def dtor(self):
 		with self.rlock:
 			self._request = None
@@ -104,6 +140,9 @@ class JobState(object):
 
 # noinspection PyPep8Naming
 class Job(AutomatedProperties):
+	# Our properties change without PropertiesChanged being emitted
+	_ap_cache_props = False
+
 	_Percent_meta = ('y', JOB_INTERFACE)
 	_Complete_meta = ('b', JOB_INTERFACE)
 	_Result_meta = ('o', JOB_INTERFACE)
@@ -156,6 +195,18 @@ class Job(AutomatedProperties):
 	def Wait(self, timeout):
 		return self.state.Wait(timeout)
 
+	@dbus.service.method(dbus_interface=JOB_INTERFACE,
+							async_callbacks=('cb', 'cbe'))
+	def Cancel(self, cb, cbe):
+		"""
+		Cancel the job.  A request which hasn't started running is dropped
+		and a move is aborted (pvmove --abort), they then complete with an
+		error.  Requests which are running and merges can't be cancelled.
+		:param cb: Internal, not accessible by dbus API user
+		:param cbe: Internal, not accessible by dbus API user
+		"""
+		self.state.Cancel(cb, cbe)
+
 	@property
 	def Result(self):
 		return self.state.Result
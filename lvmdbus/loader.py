@@ -23,7 +23,14 @@ def _compare_construction(o_state, new_state):
 
 
 def common(retrieve, o_type, search_keys,
-			object_path, refresh, emit_signal, cache_refresh):
+			object_path, refresh, emit_signal, cache_refresh, vg_uuids=None):
+	with cfg.load_lock:
+		return _common(retrieve, o_type, search_keys, object_path, refresh,
+						emit_signal, cache_refresh, vg_uuids)
+
+
+def _common(retrieve, o_type, search_keys,
+			object_path, refresh, emit_signal, cache_refresh, vg_uuids):
 	num_changes = 0
 	existing_paths = []
 	rc = []
@@ -34,12 +41,23 @@ def common(retrieve, o_type, search_keys,
 	if cache_refresh:
 		cfg.db.refresh()
 
-	objects = retrieve(search_keys, cache_refresh=False)
-
 	# If we are doing a refresh we need to know what we have in memory, what's
 	# in lvm and add those that are new and remove those that are gone!
+	unchanged = set()
 	if refresh:
-		existing_paths = cfg.om.object_paths_by_type(o_type)
+		existing_paths = cfg.om.object_paths_by_type(o_type, vg_uuids)
+
+		# Objects built from exactly what lvm is reporting now are left alone
+		if not search_keys:
+			for k in list(existing_paths.keys()):
+				state = cfg.om.get_object_by_path(k).state
+				if state.digest is not None and \
+						state.digest == cfg.db.digest(state.Uuid):
+					unchanged.add(state.Uuid)
+					del existing_paths[k]
+
+	objects = retrieve(search_keys, cache_refresh=False, vg_uuids=vg_uuids,
+						skip=unchanged)
 
 	for o in objects:
 		# Assume we need to add this one to dbus, unless we are refreshing
@@ -52,7 +70,9 @@ def common(retrieve, o_type, search_keys,
 			dbus_object = cfg.om.get_object_by_uuid_lvm_id(*o.identifiers())
 
 			if dbus_object:
-				del existing_paths[dbus_object.dbus_object_path()]
+				# When scoped to some VGs, an object can be coming from outside
+				# of them
+				existing_paths.pop(dbus_object.dbus_object_path(), None)
 
 				# If the old object state and new object state wouldn't be
 				# created with the same path and same object constructor we
@@ -25,13 +25,17 @@ from .utils import round_size
 
 
 # noinspection PyUnusedLocal
-def lvs_state_retrieve(selection, cache_refresh=True):
+def lvs_state_retrieve(selection, cache_refresh=True, vg_uuids=None,
+						skip=None):
 	rc = []
 
 	if cache_refresh:
 		cfg.db.refresh()
 
-	for l in cfg.db.fetch_lvs(selection):
+	for l in cfg.db.fetch_lvs(selection, vg_uuids):
+		if skip and l['lv_uuid'] in skip:
+			continue
+
 		rc.append(LvState(
 			l['lv_uuid'], l['lv_name'],
 			l['lv_path'], n(l['lv_size']),
@@ -41,21 +45,26 @@ def lvs_state_retrieve(selection, cache_refresh=True):
 			n32(l['data_percent']), l['lv_attr'],
 			l['lv_tags'], l['lv_active'], l['data_lv'],
 			l['metadata_lv'], l['segtype'], l['lv_role'],
-			l['lv_layout']))
+			l['lv_layout'], cfg.db.digest(l['lv_uuid'])))
 	return rc
 
 
 def load_lvs(lv_name=None, object_path=None, refresh=False, emit_signal=False,
-				cache_refresh=True):
+				cache_refresh=True, vg_uuids=None):
 	# noinspection PyUnresolvedReferences
 	return common(
 		lvs_state_retrieve,
 		(LvCommon, Lv, LvThinPool, LvSnapShot),
-		lv_name, object_path, refresh, emit_signal, cache_refresh)
+		lv_name, object_path, refresh, emit_signal, cache_refresh, vg_uuids)
 
 
 # noinspection PyPep8Naming,PyUnresolvedReferences,PyUnusedLocal
 class LvState(State):
+	__slots__ = ('Uuid', 'Name', 'Path', 'SizeBytes', 'vg_name', 'vg_uuid',
+					'PoolLv', 'OriginLv', 'DataPercent', 'Attr', 'Tags',
+					'active', 'data_lv', 'metadata_lv', 'role', 'layout',
+					'_segs', 'Vg', 'Devices', 'HiddenLvs')
+
 	@staticmethod
 	def _pv_devices(uuid):
 		rc = []
@@ -77,6 +86,9 @@ class LvState(State):
 	def identifiers(self):
 		return (self.Uuid, self.lvm_id)
 
+	def containing_vg_uuid(self):
+		return self.vg_uuid
+
 	def _get_hidden_lv(self):
 		rc = dbus.Array([], "o")
 
@@ -93,8 +105,22 @@ class LvState(State):
 	def __init__(self, Uuid, Name, Path, SizeBytes,
 			vg_name, vg_uuid, pool_lv_uuid, PoolLv,
 			origin_uuid, OriginLv, DataPercent, Attr, Tags, active,
-			data_lv, metadata_lv, segtypes, role, layout):
-		utils.init_class_from_arguments(self)
+			data_lv, metadata_lv, segtypes, role, layout, digest=None):
+		self.Uuid = Uuid
+		self.Name = Name
+		self.Path = Path
+		self.SizeBytes = SizeBytes
+		self.vg_name = vg_name
+		self.vg_uuid = vg_uuid
+		self.DataPercent = DataPercent
+		self.Attr = Attr
+		self.Tags = Tags
+		self.active = active
+		self.data_lv = data_lv
+		self.metadata_lv = metadata_lv
+		self.role = role
+		self.layout = layout
+		self.digest = digest
 
 		# The segtypes is possibly an array with potentially dupes or a single
 		# value
@@ -323,7 +349,7 @@ class Lv(LvCommon):
 
 			if rc == 0:
 				cfg.om.remove_object(dbo, True)
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 			else:
 				# Need to work on error handling, need consistent
 				raise dbus.exceptions.DBusException(
@@ -340,12 +366,14 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Remove(self, tmo, remove_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Remove(self, tmo, remove_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Lv._remove,
 			(self.Uuid, self.lvm_id, remove_options),
-			cb, cbe, False)
+			cb, cbe, False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -358,7 +386,7 @@ class Lv(LvCommon):
 			rc, out, err = cmdhandler.lv_rename(lv_name, new_name,
 												rename_options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 			else:
 				# Need to work on error handling, need consistent
 				raise dbus.exceptions.DBusException(
@@ -375,14 +403,16 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='sia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Rename(self, name, tmo, rename_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Rename(self, name, tmo, rename_options, cb, cbe, sender):
 		utils.validate_lv_name(LV_INTERFACE, self.vg_name_lookup(), name)
 
 		r = RequestEntry(
 			tmo, Lv._rename,
 			(self.Uuid, self.lvm_id, name, rename_options),
-			cb, cbe, False)
+			cb, cbe, False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
@@ -419,12 +449,12 @@ class Lv(LvCommon):
 			if rc == 0:
 				return_path = '/'
 				full_name = "%s/%s" % (dbo.vg_name_lookup(), name)
-				lvs = load_lvs([full_name], emit_signal=True)[0]
-				for l in lvs:
-					return_path = l.dbus_object_path()
 
-				# Refresh self and all included PVs
-				cfg.load(cache_refresh=False)
+				# Picks up the snapshot along with self and all included PVs
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
+				l = cfg.om.get_object_by_lvm_id(full_name)
+				if l:
+					return_path = l.dbus_object_path()
 				return return_path
 			else:
 				raise dbus.exceptions.DBusException(
@@ -440,16 +470,18 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='stia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def Snapshot(self, name, optional_size, tmo,
-			snapshot_options, cb, cbe):
+			snapshot_options, cb, cbe, sender):
 
 		utils.validate_lv_name(LV_INTERFACE, self.vg_name_lookup(), name)
 
 		r = RequestEntry(
 			tmo, Lv._snap_shot,
 			(self.Uuid, self.lvm_id, name,
-			optional_size, snapshot_options), cb, cbe)
+			optional_size, snapshot_options), cb, cbe,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -478,7 +510,7 @@ class Lv(LvCommon):
 
 			if rc == 0:
 				# Refresh what's changed
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 				return "/"
 			else:
 				raise dbus.exceptions.DBusException(
@@ -494,9 +526,10 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='ta(ott)ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def Resize(self, new_size_bytes, pv_dests_and_ranges, tmo,
-			resize_options, cb, cbe):
+			resize_options, cb, cbe, sender):
 		"""
 		Resize a LV
 		:param new_size_bytes: The requested final size in bytes
@@ -508,13 +541,15 @@ class Lv(LvCommon):
 		:param resize_options: key/value hash of options
 		:param cb:  Used by framework not client facing API
 		:param cbe: Used by framework not client facing API
+		:param sender: Used by framework not client facing API
 		:return: '/' if complete, else job object path
 		"""
 		r = RequestEntry(
 			tmo, Lv._resize,
 			(self.Uuid, self.lvm_id, round_size(new_size_bytes),
 			pv_dests_and_ranges,
-			resize_options), cb, cbe, return_tuple=False)
+			resize_options), cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -527,7 +562,7 @@ class Lv(LvCommon):
 			rc, out, err = cmdhandler.activate_deactivate(
 				'lvchange', lv_name, activate, control_flags, options)
 			if rc == 0:
-				dbo.refresh()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -543,13 +578,15 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Activate(self, control_flags, tmo, activate_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Activate(self, control_flags, tmo, activate_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Lv._lv_activate_deactivate,
 			(self.state.Uuid, self.state.lvm_id, True,
 			control_flags, activate_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	# noinspection PyProtectedMember
@@ -557,13 +594,16 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Deactivate(self, control_flags, tmo, activate_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Deactivate(self, control_flags, tmo, activate_options,
+			cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Lv._lv_activate_deactivate,
 			(self.state.Uuid, self.state.lvm_id, False,
 			control_flags, activate_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -576,7 +616,7 @@ class Lv(LvCommon):
 			rc, out, err = cmdhandler.lv_tag(
 				lv_name, tags_add, tags_del, tag_options)
 			if rc == 0:
-				dbo.refresh()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -593,8 +633,9 @@ class Lv(LvCommon):
 		dbus_interface=LV_INTERFACE,
 		in_signature='asia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def TagsAdd(self, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def TagsAdd(self, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(LV_INTERFACE, t)
@@ -603,15 +644,17 @@ class Lv(LvCommon):
 			tmo, Lv._add_rm_tags,
 			(self.state.Uuid, self.state.lvm_id,
 			tags, None, tag_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=LV_INTERFACE,
 		in_signature='asia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def TagsDel(self, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def TagsDel(self, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(LV_INTERFACE, t)
@@ -620,7 +663,8 @@ class Lv(LvCommon):
 			tmo, Lv._add_rm_tags,
 			(self.state.Uuid, self.state.lvm_id,
 			None, tags, tag_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 
@@ -671,8 +715,9 @@ class LvThinPool(Lv):
 				lv_name, create_options, name, size_bytes)
 			if rc == 0:
 				full_name = "%s/%s" % (dbo.vg_name_lookup(), name)
-				lvs = load_lvs([full_name], emit_signal=True)[0]
-				for l in lvs:
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
+				l = cfg.om.get_object_by_lvm_id(full_name)
+				if l:
 					lv_created = l.dbus_object_path()
 			else:
 				raise dbus.exceptions.DBusException(
@@ -689,14 +734,16 @@ class LvThinPool(Lv):
 		dbus_interface=THIN_POOL_INTERFACE,
 		in_signature='stia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
-	def LvCreate(self, name, size_bytes, tmo, create_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def LvCreate(self, name, size_bytes, tmo, create_options, cb, cbe, sender):
 		utils.validate_lv_name(THIN_POOL_INTERFACE, self.vg_name_lookup(), name)
 
 		r = RequestEntry(
 			tmo, LvThinPool._lv_create,
 			(self.Uuid, self.lvm_id, name,
-			round_size(size_bytes), create_options), cb, cbe)
+			round_size(size_bytes), create_options), cb, cbe,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 
@@ -725,7 +772,7 @@ class LvCachePool(Lv):
 				# re-created as their interfaces have changed!
 				cfg.om.remove_object(dbo, emit_signal=True)
 				cfg.om.remove_object(lv_to_cache, emit_signal=True)
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 
 				lv_converted = \
 					cfg.om.get_object_by_lvm_id(fcn).dbus_object_path()
@@ -751,12 +798,14 @@ class LvCachePool(Lv):
 		dbus_interface=CACHE_POOL_INTERFACE,
 		in_signature='oia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
-	def CacheLv(self, lv_object, tmo, cache_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def CacheLv(self, lv_object, tmo, cache_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, LvCachePool._cache_lv,
 			(self.Uuid, self.lvm_id, lv_object,
-			cache_options), cb, cbe)
+			cache_options), cb, cbe,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 
@@ -789,7 +838,7 @@ class LvCacheLv(Lv):
 				# visible, so lets delete
 				cfg.om.remove_object(cache_pool, emit_signal=True)
 				cfg.om.remove_object(dbo, emit_signal=True)
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 
 				uncached_lv_path = \
 					cfg.om.get_object_by_lvm_id(lv_name).dbus_object_path()
@@ -809,12 +858,15 @@ class LvCacheLv(Lv):
 		dbus_interface=LV_CACHED,
 		in_signature='bia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
-	def DetachCachePool(self, destroy_cache, tmo, detach_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def DetachCachePool(self, destroy_cache, tmo, detach_options,
+			cb, cbe, sender):
 		r = RequestEntry(
 			tmo, LvCacheLv._detach_lv,
 			(self.Uuid, self.lvm_id, detach_options,
-			destroy_cache), cb, cbe)
+			destroy_cache), cb, cbe,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 
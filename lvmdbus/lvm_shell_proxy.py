@@ -18,15 +18,26 @@ from os import O_NONBLOCK
 import traceback
 import sys
 import re
+import queue
+import os
+import select
+import time
+import threading
 
 try:
-	from .cfg import LVM_CMD
+	from .cfg import LVM_CMD, SHELL_CMD_TIMEOUT
 	from .utils import log_debug, log_error
 except:
-	from cfg import LVM_CMD
+	from cfg import LVM_CMD, SHELL_CMD_TIMEOUT
 	from utils import log_debug, log_error
 
 SHELL_PROMPT = "lvm> "
+PROMPT_BYTES = bytes(SHELL_PROMPT, "utf-8")
+
+# Longest prompt we expect, "[<exit code>] lvm> "
+PROMPT_TAIL = 32
+
+READ_SIZE = 65536
 
 
 def _quote_arg(arg):
@@ -37,43 +48,97 @@ def _quote_arg(arg):
 
 
 class LVMShellProxy(object):
-	def _read_until_prompt(self):
+	def _read(self, fd):
+		"""
+		Read what is available on one of the shell pipes
+		:param fd: File descriptor
+		:return: bytes read
+		"""
+		try:
+			data = os.read(fd, READ_SIZE)
+		except BlockingIOError:
+			return b''
+
+		if not data:
+			raise IOError('lvm shell (pid %d) exited' % self.lvm_shell.pid)
+		return data
+
+	def _read_until_prompt(self, timeout=None):
+		"""
+		Wait for the shell prompt, collecting everything written to STDOUT
+		and STDERR along the way.
+		:param timeout: Seconds to wait for the prompt, None to wait forever
+		:return: (stdout, stderr, exit code if the prompt includes it)
+		"""
 		prev_ec = None
-		stdout = ""
-		while not stdout.endswith(SHELL_PROMPT):
-			try:
-				tmp = self.lvm_shell.stdout.read()
-				if tmp:
-					stdout += tmp.decode("utf-8")
-			except IOError:
-				# nothing written yet
-				pass
+		stdout = bytearray()
+		stderr = bytearray()
+		out_fd = self.lvm_shell.stdout.fileno()
+		err_fd = self.lvm_shell.stderr.fileno()
+
+		deadline = None
+		if timeout is not None:
+			deadline = time.time() + timeout
+
+		# Only the newly read data can complete the prompt, so we only ever
+		# look at the end of the buffer instead of searching all of it
+		while not stdout.endswith(PROMPT_BYTES):
+			wait_ms = None
+			if deadline is not None:
+				wait_ms = max(0, int((deadline - time.time()) * 1000))
+
+			events = self.poller.poll(wait_ms)
+			if not events:
+				raise TimeoutError(
+					'lvm shell (pid %d) no prompt after %s seconds' %
+					(self.lvm_shell.pid, str(timeout)))
+
+			for fd, event in events:
+				if fd == out_fd:
+					stdout += self._read(fd)
+				elif fd == err_fd:
+					stderr += self._read(fd)
+
+		# Anything lvm wrote to STDERR happened before the prompt
+		try:
+			while True:
+				data = os.read(err_fd, READ_SIZE)
+				if not data:
+					break
+				stderr += data
+		except BlockingIOError:
+			pass
 
 		# strip the prompt from the STDOUT before returning and grab the exit
 		# code if it's available
-		m = self.re.match(stdout)
+		m = self.re.search(bytes(stdout[-PROMPT_TAIL:]))
 		if m:
 			prev_ec = int(m.group(2))
 			strip_idx = -1 * len(m.group(1))
 		else:
-			strip_idx = -1 * len(SHELL_PROMPT)
-
-		return stdout[:strip_idx], prev_ec
-
-	def _read_line(self):
-		while True:
-			try:
-				tmp = self.lvm_shell.stdout.readline()
-				if tmp:
-					return tmp.decode("utf-8")
-			except IOError:
-				pass
-
-	def _discard_echo(self, expected):
+			strip_idx = -1 * len(PROMPT_BYTES)
+
+		return (stdout[:strip_idx].decode("utf-8"),
+				stderr.decode("utf-8"), prev_ec)
+
+	@staticmethod
+	def _discard_echo(stdout, expected):
+		"""
+		Remove the echo of our command from the start of the output
+		:param stdout: Output read up to the prompt
+		:param expected: The command we wrote
+		:return: stdout without the echo
+		"""
 		line = ""
+		pos = 0
 		while line != expected:
+			nl = stdout.find('\n', pos)
+			if nl == -1:
+				break
 			# GNU readline inserts some interesting characters at times...
-			line += self._read_line().replace(' \r', '')
+			line += stdout[pos:nl + 1].replace(' \r', '')
+			pos = nl + 1
+		return stdout[pos:]
 
 	def _write_cmd(self, cmd):
 		cmd_bytes = bytes(cmd, "utf-8")
@@ -82,20 +147,13 @@ class LVMShellProxy(object):
 		self.lvm_shell.stdin.flush()
 
 	def _lvm_echos(self):
-		echo = False
 		cmd = "version\n"
 		self._write_cmd(cmd)
-		line = self._read_line()
-
-		if line == cmd:
-			echo = True
-
-		self._read_until_prompt()
-
-		return echo
+		stdout = self._read_until_prompt(SHELL_CMD_TIMEOUT)[0]
+		return stdout.startswith(cmd)
 
 	def __init__(self):
-		self.re = re.compile(".*(\[(-?[0-9]+)\] lvm> $)", re.DOTALL)
+		self.re = re.compile(b"(\\[(-?[0-9]+)\\] lvm> )$")
 
 		# run the lvm shell
 		self.lvm_shell = subprocess.Popen(
@@ -106,14 +164,28 @@ class LVMShellProxy(object):
 		flags = fcntl(self.lvm_shell.stderr, F_GETFL)
 		fcntl(self.lvm_shell.stderr, F_SETFL, flags | O_NONBLOCK)
 
+		self.poller = select.poll()
+		for f in [self.lvm_shell.stdout, self.lvm_shell.stderr]:
+			self.poller.register(
+				f.fileno(), select.POLLIN | select.POLLHUP | select.POLLERR)
+
 		# wait for the first prompt
-		self._read_until_prompt()
+		self._read_until_prompt(SHELL_CMD_TIMEOUT)
 
 		# Check to see if the version of LVM we are using is running with
 		# gnu readline which will echo our writes from stdin to stdout
 		self.echo = self._lvm_echos()
 
-	def call_lvm(self, argv, debug=False):
+	def call_lvm(self, argv, debug=False, timeout=SHELL_CMD_TIMEOUT):
+		"""
+		Run a command on the lvm shell
+		:param argv: Command and arguments
+		:param debug: Dump debug to stdout
+		:param timeout: Seconds to wait for the command to complete, None to
+						wait forever.  On timeout TimeoutError is raised and
+						the shell is left in an unknown state.
+		:return: (exit code, stdout, stderr)
+		"""
 		# create the command string
 		cmd = " ".join(_quote_arg(arg) for arg in argv)
 		cmd += "\n"
@@ -121,24 +193,16 @@ class LVMShellProxy(object):
 		# run the command by writing it to the shell's STDIN
 		self._write_cmd(cmd)
 
+		# read everything from the STDOUT to the next prompt, STDERR is
+		# collected as it arrives so lvm can't block on a full pipe
+		stdout, stderr, exit_code = self._read_until_prompt(timeout)
+
 		# If lvm is utilizing gnu readline, it echos stdin to stdout
 		if self.echo:
-			self._discard_echo(cmd)
+			stdout = self._discard_echo(stdout, cmd)
 
-		# read everything from the STDOUT to the next prompt
-		stdout, exit_code = self._read_until_prompt()
-
-		# read everything from STDERR if there's something (we waited for the
-		# prompt on STDOUT so there should be all or nothing at this point on
-		# STDERR)
-		stderr = None
-		try:
-			t_error = self.lvm_shell.stderr.read()
-			if t_error:
-				stderr = t_error.decode("utf-8")
-		except IOError:
-			# nothing on STDERR
-			pass
+		if not stderr:
+			stderr = None
 
 		if exit_code is not None:
 			rc = exit_code
@@ -159,10 +223,119 @@ class LVMShellProxy(object):
 
 		return (rc, stdout, stderr)
 
+	def is_alive(self):
+		"""
+		Check that the lvm shell process is still running
+		:return: True if it is
+		"""
+		return self.lvm_shell.poll() is None
+
+	def exit_shell(self):
+		if self.is_alive():
+			self.lvm_shell.terminate()
+			self.lvm_shell.wait()
+
 	def __del__(self):
 		self.lvm_shell.terminate()
 
 
+class LVMShellPool(object):
+	"""
+	A fixed number of lvm shells, each one used by a single thread at a
+	time so that independent commands can run concurrently.  Shells are
+	started on first use and replaced when they are found dead or a
+	command on them fails to complete.  The only health check is whether
+	the shell process is still alive, a shell which is alive but wedged is
+	not noticed until a command on it fails.  Reports and commands which
+	change things share the shells alike, keeping changes to a VG apart
+	is left to the request executor.
+	"""
+
+	def __init__(self, size):
+		self.size = max(1, size)
+		self._idle = queue.Queue()
+
+		# How long the last command of each thread waited for a shell
+		self._waited = threading.local()
+
+		# Once closed, shells are exited as they are handed back
+		self._closed = False
+
+		# An empty slot gets a shell when it is checked out
+		for i in range(0, self.size):
+			self._idle.put(None)
+
+	def _checkout(self):
+		start = time.time()
+		shell = self._idle.get()
+		self._waited.seconds = time.time() - start
+
+		if shell is not None and not shell.is_alive():
+			log_error('lvm shell (pid %d) died, replacing it' %
+						shell.lvm_shell.pid)
+			shell = None
+
+		if shell is None:
+			try:
+				shell = LVMShellProxy()
+			except Exception:
+				self._idle.put(None)
+				raise
+
+		return shell
+
+	def _checkin(self, shell):
+		if self._closed:
+			if shell is not None:
+				shell.exit_shell()
+			# Keep the slot for anyone still waiting on the closed pool
+			shell = None
+
+		self._idle.put(shell)
+
+	def close(self):
+		"""
+		Exit the shells, those in use are exited when their command is done
+		"""
+		self._closed = True
+
+		drained = []
+		while True:
+			try:
+				drained.append(self._idle.get_nowait())
+			except queue.Empty:
+				break
+
+		for shell in drained:
+			if shell is not None:
+				shell.exit_shell()
+
+			# Only the slot goes back, for anyone still holding on to the
+			# closed pool, the shells in use come back as slots themselves
+			self._idle.put(None)
+
+	def wait_time(self):
+		"""
+		:return: Seconds the calling thread's last call_lvm waited for a shell
+		"""
+		return getattr(self._waited, 'seconds', 0.0)
+
+	def call_lvm(self, argv, debug=False):
+		shell = self._checkout()
+
+		try:
+			result = shell.call_lvm(argv, debug)
+		except Exception:
+			# We don't know what state the shell is in, start over
+			log_error('lvm shell command failed, replacing shell')
+			shell.exit_shell()
+			self._checkin(None)
+			raise
+
+		self._checkin(shell)
+		return result
+
+
 if __name__ == "__main__":
 	shell = LVMShellProxy()
 	in_line = "start"
@@ -10,23 +10,71 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from collections import OrderedDict
+import bisect
+import hashlib
+import time
 
 import pprint as prettyprint
 
 try:
 	from . import cmdhandler
+	from . import stats
+	from . import requesttrace
 	from .utils import log_debug
 except SystemError:
 	import cmdhandler
+	import stats
+	import requesttrace
 	from utils import log_debug
 
 
+class PvExtents(object):
+	"""
+	Where things are on a PV.  Ranges are inclusive PE numbers kept sorted
+	by their start so they can be searched with bisect, neither the LV
+	segments nor the free ranges on a PV overlap so their ends are sorted
+	too.
+	"""
+	__slots__ = ('pe_segments', 'segments', '_seg_starts', '_seg_ends',
+					'free', '_free_starts', '_free_ends')
+
+	def __init__(self, pe_segments, segments, free):
+		"""
+		:param pe_segments: [(start, size), ...] of the PV segments
+		:param segments:    [(start, end, lv uuid, segtype), ...] of the LV
+							segments stored on the PV
+		:param free:        [(start, end), ...] of the free ranges
+		"""
+		self.pe_segments = sorted(pe_segments)
+		self.segments = sorted(segments)
+		self._seg_starts = [x[0] for x in self.segments]
+		self._seg_ends = [x[1] for x in self.segments]
+		self.free = sorted(free)
+		self._free_starts = [x[0] for x in self.free]
+		self._free_ends = [x[1] for x in self.free]
+
+	@staticmethod
+	def _overlapping(ranges, starts, ends, first, last):
+		lo = bisect.bisect_left(ends, first)
+		if last is None:
+			return ranges[lo:]
+		return ranges[lo:bisect.bisect_right(starts, last)]
+
+	def lvs_in_range(self, first, last):
+		return self._overlapping(
+			self.segments, self._seg_starts, self._seg_ends, first, last)
+
+	def free_in_range(self, first=0, last=None):
+		return self._overlapping(
+			self.free, self._free_starts, self._free_ends, first, last)
+
+
 class DataStore(object):
 	def __init__(self):
 		self.pvs = {}
 		self.vgs = {}
 		self.lvs = {}
-		self.pv_lvs = {}
+		self.pv_extents = {}
 		self.lv_pvs = {}
 		self.lvs_hidden = {}
 
@@ -40,6 +88,17 @@ class DataStore(object):
 		# self.refresh()
 		self.num_refreshes = 0
 
+		# Incremental refreshes need a complete picture to start from
+		self._have_all = False
+
+		# vg uuid -> vg_seqno the dbus objects were last brought in line
+		# with, see loaded().  Not what we last read, a refresh which isn't
+		# followed by a load of the VG must not hide its changes.
+		self._seqno_loaded = {}
+
+		# pv/vg/lv uuid -> digest of what lvm reported for it
+		self._digests = {}
+
 	@staticmethod
 	def _insert_record(table, key, record, allowed_multiple):
 		if key in table:
@@ -65,6 +124,44 @@ class DataStore(object):
 		else:
 			table[key] = record
 
+	@staticmethod
+	def _row_digest(record, derived=()):
+		# A changed row getting the digest of the old one would leave its
+		# object stale, so this is a real digest rather than hash().  The
+		# values are strings, lists of them and tuples of strings and ints,
+		# whose repr is unambiguous.
+		return hashlib.sha1(repr(
+			(list(record.values()), list(derived))).encode('utf-8')).digest()
+
+	def _update_digests(self, pvs, vgs, lvs):
+		"""
+		Record a digest of each supplied row.  PVs and LVs pick up things
+		from the rest of their VG, so their digest also covers what their
+		state is built from: the LVs stored on a PV, and the PVs and hidden
+		LVs of an LV.  Call once pv_extents, lv_pvs and lvs_hidden are up to
+		date.
+		"""
+		for vg_uuid, v in vgs.items():
+			self._digests[vg_uuid] = self._row_digest(v)
+
+		for pv_uuid, p in pvs.items():
+			derived = []
+			if pv_uuid in self.pv_extents:
+				for start, end, lv_uuid, seg_type in \
+						self.pv_extents[pv_uuid].segments:
+					l = self.lvs[lv_uuid]
+					derived.append(
+						(start, end, lv_uuid, seg_type, l['lv_name'],
+							l['lv_attr'], l['lv_layout'], l['lv_role']))
+			self._digests[pv_uuid] = self._row_digest(p, derived)
+
+		for lv_uuid, l in lvs.items():
+			derived = [(pv_uuid, device, tuple(pv_segs))
+						for pv_uuid, device, pv_segs in
+						self.lv_pvs.get(lv_uuid, ())]
+			derived.extend(self.lvs_hidden.get(lv_uuid, ()))
+			self._digests[lv_uuid] = self._row_digest(l, derived)
+
 	@staticmethod
 	def _parse_pvs(_pvs):
 		pvs = sorted(_pvs, key=lambda pk: pk['pv_name'])
@@ -183,105 +280,104 @@ class DataStore(object):
 				rc.append(DataStore._parse_seg_entry(*i))
 		return rc
 
-	@staticmethod
-	def _pv_device_lv_entry(table, pv_device, lv_uuid, meta, lv_attr,
-							segment_info):
-
-		if pv_device not in table:
-			table[pv_device] = {}
-
-		if lv_uuid not in table[pv_device]:
-			table[pv_device][lv_uuid] = {}
-			table[pv_device][lv_uuid]['segs'] = [segment_info]
-			table[pv_device][lv_uuid]['name'] = meta
-			table[pv_device][lv_uuid]['meta'] = lv_attr
-		else:
-			table[pv_device][lv_uuid]['segs'].append(segment_info)
+	def _parse_pv_in_lvs(self, pvs, lvs):
+		"""
+		Work out where the LVs are stored
+		:param pvs: pv uuid -> pv record, for the PVs to build extent maps for
+		:param lvs: LV records whose segments should be placed
+		:return: (pv uuid -> PvExtents,
+					lv uuid -> [(pv uuid, pv device, [(start, end, segtype)])])
+		"""
+		used = {}			# pv uuid -> [(start, end, lv uuid, segtype)]
+		lvs_device_pv = {}	# Where LV data is stored
 
-	@staticmethod
-	def _pv_device_lv_format(pv_device_lvs):
-		rc = {}
+		for i in lvs:
+			on_pvs = {}		# pv device -> (pv uuid, segments)
 
-		for pv_device, pd in pv_device_lvs.items():
-			lvs = []
-			for lv_uuid, ld in sorted(pd.items()):
-				lvs.append((lv_uuid, ld['name'], ld['meta'], ld['segs']))
+			segs = self._build_segments(i['seg_pe_ranges'], i['segtype'])
+			for device, r, seg_type in segs:
+				# We are referring to physical device
+				if '/dev/' in device:
+					pv_uuid = self.pv_path_to_uuid[device]
+					start = int(r[0])
+					end = int(r[1])
 
-			rc[pv_device] = lvs
-		return rc
+					used.setdefault(pv_uuid, []).append(
+						(start, end, i['lv_uuid'], seg_type))
 
-	@staticmethod
-	def _lvs_device_pv_entry(table, lv_uuid, pv_device, pv_uuid, segment_info):
-		if lv_uuid not in table:
-			table[lv_uuid] = {}
-
-		if pv_device not in table[lv_uuid]:
-			table[lv_uuid][pv_device] = {}
-			table[lv_uuid][pv_device]['segs'] = [segment_info]
-			table[lv_uuid][pv_device]['pv_uuid'] = pv_uuid
-		else:
-			table[lv_uuid][pv_device]['segs'].append(segment_info)
+					if device not in on_pvs:
+						on_pvs[device] = (pv_uuid, [])
+					on_pvs[device][1].append((start, end, seg_type))
+				else:
+					# TODO Handle the case where the segments refer to a LV
+					# and not a PV
+					pass
 
-	@staticmethod
-	def _lvs_device_pv_format(lvs_device_pvs):
-		rc = {}
+			if on_pvs:
+				lvs_device_pv[i['lv_uuid']] = [
+					(pv_uuid, device, pv_segs)
+					for device, (pv_uuid, pv_segs) in sorted(on_pvs.items())]
 
-		for lv_uuid, ld in lvs_device_pvs.items():
-			pvs = []
-			for pv_device, pd in sorted(ld.items()):
-				pvs.append((pd['pv_uuid'], pv_device, pd['segs']))
+		extents = {}
+		for pv_uuid, p in pvs.items():
+			pe_segments = []
+			free = []
 
-			rc[lv_uuid] = pvs
-		return rc
+			starts = self._make_list(p['pv_seg_start'])
+			sizes = self._make_list(p['pvseg_size'])
+			seg_types = self._make_list(p['segtype'])
 
-	def _parse_pv_in_lvs(self):
-		pv_device_lvs = {}  # What LVs are stored on a PV
-		lvs_device_pv = {}  # Where LV data is stored
+			for start, size, seg_type in zip(starts, sizes, seg_types):
+				# PVs outside of a VG don't necessarily have any segments
+				if start == '':
+					continue
 
-		for i in self.lvs.values():
-			segs = self._build_segments(i['seg_pe_ranges'], i['segtype'])
-			for s in segs:
-				# We are referring to physical device
-				if '/dev/' in s[0]:
-					device, r, seg_type = s
-
-					DataStore._pv_device_lv_entry(
-						pv_device_lvs, device, i['lv_uuid'], i['lv_name'],
-						(i['lv_attr'], i['lv_layout'], i['lv_role']),
-						(r[0], r[1], seg_type))
-
-					# (pv_name, pv_segs, pv_uuid)
-					DataStore._lvs_device_pv_entry(
-						lvs_device_pv, i['lv_uuid'], device,
-						self.pv_path_to_uuid[device], (r[0], r[1], seg_type))
-				else:
-					# TODO Handle the case where the segments refer to a LV
-					# and not a PV
-					pass
-					# print("Handle this %s %s %s" % (s[0], s[1], s[2]))
+				start = int(start)
+				size = int(size)
+				pe_segments.append((start, size))
+				if seg_type == 'free' and size:
+					free.append((start, start + size - 1))
 
-		# Convert form to needed result for consumption
-		pv_device_lvs_result = DataStore._pv_device_lv_format(pv_device_lvs)
-		lvs_device_pv_result = DataStore._lvs_device_pv_format(lvs_device_pv)
+			extents[pv_uuid] = PvExtents(
+				pe_segments, used.get(pv_uuid, []), free)
 
-		return pv_device_lvs_result, lvs_device_pv_result
+		return extents, lvs_device_pv
 
-	def refresh(self, log=True):
+	@staticmethod
+	def _fetch(vg_names=None, pv_vg_uuids=None):
 		"""
-		Go out and query lvm for the latest data in as few trips as possible
-		:param log  Add debug log entry/exit messages
-		:return: None
+		Grab the raw pv, vg and lv records from lvm, with a single
+		fullreport when we can, else with the separate report commands.
+		:param vg_names: VGs to limit vgs/lvs to, None for all
+		:param pv_vg_uuids: VG uuids to limit the pvs to, None for all
+		:return: (pvs, vgs, lvs)
 		"""
+		if vg_names is None:
+			report = cmdhandler.lvm_full_report()
+			if report is not None:
+				return report
+		elif vg_names:
+			report = cmdhandler.lvm_full_report(vg_names)
+			if report is not None:
+				# The orphans aren't part of a VG limited full report
+				_raw_pvs, _raw_vgs, _raw_lvs = report
+				_raw_pvs.extend(cmdhandler.pv_retrieve_with_segs(
+					vg_uuids=['']))
+				return _raw_pvs, _raw_vgs, _raw_lvs
+		else:
+			# Only VGs which no longer exist and/or the orphans
+			return cmdhandler.pv_retrieve_with_segs(vg_uuids=pv_vg_uuids), \
+				[], []
 
-		if log:
-			log_debug("lvmdb - refresh entry")
-			self.num_refreshes += 1
+		return (cmdhandler.pv_retrieve_with_segs(vg_uuids=pv_vg_uuids),
+				cmdhandler.vg_retrieve(vg_names),
+				cmdhandler.lv_retrieve_with_segments(vg_names))
 
+	def _refresh_all(self):
 		# Grab everything first then parse it
-		_raw_pvs = cmdhandler.pv_retrieve_with_segs()
-		_raw_vgs = cmdhandler.vg_retrieve(None)
-		_raw_lvs = cmdhandler.lv_retrieve_with_segments()
+		self._set_all(*self._fetch())
 
+	def _set_all(self, _raw_pvs, _raw_vgs, _raw_lvs):
 		_pvs, _pvs_lookup, _pvs_in_vgs = self._parse_pvs(_raw_pvs)
 		_vgs, _vgs_lookup = self._parse_vgs(_raw_vgs)
 		_lvs, _lvs_in_vgs, _lvs_hidden, _lvs_lookup = self._parse_lvs(_raw_lvs)
@@ -299,13 +395,209 @@ class DataStore(object):
 		self.lvs_hidden = _lvs_hidden
 
 		# Create lookup table for which LV and segments are on each PV
-		self.pv_lvs, self.lv_pvs = self._parse_pv_in_lvs()
+		self.pv_extents, self.lv_pvs = self._parse_pv_in_lvs(
+			self.pvs, self.lvs.values())
+
+		self._digests = {}
+		self._update_digests(self.pvs, self.vgs, self.lvs)
+
+		self._have_all = True
+
+	def _vgs_changed(self, vg_uuids):
+		"""
+		Compare the VG sequence numbers lvm currently has with those the
+		objects were last loaded at
+		:param vg_uuids: VGs to treat as changed regardless of their seqno
+		:return: (Set of changed vg uuids, list of the changed vg names)
+				or None if we were unable to query lvm
+		"""
+		probe = cmdhandler.vg_seqno_retrieve()
+		if probe is None:
+			return None
+
+		changed = set(vg_uuids)
+		names = []
+		present = set()
+
+		for v in probe:
+			present.add(v['vg_uuid'])
+			if v['vg_uuid'] in changed or \
+					self._seqno_loaded.get(v['vg_uuid']) != v['vg_seqno']:
+				changed.add(v['vg_uuid'])
+				names.append(v['vg_name'])
+
+		# VGs which have gone away
+		changed.update(
+			(set(self.vgs.keys()) | set(self._seqno_loaded.keys())) - present)
+		return changed, names
+
+	def _merge(self, changed, _raw_pvs, _raw_vgs, _raw_lvs):
+		"""
+		Replace what we have for the changed VGs (and the orphan PVs) with
+		the supplied lvm data, leaving everything else untouched.
+		"""
+		_pvs, _pvs_lookup, _pvs_in_vgs = self._parse_pvs(_raw_pvs)
+		_vgs, _vgs_lookup = self._parse_vgs(_raw_vgs)
+		_lvs, _lvs_in_vgs, _lvs_hidden, _lvs_lookup = self._parse_lvs(_raw_lvs)
+
+		# PVs, the orphans get replaced too
+		pvs = {}
+		for pv_uuid, p in self.pvs.items():
+			if p['vg_uuid'] in changed or not p['vg_uuid']:
+				self.pv_path_to_uuid.pop(p['pv_name'], None)
+				self.pv_extents.pop(pv_uuid, None)
+				self._digests.pop(pv_uuid, None)
+			else:
+				pvs[pv_uuid] = p
+		pvs.update(_pvs)
+		self.pvs = OrderedDict(
+			sorted(pvs.items(), key=lambda pk: pk[1]['pv_name']))
+		self.pv_path_to_uuid.update(_pvs_lookup)
+
+		for vg_uuid in list(self.pvs_in_vgs.keys()):
+			if vg_uuid in changed or not vg_uuid:
+				del self.pvs_in_vgs[vg_uuid]
+		self.pvs_in_vgs.update(_pvs_in_vgs)
+
+		# VGs
+		vgs = {}
+		for vg_uuid, v in self.vgs.items():
+			if vg_uuid in changed:
+				self.vg_name_to_uuid.pop(v['vg_name'], None)
+				self._digests.pop(vg_uuid, None)
+			else:
+				vgs[vg_uuid] = v
+		vgs.update(_vgs)
+		self.vgs = OrderedDict(
+			sorted(vgs.items(), key=lambda vk: vk[1]['vg_name']))
+		self.vg_name_to_uuid.update(_vgs_lookup)
+
+		# LVs
+		lvs = {}
+		for lv_uuid, l in self.lvs.items():
+			if l['vg_uuid'] in changed:
+				self.lv_full_name_to_uuid.pop(
+					"%s/%s" % (l['vg_name'], l['lv_name']), None)
+				self.lvs_hidden.pop(lv_uuid, None)
+				self.lv_pvs.pop(lv_uuid, None)
+				self._digests.pop(lv_uuid, None)
+			else:
+				lvs[lv_uuid] = l
+		lvs.update(_lvs)
+		self.lvs = OrderedDict(
+			sorted(lvs.items(), key=lambda lk: lk[1]['lv_name']))
+		self.lv_full_name_to_uuid.update(_lvs_lookup)
+		self.lvs_hidden.update(_lvs_hidden)
+
+		for vg_uuid in changed:
+			self.lvs_in_vgs.pop(vg_uuid, None)
+		self.lvs_in_vgs.update(_lvs_in_vgs)
+
+		# An LV only ever resides on the PVs of its own VG, so only the
+		# changed LVs need their placement figured out again
+		_pv_extents, _lv_pvs = self._parse_pv_in_lvs(_pvs, _lvs.values())
+		self.pv_extents.update(_pv_extents)
+		self.lv_pvs.update(_lv_pvs)
+
+		self._update_digests(_pvs, _vgs, _lvs)
+
+	def _refresh_changed(self, vg_uuids):
+		"""
+		Only re-read the VGs whose seqno has moved since their objects were
+		last loaded
+		:param vg_uuids: VGs to re-read regardless of their seqno
+		:return: Set of vg uuids that were re-read or None if we ended up
+				needing to do a full refresh
+		"""
+		result = self._vgs_changed(vg_uuids)
+		if result is None:
+			self._refresh_all()
+			return None
+
+		changed, names = result
+
+		if changed:
+			_raw_pvs, _raw_vgs, _raw_lvs = self._fetch(names, changed)
+
+			# If things changed out from under us between the probe and the
+			# fetch, give up and grab everything
+			if len(_raw_vgs) != len(names):
+				log_debug("lvmdb - VGs changed during refresh, reading all")
+				self._refresh_all()
+				return None
+
+			self._merge(changed, _raw_pvs, _raw_vgs, _raw_lvs)
+
+		return changed
+
+	def refresh(self, log=True, incremental=False, vg_uuids=None):
+		"""
+		Go out and query lvm for the latest data in as few trips as possible
+		:param log  Add debug log entry/exit messages
+		:param incremental  Only re-read the VGs whose vg_seqno has changed,
+							the orphan PVs are re-read along with them and
+							everything else is left as is
+		:param vg_uuids  With incremental, VGs which are re-read even if
+							their seqno didn't move (eg. activation), ''
+							refers to the orphan PVs
+		:return: Set of vg uuids that were re-read, None when everything was
+		"""
+		rc = None
+		start = time.time()
+
+		if log:
+			log_debug("lvmdb - refresh entry")
+			self.num_refreshes += 1
+
+		if incremental and self._have_all:
+			rc = self._refresh_changed(vg_uuids or [])
+		else:
+			self._refresh_all()
+
+		end = time.time()
+		stats.refresh_done(end - start, rc is not None)
+		requesttrace.refresh_done(start, end)
 
 		if log:
 			log_debug("lvmdb - refresh exit")
 
-	def fetch_pvs(self, pv_name):
+		return rc
+
+	def loaded(self, vg_uuids=None):
+		"""
+		Record that the dbus objects are now in line with what we have
+		:param vg_uuids: VGs whose objects were loaded, None for all of them
+		"""
+		if vg_uuids is None:
+			self._seqno_loaded = dict(
+				(vg_uuid, v['vg_seqno']) for vg_uuid, v in self.vgs.items())
+		else:
+			for vg_uuid in vg_uuids:
+				if vg_uuid in self.vgs:
+					self._seqno_loaded[vg_uuid] = self.vgs[vg_uuid]['vg_seqno']
+				else:
+					self._seqno_loaded.pop(vg_uuid, None)
+
+	def records(self):
+		"""
+		What we currently have from lvm, in a form restore() takes back
+		:return: (pv records, vg records, lv records)
+		"""
+		return (list(self.pvs.values()), list(self.vgs.values()),
+				list(self.lvs.values()))
+
+	def restore(self, pvs, vgs, lvs):
+		"""
+		Replace everything we have with previously saved records(),
+		the lookups and indexes are built again from them
+		"""
+		self._set_all(pvs, vgs, lvs)
+
+	def fetch_pvs(self, pv_name, vg_uuids=None):
 		if not pv_name:
+			if vg_uuids is not None:
+				return [p for p in self.pvs.values()
+						if p['vg_uuid'] in vg_uuids]
 			return self.pvs.values()
 		else:
 			rc = []
@@ -313,8 +605,11 @@ class DataStore(object):
 				rc.append(self.pvs[self.pv_path_to_uuid[s]])
 			return rc
 
-	def fetch_vgs(self, vg_name):
+	def fetch_vgs(self, vg_name, vg_uuids=None):
 		if not vg_name:
+			if vg_uuids is not None:
+				return [v for v in self.vgs.values()
+						if v['vg_uuid'] in vg_uuids]
 			return self.vgs.values()
 		else:
 			rc = []
@@ -322,9 +617,15 @@ class DataStore(object):
 				rc.append(self.vgs[self.vg_name_to_uuid[s]])
 			return rc
 
-	def fetch_lvs(self, lv_names):
+	def fetch_lvs(self, lv_names, vg_uuids=None):
 		try:
 			if not lv_names:
+				if vg_uuids is not None:
+					rc = []
+					for vg_uuid in vg_uuids:
+						for l in self.lvs_in_vg(vg_uuid):
+							rc.append(self.lvs[l[2]])
+					return rc
 				return self.lvs.values()
 			else:
 				rc = []
@@ -341,16 +642,58 @@ class DataStore(object):
 				print("%s" % (keys))
 			raise ke
 
+	def digest(self, uuid):
+		"""
+		:param uuid: pv, vg or lv uuid
+		:return: Digest of the row lvm last reported for it, None if unknown
+		"""
+		return self._digests.get(uuid)
+
 	def pv_pe_segments(self, pv_uuid):
-		pv = self.pvs[pv_uuid]
-		return list(zip(pv['pv_seg_start'], pv['pvseg_size']))
+		# Returns an array of (start, size)
+		return self.pv_extents[pv_uuid].pe_segments
 
 	def pv_contained_lv(self, pv_device):
+		# Returns an array of
+		# (lv_uuid, lv_name, (lv_attr, lv_layout, lv_role),
+		# [(start, end, segtype), ...])
 		rc = []
-		if pv_device in self.pv_lvs:
-			rc = self.pv_lvs[pv_device]
+		pv_uuid = self.pv_path_to_uuid.get(pv_device)
+		if pv_uuid in self.pv_extents:
+			by_lv = {}
+			for start, end, lv_uuid, seg_type in \
+					self.pv_extents[pv_uuid].segments:
+				by_lv.setdefault(lv_uuid, []).append((start, end, seg_type))
+
+			for lv_uuid, segs in sorted(by_lv.items()):
+				l = self.lvs[lv_uuid]
+				rc.append((lv_uuid, l['lv_name'],
+							(l['lv_attr'], l['lv_layout'], l['lv_role']),
+							segs))
 		return rc
 
+	def pv_lvs_in_range(self, pv_uuid, first, last):
+		"""
+		Which LVs occupy PEs first..last (inclusive) of a PV
+		:return: [(start, end, lv_uuid, segtype), ...] of the overlapping LV
+				segments, sorted by start
+		"""
+		if pv_uuid in self.pv_extents:
+			return self.pv_extents[pv_uuid].lvs_in_range(first, last)
+		return []
+
+	def pv_free_extents(self, pv_uuid, first=0, last=None):
+		"""
+		Free extent ranges of a PV, optionally limited to those overlapping
+		PEs first..last (inclusive)
+		:return: [(start, end), ...] sorted by start
+		"""
+		# Looked up once, _merge can drop the entry between two look ups
+		extents = self.pv_extents.get(pv_uuid)
+		if extents is not None:
+			return extents.free_in_range(first, last)
+		return []
+
 	def lv_contained_pv(self, lv_uuid):
 		rc = []
 		if lv_uuid in self.lv_pvs:
@@ -403,9 +746,9 @@ if __name__ == "__main__":
 		pp.pprint(v)
 
 	print("pv_in_lvs")
-	for k, v in ds.pv_lvs.items():
-		print("PV %s contains LVS:" % (k))
-		pp.pprint(v)
+	for v in ds.pvs.values():
+		print("PV %s contains LVS:" % (v['pv_name']))
+		pp.pprint(ds.pv_contained_lv(v['pv_name']))
 
 	for k, v in ds.lv_pvs.items():
 		print("LV device = %s" % (k))
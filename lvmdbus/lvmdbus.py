@@ -17,14 +17,16 @@ import time
 import signal
 import dbus
 from . import lvmdb
+from . import executor
+from . import refresh
+from . import snapshot
+from . import requesttrace
+from .request import RequestEntry
 # noinspection PyUnresolvedReferences
 from gi.repository import GObject
 from .fetch import load
 from .manager import Manager
 from .background import background_reaper
-import traceback
-import queue
-import sys
 from . import udevwatch
 from .utils import log_debug
 import argparse
@@ -35,30 +37,10 @@ class Lvm(objectmanager.ObjectManager):
 		super(Lvm, self).__init__(object_path, BASE_INTERFACE)
 
 
-def process_request():
-	while cfg.run.value != 0:
-		try:
-			req = cfg.worker_q.get(True, 5)
-
-			start = cfg.db.num_refreshes
-
-			log_debug(
-				"Running method: %s with args %s" %
-				(str(req.method), str(req.arguments)))
-			req.run_cmd()
-
-			end = cfg.db.num_refreshes
-
-			if end - start > 1:
-				log_debug(
-					"Inspect method %s for too many refreshes" %
-					(str(req.method)))
-			log_debug("Complete ")
-		except queue.Empty:
-			pass
-		except Exception:
-			traceback.print_exc(file=sys.stdout)
-			pass
+def _name_owner_changed(name, old_owner, new_owner):
+	# A unique name losing its owner is a client which disconnected
+	if name.startswith(':') and not new_owner:
+		cfg.worker_q.caller_gone(name)
 
 
 def main():
@@ -70,10 +52,25 @@ def main():
 	parser.add_argument("--debug", action='store_true',
 						help="Dump debug messages", default=False,
 						dest='debug')
+	parser.add_argument("--workers", type=int,
+						help="Number of threads executing requests",
+						default=cfg.WORKER_THREADS, dest='workers')
+	parser.add_argument("--shell-pool-size", type=int,
+						help="Number of lvm shells when using lvm shell",
+						default=cfg.SHELL_POOL_SIZE, dest='shell_pool_size')
+	parser.add_argument("--snapshot-file",
+						help="Start up from and save state to this file, "
+						"empty to not use one",
+						default=cfg.SNAPSHOT_FILE, dest='snapshot_file')
 
 	args = parser.parse_args()
 
 	cfg.DEBUG = args.debug
+	cfg.SHELL_POOL_SIZE = args.shell_pool_size
+	cfg.WORKER_THREADS = args.workers
+	cfg.SNAPSHOT_FILE = args.snapshot_file
+	if cfg.USE_SHELL:
+		cmdhandler.set_execution(True)
 
 	# List of threads that we start up
 	thread_list = []
@@ -87,6 +84,8 @@ def main():
 		except RuntimeError:
 			pass
 
+	signal.signal(signal.SIGUSR1, requesttrace.dump_handler)
+
 	dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 	GObject.threads_init()
 	dbus.mainloop.glib.threads_init()
@@ -105,16 +104,35 @@ def main():
 	thread_list.append(
 		threading.Thread(target=background_reaper, name="pv_move_reaper"))
 
-	# Using a thread to process requests.
-	thread_list.append(threading.Thread(target=process_request))
-
-	cfg.load(refresh=False, emit_signal=False)
+	# Thread to turn external events into refreshes
+	thread_list.append(
+		threading.Thread(target=refresh.scheduler, name="refresh_scheduler"))
+
+	# Threads to process requests.
+	cfg.worker_q = executor.RequestExecutor(cfg.WORKER_THREADS)
+	thread_list.extend(cfg.worker_q.threads())
+
+	# So the queued requests of clients which went away can be dropped
+	cfg.bus.add_signal_receiver(
+		_name_owner_changed, signal_name='NameOwnerChanged',
+		dbus_interface='org.freedesktop.DBus',
+		bus_name='org.freedesktop.DBus', path='/org/freedesktop/DBus')
+
+	# Serve what we had last time until lvm has been checked, else we need
+	# to wait for lvm before we can answer anything
+	restored = snapshot.restore()
+	if not restored:
+		cfg.load(refresh=False, emit_signal=False)
 	cfg.loop = GObject.MainLoop()
 
 	for process in thread_list:
 		process.damon = True
 		process.start()
 
+	cfg.worker_q.put(RequestEntry(
+		-1, snapshot.reconcile if restored else snapshot.save, (),
+		None, None, False))
+
 	end = time.time()
 	log_debug(
 		'Service ready! total time= %.2f, lvm time= %.2f count= %d' %
@@ -135,6 +153,11 @@ def main():
 
 			for process in thread_list:
 				process.join()
+
+			log_debug('Request statistics: %s' %
+						str(cfg.worker_q.statistics()))
+
+			snapshot.save()
 	except KeyboardInterrupt:
 		utils.handler(signal.SIGINT, None)
 	return 0
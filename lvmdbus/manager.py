@@ -10,19 +10,26 @@
 from .automatedproperties import AutomatedProperties
 
 from . import utils
-from .cfg import MANAGER_INTERFACE
+from .cfg import MANAGER_INTERFACE, VG_INTERFACE
 import dbus
 from . import cfg
 from . import cmdhandler
-from .fetch import load_pvs, load_vgs
 from .request import RequestEntry
 from .refresh import event_add
+from . import refresh
+from . import signalbatch
+from . import stats
+from . import requesttrace
 
 
 # noinspection PyPep8Naming
 class Manager(AutomatedProperties):
 	_Version_meta = ("t", MANAGER_INTERFACE)
 
+	# GetManagedObjectsFiltered filter name -> query_objects keyword
+	_query_filters = dict(
+		interface='interface', vg='vg_uuid', tag='tag', name='name_glob')
+
 	def __init__(self, object_path):
 		super(Manager, self).__init__(object_path)
 		self.set_interface(MANAGER_INTERFACE)
@@ -45,8 +52,10 @@ class Manager(AutomatedProperties):
 		created_pv = []
 		rc, out, err = cmdhandler.pv_create(create_options, [device])
 		if rc == 0:
-			pvs = load_pvs([device], emit_signal=True)[0]
-			for p in pvs:
+			# A new PV is an orphan
+			cfg.load(vg_uuids=[''])
+			p = cfg.om.get_object_by_lvm_id(device)
+			if p:
 				created_pv = p.dbus_object_path()
 		else:
 			raise dbus.exceptions.DBusException(
@@ -59,12 +68,13 @@ class Manager(AutomatedProperties):
 		dbus_interface=MANAGER_INTERFACE,
 		in_signature='sia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
-	def PvCreate(self, device, tmo, create_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def PvCreate(self, device, tmo, create_options, cb, cbe, sender):
 		utils.validate_device_path(MANAGER_INTERFACE, device)
 		r = RequestEntry(
 			tmo, Manager._pv_create,
-			(device, create_options), cb, cbe)
+			(device, create_options), cb, cbe, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -83,12 +93,11 @@ class Manager(AutomatedProperties):
 		created_vg = "/"
 
 		if rc == 0:
-			vgs = load_vgs([name], emit_signal=True)[0]
-			for v in vgs:
+			# The new VG shows up as changed, its PVs come from the orphans
+			cfg.load(vg_uuids=[])
+			v = cfg.om.get_object_by_lvm_id(name)
+			if v:
 				created_vg = v.dbus_object_path()
-
-			# Update the PVS
-			load_pvs(refresh=True, emit_signal=True, cache_refresh=False)
 		else:
 			raise dbus.exceptions.DBusException(
 				MANAGER_INTERFACE,
@@ -99,13 +108,15 @@ class Manager(AutomatedProperties):
 		dbus_interface=MANAGER_INTERFACE,
 		in_signature='saoia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
-	def VgCreate(self, name, pv_object_paths, tmo, create_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def VgCreate(self, name, pv_object_paths, tmo, create_options,
+			cb, cbe, sender):
 		utils.validate_vg_name(MANAGER_INTERFACE, name)
 		r = RequestEntry(
 			tmo, Manager._create_vg,
 			(name, pv_object_paths, create_options,),
-			cb, cbe)
+			cb, cbe, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -126,8 +137,9 @@ class Manager(AutomatedProperties):
 	@dbus.service.method(
 		dbus_interface=MANAGER_INTERFACE,
 		out_signature='t',
-		async_callbacks=('cb', 'cbe'))
-	def Refresh(self, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Refresh(self, cb, cbe, sender):
 		"""
 		Take all the objects we know about and go out and grab the latest
 		more of a test method at the moment to make sure we are handling object
@@ -135,10 +147,12 @@ class Manager(AutomatedProperties):
 
 		:param cb   Callback for result
 		:param cbe  Callback for errors
+		:param sender  Bus name of the caller
 
 		Returns the number of changes, object add/remove/properties changed
 		"""
-		r = RequestEntry(-1, Manager._refresh, (), cb, cbe, False)
+		r = RequestEntry(-1, Manager._refresh, (), cb, cbe, False,
+							sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
@@ -165,6 +179,104 @@ class Manager(AutomatedProperties):
 			return p
 		return '/'
 
+	@dbus.service.method(
+		dbus_interface=MANAGER_INTERFACE,
+		in_signature='a{sv}su',
+		out_signature='a{oa{sa{sv}}}s')
+	def GetManagedObjectsFiltered(self, filters, cursor, limit):
+		"""
+		Same as org.freedesktop.DBus.ObjectManager.GetManagedObjects, but
+		only for the objects matching all of the supplied filters and
+		optionally a page at a time.
+
+		:param filters: Dictionary with any of the keys:
+						'interface' (s) objects implementing the interface
+						'vg' (s) objects in the VG, which is given by object
+							path, name or uuid, the VG object included
+						'tag' (s) objects having the tag
+						'name' (s) objects whose Name matches the glob
+		:param cursor:  '' for the first page, else the cursor returned with
+						the previous page
+		:param limit:   Maximum number of objects to return, 0 = no limit
+		:return: (objects, cursor for the next page, '' if this is the last)
+		"""
+		args = {}
+		for k, v in filters.items():
+			if k not in Manager._query_filters:
+				raise dbus.exceptions.DBusException(
+					MANAGER_INTERFACE, 'Unknown filter %s' % k)
+			args[Manager._query_filters[k]] = str(v)
+
+		if 'vg_uuid' in args:
+			key = args['vg_uuid']
+			if key.startswith('/'):
+				vg = cfg.om.get_object_by_path(key)
+			else:
+				vg = cfg.om.get_object_by_lvm_id(key)
+
+			if vg is None or VG_INTERFACE not in vg.interface():
+				raise dbus.exceptions.DBusException(
+					MANAGER_INTERFACE, 'VG %s not found' % key)
+			args['vg_uuid'] = vg.Uuid
+
+		return cfg.om.query_objects(cursor=cursor, limit=limit, **args)
+
+	@dbus.service.method(
+		dbus_interface=MANAGER_INTERFACE,
+		out_signature='a{sv}')
+	def GetStatistics(self):
+		"""
+		Where the time goes, to tell whether the latency of requests comes
+		from lvm or from the daemon.  Histograms are dictionaries of
+		'count', 'total', 'max', 'bounds' (upper bound of each bucket) and
+		'buckets' (one more than bounds, the last is for anything above).
+
+		:return: Dictionary of:
+				'lvm_commands' lvm sub command -> 'failures' and the
+					histograms 'wall_time' and 'lock_wait' (seconds waiting
+					for an lvm shell) and 'stdout_bytes'
+				'lvm_total_time', 'lvm_total_count' over all commands
+				'refreshes' 'full' and 'incremental' -> histogram of the
+					data store refresh durations
+				'requests' queue depth and timing of the request executor
+				'events' external events and the refreshes they caused
+				'signals' emitted and coalesced property change signals
+		"""
+		with cmdhandler.stats_lock:
+			total_time = cmdhandler.total_time
+			total_count = cmdhandler.total_count
+
+		return utils.to_dbus(dict(
+			lvm_commands=stats.commands(),
+			lvm_total_time=total_time, lvm_total_count=total_count,
+			refreshes=stats.refreshes(),
+			requests=cfg.worker_q.statistics(),
+			events=refresh.statistics(),
+			signals=signalbatch.statistics()))
+
+	@dbus.service.method(
+		dbus_interface=MANAGER_INTERFACE,
+		out_signature='a{sv}')
+	def GetRequestTraces(self):
+		"""
+		Where the recently completed requests spent their time, also
+		written to the log when the daemon gets SIGUSR1.  Histograms are
+		as with GetStatistics.
+
+		:return: Dictionary of:
+				'requests' array of the kept traces, oldest first, each a
+					dictionary of 'method', 'error', 'lvm_commands',
+					'lvm_time', 'refreshes', 'refresh_time' and the time
+					stamps (seconds since the epoch) present of 'enqueue',
+					'dequeue', 'lvm_start', 'lvm_end', 'refresh_start',
+					'refresh_end', 'reply' and 'done'
+				'methods' method -> 'count', 'errors', 'lvm_commands',
+					'lvm_time', 'refreshes', 'refresh_time' and histograms
+					'queue_wait', 'run_time' and 'latency' (queued to reply)
+		"""
+		requests, methods = requesttrace.traces()
+		return utils.to_dbus(dict(requests=requests, methods=methods))
+
 	@dbus.service.method(
 		dbus_interface=MANAGER_INTERFACE,
 		in_signature='b')
@@ -205,9 +317,10 @@ class Manager(AutomatedProperties):
 		dbus_interface=MANAGER_INTERFACE,
 		in_signature='bbasa(ii)ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def PvScan(self, activate, cache, device_paths, major_minors,
-			tmo, scan_options, cb, cbe):
+			tmo, scan_options, cb, cbe, sender):
 		"""
 		Scan all supported LVM block devices in the system for physical volumes
 		NOTE: major_minors & device_paths only usable when cache == True
@@ -219,6 +332,7 @@ class Manager(AutomatedProperties):
 		:param scan_options:  Additional options to pvscan
 		:param cb: Not visible in API (used for async. callback)
 		:param cbe: Not visible in API (used for async. error callback)
+		:param sender: Not visible in API (bus name of the caller)
 		:return: '/' if operation done, else job path
 		"""
 		for d in device_paths:
@@ -227,7 +341,7 @@ class Manager(AutomatedProperties):
 		r = RequestEntry(
 			tmo, Manager._pv_scan,
 			(activate, cache, device_paths, major_minors,
-			scan_options), cb, cbe, False)
+			scan_options), cb, cbe, False, sender=sender)
 		cfg.worker_q.put(r)
 
 	@property
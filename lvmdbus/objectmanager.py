@@ -10,10 +10,16 @@
 import sys
 import threading
 import traceback
+import fnmatch
+import bisect
+import itertools
+from contextlib import contextmanager
 import dbus
 from . import cfg
 from .utils import log_debug
 from .automatedproperties import AutomatedProperties
+from .state import State
+from . import signalbatch
 
 
 # noinspection PyPep8Naming
@@ -28,23 +34,142 @@ class ObjectManager(AutomatedProperties):
 		self._ap_o_path = object_path
 		self._objects = {}
 		self._id_to_object_path = {}
-		self.rlock = threading.RLock()
+
+		# Lookups and GetManagedObjects only need to read the tables, so
+		# they can run together, changes to them are exclusive
+		self.rwlock = RwLock()
+
+		# Object path -> properties for GetManagedObjects
+		self._managed = {}
+
+		# Secondary indexes, class -> object paths, interface -> object paths,
+		# vg uuid -> object paths and object path -> the vg uuid it was
+		# indexed under
+		self._class_paths = {}
+		self._interface_paths = {}
+		self._vg_paths = {}
+		self._path_vg = {}
+
+		# For query_objects, tag -> object paths, name -> object paths,
+		# object path -> (tags, name) it was indexed under and all the
+		# paths which have an object
+		self._tag_paths = {}
+		self._name_paths = {}
+		self._path_query_keys = {}
+		self._all_paths = PathSet()
 
 	@dbus.service.method(
 		dbus_interface="org.freedesktop.DBus.ObjectManager",
 		out_signature='a{oa{sa{sv}}}')
 	def GetManagedObjects(self):
-		with self.rlock:
+		with self.rwlock.read_locked():
 			rc = {}
 			try:
 				for k, v in list(self._objects.items()):
-					path, props = v[0].emit_data()
-					rc[path] = props
+					rc[k] = self._managed_props(k, v[0])
 			except Exception:
 				traceback.print_exc(file=sys.stdout)
 				sys.exit(1)
 			return rc
 
+	def _managed_props(self, path, obj):
+		# Note: Only called internally, lock implied
+		props = self._managed.get(path)
+		if props is None:
+			props = obj.emit_data()[1]
+			if obj._ap_cache_props:
+				self._managed[path] = props
+		return props
+
+	def query_objects(self, interface=None, vg_uuid=None, tag=None,
+						name_glob=None, cursor='', limit=0):
+		"""
+		Return a subset of what GetManagedObjects does, the candidates come
+		from the indexes, walked in object path order from the cursor.  A
+		name glob with wildcards is matched against the indexed names.
+		:param interface:   Only objects implementing this interface
+		:param vg_uuid:     Only objects in this VG (including the VG)
+		:param tag:         Only objects which have this tag
+		:param name_glob:   Only objects whose Name matches this glob
+		:param cursor:      Only objects with a path after this one
+		:param limit:       Maximum number of objects to return, 0 = all
+		:return: (dict like GetManagedObjects, cursor for the next page or
+					'' when there are no more)
+		"""
+		with self.rwlock.read_locked():
+			indexes = []
+
+			if interface is not None:
+				indexes.append(self._interface_paths.get(interface))
+
+			if vg_uuid is not None:
+				indexes.append(self._vg_paths.get(vg_uuid))
+
+			if tag is not None:
+				indexes.append(self._tag_paths.get(tag))
+
+			if name_glob is not None and \
+					not any(c in name_glob for c in '*?['):
+				indexes.append(self._name_paths.get(name_glob))
+				name_glob = None
+
+			if None in indexes:
+				return {}, ''
+
+			# Walk the smallest, checking the others as we go
+			indexes.sort(key=len)
+			if not indexes:
+				indexes.append(self._all_paths)
+
+			rc = {}
+			last = ''
+			next_cursor = ''
+
+			for path in indexes[0].after(cursor):
+				if not all(path in i for i in indexes[1:]):
+					continue
+
+				if name_glob is not None and not fnmatch.fnmatchcase(
+						self._path_query_keys[path][1], name_glob):
+					continue
+
+				obj = self._objects[path][0]
+
+				if limit and len(rc) == limit:
+					next_cursor = last
+					break
+
+				rc[path] = self._managed_props(path, obj)
+				last = path
+
+			return rc, next_cursor
+
+	@staticmethod
+	def _query_keys(obj):
+		"""
+		:return: (tags, name) of the object which query_objects filters on
+		"""
+		return (tuple(getattr(obj, 'Tags', ())),
+				str(getattr(obj, 'Name', '')))
+
+	def query_keys_changed(self, obj):
+		"""
+		:return: True if the tags or name of the object are no longer what
+					it is indexed under, see lookup_update
+		"""
+		with self.rwlock.read_locked():
+			return self._path_query_keys.get(obj.dbus_object_path()) != \
+				ObjectManager._query_keys(obj)
+
+	def invalidate(self, path):
+		"""
+		The properties of the object have changed, forget what we have cached
+		for it.
+		:param path: Object path
+		"""
+		with self.rwlock.write_locked():
+			self._managed.pop(path, None)
+
 	def locked(self):
 		"""
 		If some external code need to run across a number of different
@@ -52,7 +177,7 @@ class ObjectManager(AutomatedProperties):
 		to lock others out.
 		:return:
 		"""
-		return ObjectManagerLock(self.rlock)
+		return ObjectManagerLock(self.rwlock)
 
 	@dbus.service.signal(
 		dbus_interface="org.freedesktop.DBus.ObjectManager",
@@ -89,6 +214,25 @@ class ObjectManager(AutomatedProperties):
 		if uuid:
 			self._id_to_object_path[uuid] = path
 
+		# Forward created paths don't have an object yet
+		if obj is not None:
+			self._class_paths.setdefault(type(obj), set()).add(path)
+			self._all_paths.add(path)
+
+			for i in obj.interface():
+				self._interface_paths.setdefault(i, PathSet()).add(path)
+
+			if isinstance(obj.state, State):
+				vg_uuid = obj.state.containing_vg_uuid()
+				self._vg_paths.setdefault(vg_uuid, PathSet()).add(path)
+				self._path_vg[path] = vg_uuid
+
+			tags, name = keys = ObjectManager._query_keys(obj)
+			self._path_query_keys[path] = keys
+			for t in tags:
+				self._tag_paths.setdefault(t, PathSet()).add(path)
+			self._name_paths.setdefault(name, PathSet()).add(path)
+
 	def _lookup_remove(self, obj_path):
 		# Note: Only called internally, lock implied
 		if obj_path in self._objects:
@@ -97,21 +241,84 @@ class ObjectManager(AutomatedProperties):
 			del self._id_to_object_path[uuid]
 			del self._objects[obj_path]
 
+			if obj is not None:
+				self._class_paths[type(obj)].discard(obj_path)
+				self._all_paths.discard(obj_path)
+
+				for i in obj.interface():
+					self._interface_paths[i].discard(obj_path)
+
+			if obj_path in self._path_vg:
+				vg_uuid = self._path_vg.pop(obj_path)
+				_index_discard(self._vg_paths, vg_uuid, obj_path)
+
+			if obj_path in self._path_query_keys:
+				tags, name = self._path_query_keys.pop(obj_path)
+				for t in tags:
+					_index_discard(self._tag_paths, t, obj_path)
+				_index_discard(self._name_paths, name, obj_path)
+
 	def lookup_update(self, dbus_obj, new_uuid, new_lvm_id):
-		with self.rlock:
+		with self.rwlock.write_locked():
 			obj_path = dbus_obj.dbus_object_path()
 			self._lookup_remove(obj_path)
 			self._lookup_add(
 				dbus_obj, obj_path,
 				new_lvm_id, new_uuid)
 
-	def object_paths_by_type(self, o_type):
-		with self.rlock:
+	def object_ids(self):
+		"""
+		:return: [(object path, lvm id, uuid)] for the objects representing
+					lvm assets
+		"""
+		with self.rwlock.read_locked():
+			return [(path, lvm_id, uuid)
+					for path, (obj, lvm_id, uuid) in self._objects.items()
+					if obj is not None and
+					isinstance(getattr(obj, 'state', None), State)]
+
+	def reserve_paths(self, ids):
+		"""
+		Forward create paths for lvm assets, so they end up at these rather
+		than newly generated ones when they get registered
+		:param ids: [(object path, lvm id, uuid)] as object_ids() returns
+		"""
+		with self.rwlock.write_locked():
+			for path, lvm_id, uuid in ids:
+				if path not in self._objects and \
+						lvm_id not in self._id_to_object_path and \
+						uuid not in self._id_to_object_path:
+					self._lookup_add(None, path, lvm_id, uuid)
+
+	def release_paths(self, paths):
+		"""
+		Drop the forward created paths which never got an object
+		:param paths: Object paths to check
+		"""
+		with self.rwlock.write_locked():
+			for path in paths:
+				if path in self._objects and self._objects[path][0] is None:
+					self._lookup_remove(path)
+
+	def object_paths_by_type(self, o_type, vg_uuids=None):
+		"""
+		Return the object paths of the specified type(s)
+		:param o_type:   Tuple of classes
+		:param vg_uuids: Optional, limit to objects belonging to these VGs
+		:return: dict with the object paths as keys
+		"""
+		with self.rwlock.read_locked():
 			rc = {}
 
-			for k, v in list(self._objects.items()):
-				if isinstance(v[0], o_type):
-					rc[k] = True
+			if vg_uuids is None:
+				for cls, paths in self._class_paths.items():
+					if issubclass(cls, o_type):
+						rc.update(dict.fromkeys(paths, True))
+			else:
+				for vg_uuid in vg_uuids:
+					for path in self._vg_paths.get(vg_uuid, ()):
+						if isinstance(self._objects[path][0], o_type):
+							rc[path] = True
 			return rc
 
 	def register_object(self, dbus_object, emit_signal=False):
@@ -120,7 +327,7 @@ class ObjectManager(AutomatedProperties):
 		:param dbus_object: Dbus object to register
 		:param emit_signal: If true emit a signal for interfaces added
 		"""
-		with self.rlock:
+		with self.rwlock.write_locked():
 			path, props = dbus_object.emit_data()
 
 			# print 'Registering object path %s for %s' %
@@ -131,8 +338,13 @@ class ObjectManager(AutomatedProperties):
 			self._lookup_add(dbus_object, path, dbus_object.lvm_id,
 				dbus_object.Uuid)
 
+			if dbus_object._ap_cache_props:
+				self._managed[path] = props
+			else:
+				self._managed.pop(path, None)
+
 			if emit_signal:
-				self.InterfacesAdded(path, props)
+				signalbatch.interfaces_added(self, path, props)
 
 	def remove_object(self, dbus_object, emit_signal=False):
 		"""
@@ -141,7 +353,7 @@ class ObjectManager(AutomatedProperties):
 		:param dbus_object:  Dbus object to remove
 		:param emit_signal:  If true emit the interfaces removed signal
 		"""
-		with self.rlock:
+		with self.rwlock.write_locked():
 			# Store off the object path and the interface first
 			path = dbus_object.dbus_object_path()
 			interfaces = dbus_object.interface()
@@ -150,13 +362,14 @@ class ObjectManager(AutomatedProperties):
 			#      (path, dbus_object.lvm_id)
 
 			self._lookup_remove(path)
+			self._managed.pop(path, None)
 
 			# Remove from dbus library
 			dbus_object.remove_from_connection(cfg.bus, path)
 
 			# Optionally emit a signal
 			if emit_signal:
-				self.InterfacesRemoved(path, interfaces)
+				signalbatch.interfaces_removed(self, path, interfaces)
 
 	def get_object_by_path(self, path):
 		"""
@@ -164,22 +377,21 @@ class ObjectManager(AutomatedProperties):
 		:param path: The dbus path
 		:return: The object
 		"""
-		with self.rlock:
+		with self.rwlock.read_locked():
 			if path in self._objects:
 				return self._objects[path][0]
 			return None
 
 	def get_object_by_uuid_lvm_id(self, uuid, lvm_id):
-		with self.rlock:
-			return self.get_object_by_path(
-				self.get_object_path_by_lvm_id(uuid, lvm_id, None, False))
+		return self.get_object_by_path(
+			self.get_object_path_by_lvm_id(uuid, lvm_id, None, False))
 
 	def get_object_by_lvm_id(self, lvm_id):
 		"""
 		Given an lvm identifier, return the object registered for it
 		:param lvm_id: The lvm identifier
 		"""
-		with self.rlock:
+		with self.rwlock.read_locked():
 			if lvm_id in self._id_to_object_path:
 				return self.get_object_by_path(self._id_to_object_path[lvm_id])
 			return None
@@ -200,6 +412,34 @@ class ObjectManager(AutomatedProperties):
 				obj = self.get_object_by_path(path)
 				self._lookup_add(obj, path, lvm_id, uuid)
 
+	def _path_lookup(self, uuid, lvm_id, gen_new):
+		"""
+		Read only version of the lookup done by get_object_path_by_lvm_id
+		NOTE: Internal call, assumes under object manager lock
+		:return: (path, True) if nothing else needs doing, else (None, False)
+		"""
+		if lvm_id in self._id_to_object_path:
+			if lvm_id == uuid or uuid in self._id_to_object_path:
+				return self._id_to_object_path[lvm_id], True
+			return None, False
+
+		if "/" in lvm_id:
+			vg, lv = lvm_id.split("/", 1)
+			int_lvm_id = vg + "/" + ("[%s]" % lv)
+			if int_lvm_id in self._id_to_object_path:
+				if int_lvm_id == uuid or uuid in self._id_to_object_path:
+					return self._id_to_object_path[int_lvm_id], True
+				return None, False
+
+		if uuid in self._id_to_object_path:
+			if uuid == lvm_id:
+				return self._id_to_object_path[uuid], True
+			return None, False
+
+		if gen_new:
+			return None, False
+		return None, True
+
 	def get_object_path_by_lvm_id(self, uuid, lvm_id, path_create=None,
 								gen_new=True):
 		"""
@@ -211,13 +451,20 @@ class ObjectManager(AutomatedProperties):
 		:param path_create: If true create an object path if not found
 		:param gen_new: The function used to create the new path
 		"""
-		with self.rlock:
-			assert lvm_id
-			assert uuid
+		assert lvm_id
+		assert uuid
+
+		if gen_new:
+			assert path_create
 
-			if gen_new:
-				assert path_create
+		# Nearly every call finds what it's looking for without needing to
+		# change anything, so try that with just the read lock first
+		with self.rwlock.read_locked():
+			path, done = self._path_lookup(uuid, lvm_id, gen_new)
+			if done:
+				return path
 
+		with self.rwlock.write_locked():
 			path = None
 
 			if lvm_id in self._id_to_object_path:
@@ -256,6 +503,55 @@ class ObjectManager(AutomatedProperties):
 			return path
 
 
+class PathSet(object):
+	"""
+	A set of object paths which can also be walked in order from a given
+	path on.  The sorted list is built when first needed after a change,
+	so paging through an unchanging set only sorts it once.
+	"""
+
+	def __init__(self):
+		self._paths = set()
+		self._sorted = None
+
+	def add(self, path):
+		if path not in self._paths:
+			self._paths.add(path)
+			self._sorted = None
+
+	def discard(self, path):
+		if path in self._paths:
+			self._paths.remove(path)
+			self._sorted = None
+
+	def __contains__(self, path):
+		return path in self._paths
+
+	def __len__(self):
+		return len(self._paths)
+
+	def __iter__(self):
+		return iter(self._paths)
+
+	def after(self, cursor):
+		"""
+		:return: Iterator over the paths greater than cursor, in order
+		"""
+		ordered = self._sorted
+		if ordered is None:
+			ordered = self._sorted = sorted(self._paths)
+		return itertools.islice(
+			ordered, bisect.bisect_right(ordered, cursor), None)
+
+
+def _index_discard(index, key, path):
+	# Drop the path from index[key] and the key once nothing is left
+	paths = index[key]
+	paths.discard(path)
+	if not paths:
+		del index[key]
+
+
 class ObjectManagerLock(object):
 	"""
 	The sole purpose of this class is to allow other code the ability to
@@ -268,15 +564,92 @@ class ObjectManagerLock(object):
 	correctly)
 	"""
 
-	def __init__(self, recursive_lock):
-		self._lock = recursive_lock
+	def __init__(self, rw_lock):
+		self._lock = rw_lock
 
 	def __enter__(self):
 		# Acquire lock
-		self._lock.acquire()
+		self._lock.acquire_write()
 
 	# noinspection PyUnusedLocal
 	def __exit__(self, e_type, e_value, e_traceback):
 		# Release lock
-		self._lock.release()
+		self._lock.release_write()
 		self._lock = None
+
+
+class RwLock(object):
+	"""
+	Reader/writer lock, any number of readers or a single writer.  Both are
+	recursive and the writer can take the read lock too, but a reader
+	can't upgrade to the writer.  Writers are preferred, once one is
+	waiting no new readers get in, so a stream of lookups can't starve
+	a refresh.
+	"""
+
+	def __init__(self):
+		self._cond = threading.Condition(threading.Lock())
+		self._readers = {}		# thread ident -> recursion count
+		self._writer = None
+		self._write_count = 0
+		self._writers_waiting = 0
+
+	def acquire_read(self):
+		me = threading.get_ident()
+		with self._cond:
+			if self._writer != me and me not in self._readers:
+				while self._writer is not None or self._writers_waiting:
+					self._cond.wait()
+			self._readers[me] = self._readers.get(me, 0) + 1
+
+	def release_read(self):
+		me = threading.get_ident()
+		with self._cond:
+			self._readers[me] -= 1
+			if not self._readers[me]:
+				del self._readers[me]
+				self._cond.notify_all()
+
+	def acquire_write(self):
+		me = threading.get_ident()
+		with self._cond:
+			if self._writer == me:
+				self._write_count += 1
+				return
+
+			if me in self._readers:
+				raise RuntimeError(
+					"Can't upgrade a read lock to a write lock")
+
+			self._writers_waiting += 1
+			try:
+				while self._writer is not None or self._readers:
+					self._cond.wait()
+			finally:
+				self._writers_waiting -= 1
+
+			self._writer = me
+			self._write_count = 1
+
+	def release_write(self):
+		with self._cond:
+			self._write_count -= 1
+			if not self._write_count:
+				self._writer = None
+				self._cond.notify_all()
+
+	@contextmanager
+	def read_locked(self):
+		self.acquire_read()
+		try:
+			yield
+		finally:
+			self.release_read()
+
+	@contextmanager
+	def write_locked(self):
+		self.acquire_write()
+		try:
+			yield
+		finally:
+			self.release_write()
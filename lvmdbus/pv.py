@@ -22,34 +22,44 @@ from .utils import round_size
 
 
 # noinspection PyUnusedLocal
-def pvs_state_retrieve(selection, cache_refresh=True):
+def pvs_state_retrieve(selection, cache_refresh=True, vg_uuids=None,
+						skip=None):
 	rc = []
 
 	if cache_refresh:
 		cfg.db.refresh()
 
-	for p in cfg.db.fetch_pvs(selection):
-		rc.append(
-			PvState(
-				p["pv_name"], p["pv_uuid"], p["pv_name"],
-				p["pv_fmt"], n(p["pv_size"]), n(p["pv_free"]),
-				n(p["pv_used"]), n(p["dev_size"]), n(p["pv_mda_size"]),
-				n(p["pv_mda_free"]), int(p["pv_ba_start"]),
-				n(p["pv_ba_size"]), n(p["pe_start"]),
-				int(p["pv_pe_count"]), int(p["pv_pe_alloc_count"]),
-				p["pv_attr"], p["pv_tags"], p["vg_name"], p["vg_uuid"]))
+	for p in cfg.db.fetch_pvs(selection, vg_uuids):
+		if skip and p["pv_uuid"] in skip:
+			continue
+
+		rc.append(PvState(
+			p["pv_name"], p["pv_uuid"], p["pv_name"],
+			p["pv_fmt"], n(p["pv_size"]), n(p["pv_free"]),
+			n(p["pv_used"]), n(p["dev_size"]), n(p["pv_mda_size"]),
+			n(p["pv_mda_free"]), int(p["pv_ba_start"]),
+			n(p["pv_ba_size"]), n(p["pe_start"]),
+			int(p["pv_pe_count"]), int(p["pv_pe_alloc_count"]),
+			p["pv_attr"], p["pv_tags"], p["vg_name"], p["vg_uuid"],
+			cfg.db.digest(p["pv_uuid"])))
 	return rc
 
 
 def load_pvs(device=None, object_path=None, refresh=False, emit_signal=False,
-		cache_refresh=True):
+		cache_refresh=True, vg_uuids=None):
 	return common(
 		pvs_state_retrieve, (Pv,), device, object_path, refresh,
-		emit_signal, cache_refresh)
+		emit_signal, cache_refresh, vg_uuids)
 
 
 # noinspection PyUnresolvedReferences
 class PvState(State):
+	__slots__ = ('lvm_path', 'Uuid', 'Name', 'Fmt', 'SizeBytes', 'FreeBytes',
+					'UsedBytes', 'DevSizeBytes', 'MdaSizeBytes', 'MdaFreeBytes',
+					'BaStart', 'BaSizeBytes', 'PeStart', 'PeCount',
+					'PeAllocCount', 'attr', 'Tags', 'vg_name', 'vg_uuid',
+					'pe_segments', 'lv', 'vg_path')
+
 	@property
 	def lvm_id(self):
 		return self.lvm_path
@@ -76,9 +86,29 @@ class PvState(State):
 			Fmt, SizeBytes, FreeBytes, UsedBytes, DevSizeBytes,
 			MdaSizeBytes, MdaFreeBytes, BaStart, BaSizeBytes,
 			PeStart, PeCount, PeAllocCount, attr, Tags, vg_name,
-			vg_uuid):
-		utils.init_class_from_arguments(self)
-		self.pe_segments = cfg.db.pv_pe_segments(Uuid)
+			vg_uuid, digest=None):
+		self.lvm_path = lvm_path
+		self.Uuid = Uuid
+		self.Name = Name
+		self.Fmt = Fmt
+		self.SizeBytes = SizeBytes
+		self.FreeBytes = FreeBytes
+		self.UsedBytes = UsedBytes
+		self.DevSizeBytes = DevSizeBytes
+		self.MdaSizeBytes = MdaSizeBytes
+		self.MdaFreeBytes = MdaFreeBytes
+		self.BaStart = BaStart
+		self.BaSizeBytes = BaSizeBytes
+		self.PeStart = PeStart
+		self.PeCount = PeCount
+		self.PeAllocCount = PeAllocCount
+		self.attr = attr
+		self.Tags = Tags
+		self.vg_name = vg_name
+		self.vg_uuid = vg_uuid
+		self.digest = digest
+
+		self.pe_segments = dbus.Array(cfg.db.pv_pe_segments(Uuid), '(tt)')
 
 		self.lv = self._lv_object_list(vg_name)
 
@@ -91,6 +121,9 @@ class PvState(State):
 	def identifiers(self):
 		return (self.Uuid, self.lvm_path)
 
+	def containing_vg_uuid(self):
+		return self.vg_uuid
+
 	def create_dbus_object(self, path):
 		if not path:
 			path = cfg.om.get_object_path_by_lvm_id(self.Uuid, self.Name,
@@ -160,12 +193,14 @@ class Pv(AutomatedProperties):
 		dbus_interface=PV_INTERFACE,
 		in_signature='ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Remove(self, tmo, remove_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Remove(self, tmo, remove_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Pv._remove,
 			(self.Uuid, self.lvm_id, remove_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -177,7 +212,7 @@ class Pv(AutomatedProperties):
 			rc, out, err = cmdhandler.pv_resize(pv_name, new_size_bytes,
 												resize_options)
 			if rc == 0:
-				dbo.refresh()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 			else:
 				raise dbus.exceptions.DBusException(
 					PV_INTERFACE,
@@ -193,12 +228,14 @@ class Pv(AutomatedProperties):
 		dbus_interface=PV_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def ReSize(self, new_size_bytes, tmo, resize_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def ReSize(self, new_size_bytes, tmo, resize_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Pv._resize,
 			(self.Uuid, self.lvm_id, round_size(new_size_bytes),
-			resize_options), cb, cbe, False)
+			resize_options), cb, cbe, False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -210,7 +247,7 @@ class Pv(AutomatedProperties):
 			rc, out, err = cmdhandler.pv_allocatable(
 				pv_name, yes_no, allocation_options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[dbo.state.containing_vg_uuid()])
 			else:
 				raise dbus.exceptions.DBusException(
 					PV_INTERFACE, 'Exit code %s, stderr = %s' % (str(rc), err))
@@ -225,13 +262,15 @@ class Pv(AutomatedProperties):
 		dbus_interface=PV_INTERFACE,
 		in_signature='bia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def AllocationEnabled(self, yes, tmo, allocation_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def AllocationEnabled(self, yes, tmo, allocation_options, cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Pv._allocation_enabled,
 			(self.Uuid, self.lvm_id,
 			yes, allocation_options),
-			cb, cbe, False)
+			cb, cbe, False,
+			lock_key=self.state.vg_uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@property
@@ -240,9 +279,7 @@ class Pv(AutomatedProperties):
 
 	@property
 	def PeSegments(self):
-		if len(self.state.pe_segments):
-			return self.state.pe_segments
-		return dbus.Array([], '(tt)')
+		return self.state.pe_segments
 
 	@property
 	def Exportable(self):
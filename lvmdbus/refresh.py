@@ -8,38 +8,127 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 # Try and minimize the refreshes we do.
+#
+# External events (udev, Manager.ExternalEvent) tend to arrive in bursts.
+# Each event gets a sequence number, a full load records the sequence
+# number current when it starts as it will pick up everything that happened
+# before that.  The scheduler thread waits for the events to stop for
+# cfg.EVENT_QUIET_PERIOD seconds, but no longer than cfg.EVENT_MAX_LATENCY
+# seconds after the first one, before it queues a single refresh request
+# and only if no full load has started since the last event.
 
 import threading
+import time
 from .request import RequestEntry
 from . import cfg
 from . import utils
 
-_rlock = threading.RLock()
-_count = 0
+_cond = threading.Condition()
+
+# Sequence number of the last event
+_event_seq = 0
+
+# Sequence number of the last event a full load has covered
+_covered_seq = 0
+
+# Time of the first and last uncovered events
+_first_event = None
+_last_event = None
+
+# We have a refresh request sitting in the worker queue
+_queued = False
+
+# Statistics
+_num_events = 0
+_num_refreshes = 0
+
+
+def _pending():
+	return _event_seq > _covered_seq
+
+
+def full_load_started():
+	"""
+	Called when a full load begins, all events up to now will be
+	reflected in it.
+	"""
+	global _covered_seq
+	global _first_event
+	global _last_event
+	with _cond:
+		_covered_seq = _event_seq
+		_first_event = None
+		_last_event = None
 
 
 def handle_external_event(command):
+	global _queued
+	global _num_refreshes
+
+	with _cond:
+		_queued = False
+		_cond.notify()
+		if not _pending():
+			utils.log_debug("External event: '%s', covered" % command)
+			return
+		_num_refreshes += 1
+
 	utils.log_debug("External event: '%s'" % command)
-	event_complete()
 	cfg.load()
 
 
 def event_add(params):
-	global _rlock
-	global _count
-	with _rlock:
-		if _count == 0:
-			_count += 1
-			r = RequestEntry(
-				-1, handle_external_event,
-				params, None, None, False)
-			cfg.worker_q.put(r)
-
-
-def event_complete():
-	global _rlock
-	global _count
-	with _rlock:
-		if _count > 0:
-			_count -= 1
-		return _count
+	global _event_seq
+	global _first_event
+	global _last_event
+	global _num_events
+
+	with _cond:
+		now = time.time()
+		_event_seq += 1
+		_num_events += 1
+		if _first_event is None:
+			_first_event = now
+		_last_event = now
+		_cond.notify()
+
+
+def _ready(now):
+	"""
+	:return: Seconds to wait before queuing a refresh, 0 when it's time
+	"""
+	quiet = _last_event + cfg.EVENT_QUIET_PERIOD - now
+	latency = _first_event + cfg.EVENT_MAX_LATENCY - now
+	return max(0, min(quiet, latency))
+
+
+def scheduler():
+	"""
+	Thread which turns bursts of events into refresh requests
+	"""
+	global _queued
+
+	while cfg.run.value != 0:
+		with _cond:
+			if not _pending() or _queued:
+				_cond.wait(1)
+				continue
+
+			wait = _ready(time.time())
+			if wait > 0:
+				_cond.wait(wait)
+				continue
+
+			_queued = True
+			count = _event_seq - _covered_seq
+
+		utils.log_debug("Queuing refresh for %d external event(s)" % count)
+		r = RequestEntry(
+			-1, handle_external_event,
+			('%d events' % count,), None, None, False)
+		cfg.worker_q.put(r)
+
+
+def statistics():
+	with _cond:
+		return dict(events=_num_events, refreshes=_num_refreshes)
@@ -14,17 +14,27 @@ from .job import Job
 from . import cfg
 import traceback
 from .utils import log_error
+from .requesttrace import Trace
 
 
 class RequestEntry(object):
 	def __init__(self, tmo, method, arguments, cb, cb_error,
-			return_tuple=True):
+			return_tuple=True, lock_key=None, sender=None):
 		self.tmo = tmo
 		self.method = method
 		self.arguments = arguments
 		self.cb = cb
 		self.cb_error = cb_error
 
+		# Requests with the same key are executed one at a time in order,
+		# it can be a tuple of keys, None means the request needs to run by
+		# itself, see executor.py
+		self.lock_key = lock_key
+
+		# Unique bus name of the client which made the request, queued
+		# requests are dropped when it goes away, see executor.py
+		self.sender = sender
+
 		self.timer_id = -1
 		self.lock = threading.RLock()
 		self.done = False
@@ -33,6 +43,7 @@ class RequestEntry(object):
 		self._rc = 0
 		self._rc_error = None
 		self._return_tuple = return_tuple
+		self.trace = Trace(method)
 
 		if self.tmo < 0:
 			# Client is willing to block forever
@@ -55,6 +66,7 @@ class RequestEntry(object):
 	def _return_job(self):
 		self._job = Job(self)
 		cfg.om.register_object(self._job, True)
+		self.trace.mark('reply')
 		if self._return_tuple:
 			self.cb(('/', self._job.dbus_object_path()))
 		else:
@@ -72,6 +84,13 @@ class RequestEntry(object):
 			log_error("Exception returned to client: \n%s" % st)
 			self.register_error(-1, st)
 
+	def has_job(self):
+		"""
+		:return: True if the client was given a job for the request
+		"""
+		with self.lock:
+			return self._job is not False
+
 	def is_done(self):
 		with self.lock:
 			rc = self.done
@@ -99,6 +118,8 @@ class RequestEntry(object):
 			self._rc_error = error
 
 			if not self._job:
+				self.trace.mark('reply')
+
 				# We finished and there is no job, so return result or error
 				# now!
 				# Note: If we don't have a valid cb or cbe, this indicates a
@@ -0,0 +1,214 @@
+# Copyright (C) 2015-2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Where each request spent its time.  Every request records when it was
+# queued, when a worker picked it up, when its lvm commands and data store
+# refreshes ran and when the client got its reply.  The last
+# cfg.TRACE_BUFFER_SIZE completed requests are kept along with aggregates
+# for each method, they can be fetched with Manager.GetRequestTraces or
+# written to the log by sending the daemon SIGUSR1.
+
+import json
+import threading
+import time
+from collections import deque
+from gi.repository import GObject
+
+try:
+	from . import cfg
+	from . import stats
+	from .utils import log_debug, log_error
+except SystemError:
+	import cfg
+	import stats
+	from utils import log_debug, log_error
+
+# Time stamps a trace can have, in the order they normally happen
+EVENTS = ('enqueue', 'dequeue', 'lvm_start', 'lvm_end', 'refresh_start',
+			'refresh_end', 'reply', 'done')
+
+_lock = threading.Lock()
+_traces = deque(maxlen=cfg.TRACE_BUFFER_SIZE)
+_methods = {}
+
+# The trace of the request the thread is running
+_current = threading.local()
+
+
+def _method_name(method):
+	return getattr(method, '__qualname__', None) or str(method)
+
+
+class Trace(object):
+	"""
+	Time stamps and lvm usage of one request
+	"""
+
+	def __init__(self, method):
+		self.method = _method_name(method)
+		self.times = {}
+		self.lvm_commands = 0
+		self.lvm_time = 0.0
+		self.refreshes = 0
+		self.refresh_time = 0.0
+		self.error = False
+
+	def mark(self, event, when=None):
+		"""
+		Record when something happened, only the first time counts
+		:param event: One of EVENTS
+		:param when: Time stamp, defaults to now
+		"""
+		if event not in self.times:
+			self.times[event] = when if when is not None else time.time()
+
+	def span(self, first, last):
+		"""
+		:return: Seconds between two events or None if either is missing
+		"""
+		if first in self.times and last in self.times:
+			return self.times[last] - self.times[first]
+		return None
+
+	def data(self):
+		"""
+		:return: dict of the trace
+		"""
+		rc = dict(method=self.method, lvm_commands=self.lvm_commands,
+					lvm_time=self.lvm_time, refreshes=self.refreshes,
+					refresh_time=self.refresh_time, error=self.error)
+		rc.update(self.times)
+		return rc
+
+
+class MethodStats(object):
+	"""
+	Aggregates over the completed requests of one method
+	"""
+
+	def __init__(self):
+		self.count = 0
+		self.errors = 0
+		self.lvm_commands = 0
+		self.lvm_time = 0.0
+		self.refreshes = 0
+		self.refresh_time = 0.0
+		self.queue_wait = stats.Histogram(stats.TIME_BOUNDS)
+		self.run_time = stats.Histogram(stats.TIME_BOUNDS)
+		self.latency = stats.Histogram(stats.TIME_BOUNDS)
+
+	def add(self, t):
+		self.count += 1
+		self.errors += int(t.error)
+		self.lvm_commands += t.lvm_commands
+		self.lvm_time += t.lvm_time
+		self.refreshes += t.refreshes
+		self.refresh_time += t.refresh_time
+
+		for histogram, first, last in (
+				(self.queue_wait, 'enqueue', 'dequeue'),
+				(self.run_time, 'dequeue', 'done'),
+				(self.latency, 'enqueue', 'reply')):
+			elapsed = t.span(first, last)
+			if elapsed is not None:
+				histogram.add(elapsed)
+
+	def data(self):
+		return dict(count=self.count, errors=self.errors,
+					lvm_commands=self.lvm_commands, lvm_time=self.lvm_time,
+					refreshes=self.refreshes, refresh_time=self.refresh_time,
+					queue_wait=self.queue_wait.data(),
+					run_time=self.run_time.data(),
+					latency=self.latency.data())
+
+
+def started(request):
+	"""
+	A worker thread is about to run the request
+	"""
+	request.trace.mark('dequeue')
+	_current.trace = request.trace
+
+
+def finished(request):
+	"""
+	The worker thread is done with the request, file its trace
+	"""
+	t = request.trace
+	_current.trace = None
+	t.mark('done')
+	t.error = request.get_errors()[0] != 0
+
+	if t.refreshes > 1:
+		log_debug("Method %s did %d refreshes" % (t.method, t.refreshes))
+
+	with _lock:
+		_traces.append(t)
+		m = _methods.get(t.method)
+		if m is None:
+			m = _methods[t.method] = MethodStats()
+		m.add(t)
+
+
+def _running():
+	return getattr(_current, 'trace', None)
+
+
+def lvm_done(start, end):
+	"""
+	An lvm command ran on this thread
+	"""
+	t = _running()
+	if t is not None:
+		t.mark('lvm_start', start)
+		t.times['lvm_end'] = end
+		t.lvm_commands += 1
+		t.lvm_time += end - start
+
+
+def refresh_done(start, end):
+	"""
+	The data store was refreshed on this thread
+	"""
+	t = _running()
+	if t is not None:
+		t.mark('refresh_start', start)
+		t.times['refresh_end'] = end
+		t.refreshes += 1
+		t.refresh_time += end - start
+
+
+def traces():
+	"""
+	:return: (list of the kept traces oldest first,
+				dict of method -> its aggregates)
+	"""
+	with _lock:
+		return ([t.data() for t in _traces],
+				dict((name, m.data()) for name, m in _methods.items()))
+
+
+def _dump():
+	requests, methods = traces()
+	for r in requests:
+		log_error("Trace: %s" % json.dumps(r, sort_keys=True))
+	for name in sorted(methods.keys()):
+		log_error("Trace method %s: %s" %
+					(name, json.dumps(methods[name], sort_keys=True)))
+	return False
+
+
+# noinspection PyUnusedLocal
+def dump_handler(signum, frame):
+	"""
+	Signal handler writing the traces and aggregates to the log.  The
+	signal can arrive while the main thread holds _lock or the log lock,
+	neither of which is re-entrant, so the writing is left to the main loop.
+	"""
+	GObject.idle_add(_dump)
@@ -0,0 +1,204 @@
+# Copyright (C) 2015-2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Collapse the signals a load pass generates.
+#
+# While a thread is inside batched() the PropertiesChanged, InterfacesAdded
+# and InterfacesRemoved signals it sends are queued instead of sent.  Changes
+# to the same object and interface are merged into one PropertiesChanged,
+# changes to an object added in the same batch are folded into its
+# InterfacesAdded, and an object added and then removed again isn't
+# signaled at all.  The queue is sent in order when the outermost batch
+# ends, or sooner if it reaches cfg.SIGNAL_BATCH_MAX signals.  Signals sent
+# by other threads are not affected.
+
+import threading
+from contextlib import contextmanager
+from . import cfg
+from .utils import log_debug
+
+_local = threading.local()
+
+# Statistics
+_stats_lock = threading.Lock()
+_num_emitted = 0
+_num_coalesced = 0
+
+_ADDED = 'added'
+_REMOVED = 'removed'
+_CHANGED = 'changed'
+
+
+class _Batch(object):
+
+	def __init__(self):
+		self.depth = 0
+		self.ops = []			# [kind, path, sender, interface, payload]
+		self.live = 0
+		self.coalesced = 0
+		self.changed = {}		# path -> {interface: pending changed op}
+		self.added = {}			# path -> pending added op
+
+	def append(self, op):
+		self.ops.append(op)
+		self.live += 1
+
+	def drop(self, op):
+		op[0] = None
+		self.live -= 1
+		self.coalesced += 1
+
+	def clear(self):
+		self.ops = []
+		self.live = 0
+		self.changed = {}
+		self.added = {}
+
+
+def _current():
+	"""
+	:return: The batch the calling thread is in or None
+	"""
+	return getattr(_local, 'batch', None)
+
+
+@contextmanager
+def batched():
+	"""
+	Queue up and coalesce the signals sent by this thread until the
+	outermost batched() block ends.
+	"""
+	batch = _current()
+	if batch is None:
+		batch = _local.batch = _Batch()
+
+	batch.depth += 1
+	try:
+		yield
+	finally:
+		batch.depth -= 1
+		if batch.depth == 0:
+			_local.batch = None
+			_flush(batch)
+
+
+def _flush(batch):
+	global _num_emitted
+	global _num_coalesced
+
+	emitted = 0
+	ops = batch.ops
+	coalesced = batch.coalesced
+	batch.clear()
+	batch.coalesced = 0
+
+	for kind, path, sender, interface, payload in ops:
+		if kind == _CHANGED:
+			sender.PropertiesChanged(interface, payload, [])
+		elif kind == _ADDED:
+			sender.InterfacesAdded(path, payload)
+		elif kind == _REMOVED:
+			sender.InterfacesRemoved(path, payload)
+		else:
+			continue
+		emitted += 1
+
+	with _stats_lock:
+		_num_emitted += emitted
+		_num_coalesced += coalesced
+
+	if ops:
+		log_debug("Signals: %d emitted, %d coalesced" % (emitted, coalesced))
+
+
+def _queue(batch, op):
+	batch.append(op)
+	if batch.live >= cfg.SIGNAL_BATCH_MAX:
+		_flush(batch)
+
+
+def properties_changed(dbus_object, interface, changed):
+	"""
+	Send PropertiesChanged for the object, or queue it if in a batch
+	:param dbus_object: Object whose properties changed
+	:param interface:   Interface the properties belong to
+	:param changed:     dict of property name -> new value
+	"""
+	batch = _current()
+	if batch is None:
+		dbus_object.PropertiesChanged(interface, changed, [])
+		return
+
+	# Whatever we send now will be stale, keep cached copies out of the way
+	if cfg.om:
+		cfg.om.invalidate(dbus_object.dbus_object_path())
+
+	path = dbus_object.dbus_object_path()
+
+	added = batch.added.get(path)
+	if added is not None:
+		props = dict(added[4])
+		props[interface] = dict(props.get(interface, {}))
+		props[interface].update(changed)
+		added[4] = props
+		batch.coalesced += 1
+		return
+
+	pending = batch.changed.setdefault(path, {})
+	op = pending.get(interface)
+	if op is not None:
+		op[4].update(changed)
+		batch.coalesced += 1
+		return
+
+	op = [_CHANGED, path, dbus_object, interface, dict(changed)]
+	pending[interface] = op
+	_queue(batch, op)
+
+
+def interfaces_added(object_manager, path, props):
+	"""
+	Send InterfacesAdded from the object manager, or queue it if in a batch
+	"""
+	batch = _current()
+	if batch is None:
+		object_manager.InterfacesAdded(path, props)
+		return
+
+	op = [_ADDED, path, object_manager, None, props]
+	batch.added[path] = op
+	_queue(batch, op)
+
+
+def interfaces_removed(object_manager, path, interfaces):
+	"""
+	Send InterfacesRemoved from the object manager, or queue it if in a batch
+	"""
+	batch = _current()
+	if batch is None:
+		object_manager.InterfacesRemoved(path, interfaces)
+		return
+
+	# Nobody needs to hear about changes to something that's going away
+	for op in batch.changed.pop(path, {}).values():
+		batch.drop(op)
+
+	added = batch.added.pop(path, None)
+	if added is not None:
+		# It came and went within the batch
+		batch.drop(added)
+		batch.coalesced += 1
+		return
+
+	_queue(batch, [_REMOVED, path, object_manager, None, list(interfaces)])
+
+
+def statistics():
+	with _stats_lock:
+		return dict(emitted=_num_emitted, coalesced=_num_coalesced)
@@ -0,0 +1,215 @@
+# Copyright (C) 2015-2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Start up from what we knew last time.
+#
+# Scanning lvm and building every object before we answer anything can take
+# many seconds on a big system.  We save the lvm records the data store has
+# along with the object path each lvm asset was given to cfg.SNAPSHOT_FILE.
+# At startup the objects are built from that instead, at the same paths as
+# before, and a full load is queued to bring them in line with lvm, which
+# only has to touch the objects that actually changed.  A snapshot written
+# by a different version or for different report columns is ignored, one we
+# are unable to build the objects from or to reconcile is thrown away and
+# we fall back to reading everything from lvm.
+
+import os
+import sys
+import errno
+import json
+import itertools
+import traceback
+from . import cfg
+from . import cmdhandler
+from . import lvmdb
+from .utils import log_debug, log_error
+
+SNAPSHOT_VERSION = 1
+
+# Object path prefix -> cfg counter used to generate paths under it
+_PATH_COUNTERS = (
+	(cfg.PV_OBJ_PATH, 'pv_id'),
+	(cfg.VG_OBJ_PATH, 'vg_id'),
+	(cfg.LV_OBJ_PATH, 'lv_id'),
+	(cfg.THIN_POOL_PATH, 'thin_id'),
+	(cfg.CACHE_POOL_PATH, 'cache_pool_id'),
+	(cfg.HIDDEN_LV_PATH, 'hidden_lv'))
+
+
+def _columns():
+	return dict(
+		pv=cmdhandler.PV_COLUMNS + cmdhandler.PV_SEG_COLUMNS,
+		vg=cmdhandler.VG_COLUMNS,
+		lv=cmdhandler.LV_COLUMNS + cmdhandler.LV_SEG_COLUMNS)
+
+
+def save(file_name=None):
+	"""
+	Write what we currently have out, the file is replaced atomically
+	:param file_name: Where to, defaults to cfg.SNAPSHOT_FILE
+	:return: True if the snapshot was written
+	"""
+	file_name = file_name or cfg.SNAPSHOT_FILE
+	if not file_name:
+		return False
+
+	with cfg.load_lock:
+		pvs, vgs, lvs = cfg.db.records()
+		paths = cfg.om.object_ids()
+
+	data = dict(version=SNAPSHOT_VERSION, columns=_columns(),
+				pvs=pvs, vgs=vgs, lvs=lvs, paths=paths)
+
+	tmp = file_name + '.tmp'
+	try:
+		dir_name = os.path.dirname(file_name)
+		if dir_name and not os.path.isdir(dir_name):
+			os.makedirs(dir_name, 0o700)
+
+		fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+		with os.fdopen(fd, 'w') as f:
+			json.dump(data, f)
+			f.flush()
+			os.fsync(f.fileno())
+		os.rename(tmp, file_name)
+	except (IOError, OSError, TypeError, ValueError) as e:
+		log_error("Snapshot: unable to write %s: %s" % (file_name, str(e)))
+		return False
+
+	log_debug("Snapshot: saved %d pvs, %d vgs, %d lvs to %s" %
+				(len(pvs), len(vgs), len(lvs), file_name))
+	return True
+
+
+def _read(file_name):
+	"""
+	:return: The snapshot contents or None if there isn't a usable one
+	"""
+	try:
+		with open(file_name, 'r') as f:
+			data = json.load(f)
+	except (IOError, OSError) as e:
+		log_debug("Snapshot: unable to read %s: %s" % (file_name, str(e)))
+		return None
+	except ValueError as e:
+		log_error("Snapshot: %s is corrupt: %s" % (file_name, str(e)))
+		return None
+
+	if not isinstance(data, dict) or \
+			data.get('version') != SNAPSHOT_VERSION or \
+			data.get('columns') != _columns():
+		log_debug("Snapshot: %s is from a different version, ignoring" %
+					file_name)
+		return None
+
+	return data
+
+
+def _discard(file_name):
+	try:
+		os.unlink(file_name)
+	except OSError as e:
+		if e.errno != errno.ENOENT:
+			log_error("Snapshot: unable to remove %s: %s" %
+						(file_name, str(e)))
+
+
+def _undo(paths):
+	"""
+	Remove what was built from a snapshot, leaving things as they were
+	before restore(), caller must hold cfg.load_lock
+	"""
+	for path, lvm_id, uuid in cfg.om.object_ids():
+		cfg.om.remove_object(cfg.om.get_object_by_path(path))
+	cfg.om.release_paths([p[0] for p in paths])
+	cfg.db = lvmdb.DataStore()
+
+
+def _advance_path_counters(paths):
+	"""
+	Make sure newly generated paths don't collide with the restored ones
+	"""
+	for prefix, counter in _PATH_COUNTERS:
+		highest = -1
+		for path, lvm_id, uuid in paths:
+			if path.startswith(prefix + '/'):
+				try:
+					highest = max(highest, int(path[len(prefix) + 1:]))
+				except ValueError:
+					pass
+
+		current = next(getattr(cfg, counter))
+		setattr(cfg, counter, itertools.count(max(current, highest + 1)))
+
+
+def restore(file_name=None):
+	"""
+	Build the data store and the dbus objects from a saved snapshot
+	:param file_name: Where from, defaults to cfg.SNAPSHOT_FILE
+	:return: True if we are now serving from the snapshot, when False
+				nothing has been changed
+	"""
+	file_name = file_name or cfg.SNAPSHOT_FILE
+	if not file_name:
+		return False
+
+	data = _read(file_name)
+	if data is None:
+		return False
+
+	with cfg.load_lock:
+		db = lvmdb.DataStore()
+		try:
+			paths = [(str(p), str(l), str(u)) for p, l, u in data['paths']]
+			db.restore(data['pvs'], data['vgs'], data['lvs'])
+		except (KeyError, TypeError, ValueError, RuntimeError) as e:
+			log_error("Snapshot: %s is unusable: %s" % (file_name, str(e)))
+			_discard(file_name)
+			return False
+
+		cfg.db = db
+		_advance_path_counters(paths)
+		cfg.om.reserve_paths(paths)
+
+		try:
+			cfg.load(refresh=False, emit_signal=False, cache_refresh=False)
+		except Exception:
+			log_error("Snapshot: unable to build the objects from %s" %
+						file_name)
+			traceback.print_exc(file=sys.stdout)
+			_discard(file_name)
+			_undo(paths)
+			return False
+
+		# Anything which wasn't in the snapshot records doesn't need its path
+		cfg.om.release_paths([p[0] for p in paths])
+
+	log_debug("Snapshot: restored %d pvs, %d vgs, %d lvs from %s" %
+				(len(data['pvs']), len(data['vgs']), len(data['lvs']),
+					file_name))
+	return True
+
+
+def reconcile():
+	"""
+	Bring what was restored from the snapshot in line with lvm, then save
+	the result for next time
+	"""
+	log_debug("Snapshot: reconciling with lvm")
+	try:
+		cfg.load()
+	except Exception:
+		# Don't trust the snapshot again, start over from lvm alone
+		log_error("Snapshot: reconciling failed, reading everything again")
+		traceback.print_exc(file=sys.stdout)
+		_discard(cfg.SNAPSHOT_FILE)
+		with cfg.load_lock:
+			cfg.db = lvmdb.DataStore()
+			cfg.load()
+	save()
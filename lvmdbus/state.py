@@ -11,6 +11,11 @@ from abc import ABCMeta, abstractmethod
 
 
 class State(object, metaclass=ABCMeta):
+	# There is one of these for every object we have, so the subclasses
+	# declare their attributes as slots to keep them small.  digest is the
+	# DataStore digest of the row the state was built from.
+	__slots__ = ('digest',)
+
 	@abstractmethod
 	def lvm_id(self):
 		pass
@@ -23,5 +28,15 @@ class State(object, metaclass=ABCMeta):
 	def create_dbus_object(self, path):
 		pass
 
+	@abstractmethod
+	def containing_vg_uuid(self):
+		"""
+		The uuid of the VG this object belongs to, '' when there isn't one
+		"""
+		pass
+
 	def __str__(self):
-		return '*****\n' + str(self.__dict__) + '\n******\n'
+		values = dict(
+			(k, getattr(self, k, None))
+			for c in type(self).__mro__ for k in getattr(c, '__slots__', ()))
+		return '*****\n' + str(values) + '\n******\n'
@@ -0,0 +1,127 @@
+# Copyright (C) 2015-2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Where the time goes.  Every lvm command we run is recorded against its
+# sub command (pvs, lvcreate, pvmove ...) in histograms of how long it took,
+# how long it waited for an lvm shell to run on and how much it wrote to
+# stdout.  With these and the data store refresh times it can be told
+# whether the latency of a request comes from lvm or from us.
+
+import bisect
+import threading
+
+# Upper bounds of the buckets, anything above the last one goes into an
+# extra bucket on the end
+TIME_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0,
+				2.0, 5.0, 10.0, 30.0, 60.0)
+
+BYTE_BOUNDS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+				16777216, 67108864)
+
+
+class Histogram(object):
+	"""
+	Number of values which fell into each of a fixed set of buckets, along
+	with the count, sum and largest of them
+	"""
+
+	def __init__(self, bounds):
+		self.bounds = bounds
+		self.buckets = [0] * (len(bounds) + 1)
+		self.count = 0
+		self.total = 0
+		self.max = 0
+		self._lock = threading.Lock()
+
+	def add(self, value):
+		with self._lock:
+			self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+			self.count += 1
+			self.total += value
+			self.max = max(self.max, value)
+
+	def data(self):
+		"""
+		:return: dict of the current values
+		"""
+		with self._lock:
+			return dict(count=self.count, total=self.total, max=self.max,
+						bounds=list(self.bounds), buckets=list(self.buckets))
+
+
+class CommandStats(object):
+	"""
+	What we know about one lvm sub command
+	"""
+
+	def __init__(self):
+		self.failures = 0
+		self.wall_time = Histogram(TIME_BOUNDS)
+		self.lock_wait = Histogram(TIME_BOUNDS)
+		self.stdout_bytes = Histogram(BYTE_BOUNDS)
+
+	def data(self):
+		return dict(failures=self.failures, wall_time=self.wall_time.data(),
+					lock_wait=self.lock_wait.data(),
+					stdout_bytes=self.stdout_bytes.data())
+
+
+_lock = threading.Lock()
+_commands = {}
+
+# Data store refreshes, incremental ones which ended up re-reading
+# everything count as full
+_refreshes = dict(full=Histogram(TIME_BOUNDS),
+					incremental=Histogram(TIME_BOUNDS))
+
+
+def command_done(name, wall_time, lock_wait, stdout_bytes, exit_code):
+	"""
+	Record an lvm command which has completed
+	:param name: The lvm sub command, eg. 'lvcreate'
+	:param wall_time: Seconds from asking for it to be run to the result
+	:param lock_wait: Seconds of wall_time spent waiting to run it
+	:param stdout_bytes: Size of what it wrote to stdout
+	:param exit_code: Its exit code
+	"""
+	with _lock:
+		s = _commands.get(name)
+		if s is None:
+			s = _commands[name] = CommandStats()
+		if exit_code != 0:
+			s.failures += 1
+
+	s.wall_time.add(wall_time)
+	s.lock_wait.add(lock_wait)
+	s.stdout_bytes.add(stdout_bytes)
+
+
+def commands():
+	"""
+	:return: dict of sub command name -> dict of its statistics
+	"""
+	with _lock:
+		current = list(_commands.items())
+	return dict((name, s.data()) for name, s in current)
+
+
+def refresh_done(duration, incremental):
+	"""
+	Record a data store refresh
+	:param duration: Seconds it took
+	:param incremental: True if only some of the VGs were re-read
+	"""
+	_refreshes['incremental' if incremental else 'full'].add(duration)
+
+
+def refreshes():
+	"""
+	:return: dict of 'full' and 'incremental' -> dict of their durations
+	"""
+	return dict((kind, h.data()) for kind, h in _refreshes.items())
@@ -57,82 +57,90 @@ def n32(v):
 	return int(float(v))
 
 
-# noinspection PyProtectedMember
-def init_class_from_arguments(obj_instance):
-	for k, v in list(sys._getframe(1).f_locals.items()):
-		if k != 'self':
-			nt = k
+# Class -> {interface: [property metadata, ...]}, see get_class_properties
+_class_properties = {}
 
-			# If the current attribute has a value, but the incoming does
-			# not, don't overwrite it.  Otherwise the default values on the
-			# property decorator don't work as expected.
-			cur = getattr(obj_instance, nt, v)
 
-			# print 'Init class %s = %s' % (nt, str(v))
-			if not (cur and len(str(cur)) and (v is None or len(str(v))) == 0):
-				setattr(obj_instance, nt, v)
-
-
-def get_properties(f):
+def get_class_properties(cls):
 	"""
-	Walks through an object instance or it's parent class(es) and determines
-	which attributes are properties and if they were created to be used for
-	dbus.
-	:param f:   Object to inspect
-	:return:    A dictionary of tuples with each tuple being:
-				0 = An array of dicts with the keys being: p_t, p_name,
-				p_access(type, name, access)
-				1 = Hash of property names and current value
+	Walks through a class and it's parent class(es) and determines which
+	attributes are properties and if they were created to be used for dbus.
+	The result only depends on the class so it's only done once per class.
+	:param cls: Class to inspect
+	:return:    A dictionary keyed by interface of a list of dicts with the
+				keys being: p_t, p_name, p_access (type, name, access)
 	"""
+	interfaces = _class_properties.get(cls)
+	if interfaces is not None:
+		return interfaces
+
 	interfaces = dict()
+	seen = set()
 
-	for c in inspect.getmro(f.__class__):
+	for c in inspect.getmro(cls):
 
 		h = vars(c)
 		for p, value in h.items():
+			if p in seen:
+				continue
+
 			if isinstance(value, property):
 				# We found a property, see if it has a metadata type
 				key = attribute_type_name(p)
 				if key in h:
+					seen.add(p)
 					interface = h[key][1]
 
 					if interface not in interfaces:
-						interfaces[interface] = ([], {})
+						interfaces[interface] = []
 
 					access = ''
-					if getattr(f.__class__, p).fget:
+					if getattr(cls, p).fget:
 						access += 'read'
-					if getattr(f.__class__, p).fset:
+					if getattr(cls, p).fset:
 						access += 'write'
 
-					interfaces[interface][0].append(
+					interfaces[interface].append(
 						dict(
-							p_t=getattr(f, key)[0],
+							p_t=getattr(cls, key)[0],
 							p_name=p,
 							p_access=access))
 
-					interfaces[interface][1][p] = getattr(f, p)
-
+	_class_properties[cls] = interfaces
 	return interfaces
 
 
+def get_property_values(f, interface=None):
+	"""
+	Retrieve the current values of the dbus properties of an object
+	:param f:           Object instance
+	:param interface:   Only retrieve the ones for this interface
+	:return: Dictionary keyed by interface of dicts of property name to value
+	"""
+	rc = dict()
+
+	for intf, props in get_class_properties(f.__class__).items():
+		if interface is None or interface == intf:
+			rc[intf] = dict((p['p_name'], getattr(f, p['p_name']))
+							for p in props)
+
+	return rc
+
+
 def get_object_property_diff(o_prop, n_prop):
 	"""
 	Walk through each object properties and report what has changed and with
 	the new values
-	:param o_prop:   Old keys/values
-	:param n_prop:   New keys/values
+	:param o_prop:   Old values, output from get_property_values
+	:param n_prop:   New values, output from get_property_values
 	:return: hash of properties that have changed and their new value
 	"""
 	rc = {}
 
 	for intf_k, intf_v in o_prop.items():
-		for k, v in list(intf_v[1].items()):
-			# print('Comparing %s:%s to %s:%s' %
-			#      (k, o_prop[intf_k][1][k], k, str(n_prop[intf_k][1][k])))
-			if o_prop[intf_k][1][k] != n_prop[intf_k][1][k]:
-				new_value = n_prop[intf_k][1][k]
-
+		for k, v in intf_v.items():
+			new_value = n_prop[intf_k][k]
+			if v != new_value:
 				if intf_k not in rc:
 					rc[intf_k] = dict()
 
@@ -146,7 +154,7 @@ def add_properties(xml, interface, props):
 	for the specified interface.
 	:param xml:         XML to edit
 	:param interface:   Interface to add the properties too
-	:param props:       Output from get_properties
+	:param props:       Property metadata from get_class_properties
 	:return: updated XML string
 	"""
 	root = Et.fromstring(xml)
@@ -202,6 +210,33 @@ def _dbus_type(t, value):
 	return _type_map.get(t, _pass_through)(value)
 
 
+def to_dbus(value):
+	"""
+	Convert nested dicts and lists of numbers and strings to dbus types.
+	Dicts become a{sv} so that values of different types can be mixed.
+	:param value: What to convert
+	:return: The dbus typed equivalent
+	"""
+	if isinstance(value, dict):
+		return dbus.Dictionary(
+			dict((str(k), to_dbus(v)) for k, v in value.items()),
+			signature='sv')
+	if isinstance(value, (list, tuple)):
+		if value and all(isinstance(v, (int, float)) and
+							not isinstance(v, bool) for v in value):
+			if any(isinstance(v, float) for v in value):
+				return dbus.Array([float(v) for v in value], signature='d')
+			return dbus.Array(value, signature='x')
+		return dbus.Array([to_dbus(v) for v in value], signature='v')
+	if isinstance(value, bool):
+		return dbus.Boolean(value)
+	if isinstance(value, int):
+		return dbus.Int64(value)
+	if isinstance(value, float):
+		return dbus.Double(value)
+	return dbus.String(value)
+
+
 def dbus_property(interface_name, name, dbus_type, doc=None):
 	"""
 	Creates the get/set properties for the given name.  It assumes that the
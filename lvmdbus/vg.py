@@ -23,34 +23,44 @@ from .utils import round_size
 
 
 # noinspection PyUnusedLocal
-def vgs_state_retrieve(selection, cache_refresh=True):
+def vgs_state_retrieve(selection, cache_refresh=True, vg_uuids=None,
+						skip=None):
 	rc = []
 
 	if cache_refresh:
 		cfg.db.refresh()
 
-	for v in cfg.db.fetch_vgs(selection):
-		rc.append(
-			VgState(
-				v['vg_uuid'], v['vg_name'], v['vg_fmt'], n(v['vg_size']),
-				n(v['vg_free']), v['vg_sysid'], n(v['vg_extent_size']),
-				n(v['vg_extent_count']), n(v['vg_free_count']),
-				v['vg_profile'], n(v['max_lv']), n(v['max_pv']),
-				n(v['pv_count']), n(v['lv_count']), n(v['snap_count']),
-				n(v['vg_seqno']), n(v['vg_mda_count']),
-				n(v['vg_mda_free']), n(v['vg_mda_size']),
-				n(v['vg_mda_used_count']), v['vg_attr'], v['vg_tags']))
+	for v in cfg.db.fetch_vgs(selection, vg_uuids):
+		if skip and v['vg_uuid'] in skip:
+			continue
+
+		rc.append(VgState(
+			v['vg_uuid'], v['vg_name'], v['vg_fmt'], n(v['vg_size']),
+			n(v['vg_free']), v['vg_sysid'], n(v['vg_extent_size']),
+			n(v['vg_extent_count']), n(v['vg_free_count']),
+			v['vg_profile'], n(v['max_lv']), n(v['max_pv']),
+			n(v['pv_count']), n(v['lv_count']), n(v['snap_count']),
+			n(v['vg_seqno']), n(v['vg_mda_count']),
+			n(v['vg_mda_free']), n(v['vg_mda_size']),
+			n(v['vg_mda_used_count']), v['vg_attr'], v['vg_tags'],
+			cfg.db.digest(v['vg_uuid'])))
 	return rc
 
 
 def load_vgs(vg_specific=None, object_path=None, refresh=False,
-		emit_signal=False, cache_refresh=True):
+		emit_signal=False, cache_refresh=True, vg_uuids=None):
 	return common(vgs_state_retrieve, (Vg,), vg_specific, object_path, refresh,
-					emit_signal, cache_refresh)
+					emit_signal, cache_refresh, vg_uuids)
 
 
 # noinspection PyPep8Naming,PyUnresolvedReferences,PyUnusedLocal
 class VgState(State):
+	__slots__ = ('Uuid', 'Name', 'Fmt', 'SizeBytes', 'FreeBytes', 'SysId',
+					'ExtentSizeBytes', 'ExtentCount', 'FreeCount', 'Profile',
+					'MaxLv', 'MaxPv', 'PvCount', 'LvCount', 'SnapCount',
+					'Seqno', 'MdaCount', 'MdaFree', 'MdaSizeBytes',
+					'MdaUsedCount', 'attr', 'tags', 'Pvs', 'Lvs')
+
 	@property
 	def lvm_id(self):
 		return self.Name
@@ -58,6 +68,9 @@ class VgState(State):
 	def identifiers(self):
 		return (self.Uuid, self.Name)
 
+	def containing_vg_uuid(self):
+		return self.Uuid
+
 	def _lv_paths_build(self):
 		rc = []
 		for lv in cfg.db.lvs_in_vg(self.Uuid):
@@ -83,8 +96,31 @@ class VgState(State):
 			SizeBytes, FreeBytes, SysId, ExtentSizeBytes,
 			ExtentCount, FreeCount, Profile, MaxLv, MaxPv, PvCount,
 			LvCount, SnapCount, Seqno, MdaCount, MdaFree,
-			MdaSizeBytes, MdaUsedCount, attr, tags):
-		utils.init_class_from_arguments(self)
+			MdaSizeBytes, MdaUsedCount, attr, tags, digest=None):
+		self.Uuid = Uuid
+		self.Name = Name
+		self.Fmt = Fmt
+		self.SizeBytes = SizeBytes
+		self.FreeBytes = FreeBytes
+		self.SysId = SysId
+		self.ExtentSizeBytes = ExtentSizeBytes
+		self.ExtentCount = ExtentCount
+		self.FreeCount = FreeCount
+		self.Profile = Profile
+		self.MaxLv = MaxLv
+		self.MaxPv = MaxPv
+		self.PvCount = PvCount
+		self.LvCount = LvCount
+		self.SnapCount = SnapCount
+		self.Seqno = Seqno
+		self.MdaCount = MdaCount
+		self.MdaFree = MdaFree
+		self.MdaSizeBytes = MdaSizeBytes
+		self.MdaUsedCount = MdaUsedCount
+		self.attr = attr
+		self.tags = tags
+		self.digest = digest
+
 		self.Pvs = self._pv_paths_build()
 		self.Lvs = self._lv_paths_build()
 
@@ -143,10 +179,10 @@ class Vg(AutomatedProperties):
 		self.state = object_state
 
 	@staticmethod
-	def fetch_new_lv(vg_name, lv_name):
+	def fetch_new_lv(vg_uuid, vg_name, lv_name):
 		full_name = "%s/%s" % (vg_name, lv_name)
 
-		cfg.load()
+		cfg.load(vg_uuids=[vg_uuid])
 		l = cfg.om.get_object_by_lvm_id(full_name)
 		created_lv = l.dbus_object_path()
 
@@ -161,7 +197,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.vg_rename(vg_name, new_name,
 												rename_options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[uuid])
 			else:
 				# Need to work on error handling, need consistent
 				raise dbus.exceptions.DBusException(
@@ -177,12 +213,14 @@ class Vg(AutomatedProperties):
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='sia{sv}', out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Rename(self, name, tmo, rename_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Rename(self, name, tmo, rename_options, cb, cbe, sender):
 		utils.validate_vg_name(VG_INTERFACE, name)
 		r = RequestEntry(tmo, Vg._rename,
 				(self.state.Uuid, self.state.lvm_id, name,
-				rename_options), cb, cbe, False)
+				rename_options), cb, cbe, False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -201,7 +239,7 @@ class Vg(AutomatedProperties):
 				# If an LV has hidden LVs, things can get quite involved,
 				# especially if it's the last thin pool to get removed, so
 				# lets refresh all
-				cfg.load()
+				cfg.load(vg_uuids=[uuid])
 
 			else:
 				# Need to work on error handling, need consistent
@@ -218,11 +256,14 @@ class Vg(AutomatedProperties):
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='ia{sv}', out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Remove(self, tmo, remove_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Remove(self, tmo, remove_options, cb, cbe, sender):
+		# PVs move between the VG and the orphans ('')
 		r = RequestEntry(tmo, Vg._remove,
 				(self.state.Uuid, self.state.lvm_id, remove_options),
-				cb, cbe, False)
+				cb, cbe, False,
+				lock_key=(self.state.Uuid, ''), sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -237,10 +278,9 @@ class Vg(AutomatedProperties):
 			# locals(), ['Variant']).Variant("s", "n")}
 
 			if rc == 0:
-				dbo.refresh()
-
-				if (('activate' in change_options) or ('-a' in change_options)):
-					cfg.load()
+				# Re-read even if the seqno didn't move, activation doesn't
+				# bump it
+				cfg.load(vg_uuids=[uuid])
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -260,11 +300,13 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Change(self, tmo, change_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Change(self, tmo, change_options, cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._change,
 				(self.state.Uuid, self.state.lvm_id, change_options),
-				cb, cbe, False)
+				cb, cbe, False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -289,7 +331,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.vg_reduce(vg_name, missing, pv_devices,
 												reduce_options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[uuid])
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE, 'Exit code %s, stderr = %s' % (str(rc), err))
@@ -304,11 +346,15 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='baoia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Reduce(self, missing, pv_object_paths, tmo, reduce_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Reduce(self, missing, pv_object_paths, tmo, reduce_options,
+			cb, cbe, sender):
+		# PVs move between the VG and the orphans ('')
 		r = RequestEntry(tmo, Vg._reduce,
 				(self.state.Uuid, self.state.lvm_id, missing,
-				pv_object_paths, reduce_options), cb, cbe, False)
+				pv_object_paths, reduce_options), cb, cbe, False,
+				lock_key=(self.state.Uuid, ''), sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -331,7 +377,7 @@ class Vg(AutomatedProperties):
 				rc, out, err = cmdhandler.vg_extend(vg_name, extend_devices,
 													extend_options)
 				if rc == 0:
-					cfg.load()
+					cfg.load(vg_uuids=[uuid])
 				else:
 					raise dbus.exceptions.DBusException(
 						VG_INTERFACE,
@@ -349,12 +395,15 @@ class Vg(AutomatedProperties):
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='aoia{sv}', out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Extend(self, pv_object_paths, tmo, extend_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Extend(self, pv_object_paths, tmo, extend_options, cb, cbe, sender):
+		# PVs move between the VG and the orphans ('')
 		r = RequestEntry(tmo, Vg._extend,
 				(self.state.Uuid, self.state.lvm_id, pv_object_paths,
 				extend_options),
-				cb, cbe, False)
+				cb, cbe, False,
+				lock_key=(self.state.Uuid, ''), sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
@@ -367,6 +416,36 @@ class Vg(AutomatedProperties):
 			VG_INTERFACE, None, pv_src_obj, pv_source_range,
 			pv_dests_and_ranges, move_options, tmo)
 
+	@dbus.service.method(
+		dbus_interface=VG_INTERFACE,
+		out_signature='a(ott)')
+	def FreeExtentRanges(self):
+		"""
+		Where the free extents of the VG are, worked out from what we already
+		know rather than by running lvm.  PVs which don't allow allocation
+		are left out.
+		:return: Array of (PV object path, first PE, last PE), the form
+					LvCreate and Move take their destinations in
+		"""
+		rc = []
+
+		# We run on the main loop without cfg.load_lock, a refresh can be
+		# replacing the data store as we go, skip PVs which have gone
+		for pv_name, pv_uuid in cfg.db.pvs_in_vg(self.state.Uuid):
+			p = cfg.db.pvs.get(pv_uuid)
+			if p is None or p['pv_attr'][0] != 'a':
+				continue
+
+			pv_path = cfg.om.get_object_path_by_lvm_id(
+				pv_uuid, pv_name, gen_new=False)
+			if not pv_path:
+				continue
+
+			for start, end in cfg.db.pv_free_extents(pv_uuid):
+				rc.append((pv_path, start, end))
+
+		return dbus.Array(rc, signature='(ott)')
+
 	@staticmethod
 	def _lv_create(uuid, vg_name, name, size_bytes, pv_dests_and_ranges,
 			create_options):
@@ -389,7 +468,7 @@ class Vg(AutomatedProperties):
 				vg_name, create_options, name, size_bytes, pv_dests)
 
 			if rc == 0:
-				return Vg.fetch_new_lv(vg_name, name)
+				return Vg.fetch_new_lv(uuid, vg_name, name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -404,9 +483,10 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='sta(ott)ia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def LvCreate(self, name, size_bytes, pv_dests_and_ranges,
-			tmo, create_options, cb, cbe):
+			tmo, create_options, cb, cbe, sender):
 		"""
 		This one it for the advanced users that want to roll their own
 		:param name:            Name of the LV
@@ -419,6 +499,7 @@ class Vg(AutomatedProperties):
 		:param create_options:  hash of key/value pairs
 		:param cb: Internal, not accessible by dbus API user
 		:param cbe: Internal, not accessible by dbus API user
+		:param sender: Internal, not accessible by dbus API user
 		:return: (oo) First object path is newly created object, second is
 					job object path if created.  Each == '/' when it doesn't
 					apply.
@@ -427,7 +508,8 @@ class Vg(AutomatedProperties):
 		r = RequestEntry(tmo, Vg._lv_create,
 				(self.state.Uuid, self.state.lvm_id,
 				name, round_size(size_bytes), pv_dests_and_ranges,
-				create_options), cb, cbe)
+				create_options), cb, cbe,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -441,7 +523,7 @@ class Vg(AutomatedProperties):
 				vg_name, create_options, name, size_bytes, thin_pool)
 
 			if rc == 0:
-				created_lv = Vg.fetch_new_lv(vg_name, name)
+				created_lv = Vg.fetch_new_lv(uuid, vg_name, name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -458,14 +540,16 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='stbia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def LvCreateLinear(self, name, size_bytes,
-			thin_pool, tmo, create_options, cb, cbe):
+			thin_pool, tmo, create_options, cb, cbe, sender):
 		utils.validate_lv_name(VG_INTERFACE, self.Name, name)
 		r = RequestEntry(tmo, Vg._lv_create_linear,
 						(self.state.Uuid, self.state.lvm_id,
 						name, round_size(size_bytes), thin_pool,
-						create_options), cb, cbe)
+						create_options), cb, cbe,
+						lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -479,7 +563,7 @@ class Vg(AutomatedProperties):
 				vg_name, create_options, name, size_bytes,
 				num_stripes, stripe_size_kb, thin_pool)
 			if rc == 0:
-				created_lv = Vg.fetch_new_lv(vg_name, name)
+				created_lv = Vg.fetch_new_lv(uuid, vg_name, name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -495,17 +579,19 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='stuubia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def LvCreateStriped(self, name, size_bytes, num_stripes,
 						stripe_size_kb, thin_pool, tmo, create_options,
-						cb, cbe):
+						cb, cbe, sender):
 		utils.validate_lv_name(VG_INTERFACE, self.Name, name)
 		r = RequestEntry(
 				tmo, Vg._lv_create_striped,
 				(self.state.Uuid, self.state.lvm_id, name,
 				round_size(size_bytes), num_stripes, stripe_size_kb,
 				thin_pool, create_options),
-				cb, cbe)
+				cb, cbe,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -518,7 +604,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.vg_lv_create_mirror(
 				vg_name, create_options, name, size_bytes, num_copies)
 			if rc == 0:
-				created_lv = Vg.fetch_new_lv(vg_name, name)
+				created_lv = Vg.fetch_new_lv(uuid, vg_name, name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -536,15 +622,17 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='stuia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def LvCreateMirror(self, name, size_bytes, num_copies,
-			tmo, create_options, cb, cbe):
+			tmo, create_options, cb, cbe, sender):
 		utils.validate_lv_name(VG_INTERFACE, self.Name, name)
 		r = RequestEntry(
 			tmo, Vg._lv_create_mirror,
 			(self.state.Uuid, self.state.lvm_id, name,
 			round_size(size_bytes), num_copies,
-			create_options), cb, cbe)
+			create_options), cb, cbe,
+			lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -558,7 +646,7 @@ class Vg(AutomatedProperties):
 				vg_name, create_options, name, raid_type, size_bytes,
 				num_stripes, stripe_size_kb)
 			if rc == 0:
-				created_lv = Vg.fetch_new_lv(vg_name, name)
+				created_lv = Vg.fetch_new_lv(uuid, vg_name, name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -576,15 +664,17 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='sstuuia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def LvCreateRaid(self, name, raid_type, size_bytes,
 			num_stripes, stripe_size_kb, tmo,
-			create_options, cb, cbe):
+			create_options, cb, cbe, sender):
 		utils.validate_lv_name(VG_INTERFACE, self.Name, name)
 		r = RequestEntry(tmo, Vg._lv_create_raid,
 				(self.state.Uuid, self.state.lvm_id, name,
 				raid_type, round_size(size_bytes), num_stripes,
-				stripe_size_kb, create_options), cb, cbe)
+				stripe_size_kb, create_options), cb, cbe,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -607,7 +697,7 @@ class Vg(AutomatedProperties):
 				cfg.om.remove_object(md, emit_signal=True)
 				cfg.om.remove_object(data, emit_signal=True)
 
-				cache_pool_lv = Vg.fetch_new_lv(vg_name, new_name)
+				cache_pool_lv = Vg.fetch_new_lv(uuid, vg_name, new_name)
 			else:
 				raise dbus.exceptions.DBusException(
 					VG_INTERFACE,
@@ -636,26 +726,30 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='ooia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def CreateCachePool(self, meta_data_lv, data_lv, tmo, create_options,
-						cb, cbe):
+						cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Vg._create_pool,
 			(self.state.Uuid, self.state.lvm_id, meta_data_lv,
-			data_lv, create_options, cmdhandler.vg_create_cache_pool), cb, cbe)
+			data_lv, create_options, cmdhandler.vg_create_cache_pool), cb, cbe,
+			lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='ooia{sv}',
 		out_signature='(oo)',
-		async_callbacks=('cb', 'cbe'))
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
 	def CreateThinPool(self, meta_data_lv, data_lv, tmo, create_options,
-						cb, cbe):
+						cb, cbe, sender):
 		r = RequestEntry(
 			tmo, Vg._create_pool,
 			(self.state.Uuid, self.state.lvm_id, meta_data_lv,
-			data_lv, create_options, cmdhandler.vg_create_thin_pool), cb, cbe)
+			data_lv, create_options, cmdhandler.vg_create_thin_pool), cb, cbe,
+			lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -679,7 +773,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.pv_tag(
 				pv_devices, tags_add, tags_del, tag_options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[uuid])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -696,8 +790,9 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='aoasia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def PvTagsAdd(self, pvs, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def PvTagsAdd(self, pvs, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(VG_INTERFACE, t)
@@ -705,15 +800,17 @@ class Vg(AutomatedProperties):
 		r = RequestEntry(tmo, Vg._pv_add_rm_tags,
 				(self.state.Uuid, self.state.lvm_id,
 				pvs, tags, None, tag_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='aoasia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def PvTagsDel(self, pvs, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def PvTagsDel(self, pvs, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(VG_INTERFACE, t)
@@ -722,7 +819,8 @@ class Vg(AutomatedProperties):
 			tmo, Vg._pv_add_rm_tags,
 			(self.state.Uuid, self.state.lvm_id,
 			pvs, None, tags, tag_options),
-			cb, cbe, return_tuple=False)
+			cb, cbe, return_tuple=False,
+			lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -735,7 +833,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.vg_tag(
 				vg_name, tags_add, tags_del, tag_options)
 			if rc == 0:
-				dbo.refresh()
+				cfg.load(vg_uuids=[uuid])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -752,8 +850,9 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='asia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def TagsAdd(self, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def TagsAdd(self, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(VG_INTERFACE, t)
@@ -761,15 +860,17 @@ class Vg(AutomatedProperties):
 		r = RequestEntry(tmo, Vg._vg_add_rm_tags,
 				(self.state.Uuid, self.state.lvm_id,
 				tags, None, tag_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='asia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def TagsDel(self, tags, tmo, tag_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def TagsDel(self, tags, tmo, tag_options, cb, cbe, sender):
 
 		for t in tags:
 			utils.validate_tag(VG_INTERFACE, t)
@@ -777,7 +878,8 @@ class Vg(AutomatedProperties):
 		r = RequestEntry(tmo, Vg._vg_add_rm_tags,
 				(self.state.Uuid, self.state.lvm_id,
 				None, tags, tag_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -788,7 +890,7 @@ class Vg(AutomatedProperties):
 		if dbo:
 			rc, out, err = method(vg_name, value, options)
 			if rc == 0:
-				dbo.refresh()
+				cfg.load(vg_uuids=[uuid])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -805,37 +907,44 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='sia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def AllocationPolicySet(self, policy, tmo, policy_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def AllocationPolicySet(self, policy, tmo, policy_options,
+			cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_change_set,
 				(self.state.Uuid, self.state.lvm_id,
 				cmdhandler.vg_allocation_policy,
 				policy, policy_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def MaxPvSet(self, number, tmo, max_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def MaxPvSet(self, number, tmo, max_options, cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_change_set,
 				(self.state.Uuid, self.state.lvm_id,
 				cmdhandler.vg_max_pv, number, max_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='ia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def UuidGenerate(self, tmo, options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def UuidGenerate(self, tmo, options, cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_change_set,
 				(self.state.Uuid, self.state.lvm_id,
 				cmdhandler.vg_uuid_gen, None, options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	def _attribute(self, pos, ch):
@@ -847,12 +956,14 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def MaxLvSet(self, number, tmo, max_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def MaxLvSet(self, number, tmo, max_options, cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_change_set,
 				(self.state.Uuid, self.state.lvm_id,
 				cmdhandler.vg_max_lv, number, max_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@staticmethod
@@ -865,7 +976,7 @@ class Vg(AutomatedProperties):
 			rc, out, err = cmdhandler.activate_deactivate(
 				'vgchange', vg_name, activate, control_flags, options)
 			if rc == 0:
-				cfg.load()
+				cfg.load(vg_uuids=[uuid])
 				return '/'
 			else:
 				raise dbus.exceptions.DBusException(
@@ -881,24 +992,29 @@ class Vg(AutomatedProperties):
 		dbus_interface=VG_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Activate(self, control_flags, tmo, activate_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Activate(self, control_flags, tmo, activate_options, cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_activate_deactivate,
 				(self.state.Uuid, self.state.lvm_id, True,
 				control_flags, activate_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@dbus.service.method(
 		dbus_interface=VG_INTERFACE,
 		in_signature='tia{sv}',
 		out_signature='o',
-		async_callbacks=('cb', 'cbe'))
-	def Deactivate(self, control_flags, tmo, activate_options, cb, cbe):
+		async_callbacks=('cb', 'cbe'),
+		sender_keyword='sender')
+	def Deactivate(self, control_flags, tmo, activate_options,
+			cb, cbe, sender):
 		r = RequestEntry(tmo, Vg._vg_activate_deactivate,
 				(self.state.Uuid, self.state.lvm_id, False,
 				control_flags, activate_options),
-				cb, cbe, return_tuple=False)
+				cb, cbe, return_tuple=False,
+				lock_key=self.state.Uuid, sender=sender)
 		cfg.worker_q.put(r)
 
 	@property
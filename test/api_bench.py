@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# End to end API benchmark.  Starts a private bus and the daemon on it,
+# backed by the lvm simulator (lvm_sim.py), then has concurrent clients
+# drive the API one call type at a time.  For each one the latency
+# percentiles, calls per second, lvm refreshes (report commands fetching
+# the LVs) per call and the daemon RSS are reported as JSON.  No root or
+# block devices are needed, the tree needs to have been configured so
+# lvmdbus/path.py exists.
+#
+# Usage: api_bench.py [--lvs N] [--clients N] [--ops N] [--shell] ...
+#        (see --help)
+
+import sys
+import os
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+import dbus
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+TOP_DIR = os.path.join(TEST_DIR, '..')
+LVM_SIM = os.path.join(TEST_DIR, 'lvm_sim.py')
+LVMDBUSD = os.path.join(TOP_DIR, 'lvmdbusd')
+
+BUSNAME = "com.redhat.lvmdbus1"
+BASE_OBJ = '/' + BUSNAME.replace('.', '/')
+MANAGER_INT = BUSNAME + '.Manager'
+MANAGER_OBJ = BASE_OBJ + '/Manager'
+VG_INT = BUSNAME + ".Vg"
+LV_INT = BUSNAME + ".Lv"
+JOB_INT = BUSNAME + ".Job"
+
+# lvm commands which fetch the LVs, one of these per data store refresh
+REFRESH_COMMANDS = ('fullreport', 'lvs')
+
+LV_SIZE = 4194304
+
+
+def _iface(bus, path, interface):
+	return dbus.Interface(bus.get_object(BUSNAME, path), interface)
+
+
+def _percentile(values, pct):
+	return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def _rss_kb(pid):
+	with open('/proc/%d/status' % pid) as f:
+		for line in f:
+			if line.startswith('VmRSS:'):
+				return int(line.split()[1])
+	return 0
+
+
+class Daemon(object):
+	"""
+	A private bus with the daemon running on it against the simulator
+	"""
+
+	def __init__(self, args, work_dir):
+		self.work_dir = work_dir
+		self.sim_log = os.path.join(work_dir, 'lvm_commands.log')
+		self.env = dict(os.environ)
+		self.env.update(
+			LVM_SIM_STATE=os.path.join(work_dir, 'lvm_sim.json'),
+			LVM_SIM_LOG=self.sim_log,
+			LVM_SIM_LATENCY=str(args.latency),
+			LVM_SIM_DEVICE_LATENCY=str(args.device_latency))
+
+		subprocess.check_call(
+			[sys.executable, LVM_SIM, '--sim-init',
+				'--devices', str(args.devices + args.clients),
+				'--orphans', str(args.clients), '--vgs', str(args.vgs),
+				'--lvs', str(args.lvs)],
+			env=self.env, stdout=subprocess.DEVNULL)
+
+		self.bus_process = subprocess.Popen(
+			['dbus-daemon', '--session', '--nofork', '--print-address=1'],
+			stdout=subprocess.PIPE, env=self.env)
+		self.address = self.bus_process.stdout.readline().decode().strip()
+
+		# dbus.SystemBus() in the daemon connects to this instead
+		self.env['DBUS_SYSTEM_BUS_ADDRESS'] = self.address
+		self.env['LVM_BINARY'] = LVM_SIM
+		self.env['PYTHONPATH'] = TOP_DIR
+
+		start = time.time()
+		self.process = subprocess.Popen(
+			[sys.executable, LVMDBUSD, '--snapshot-file', '',
+				'--workers', str(args.workers)],
+			env=self.env, stdout=subprocess.DEVNULL)
+		self._wait_ready(args.startup_timeout)
+		self.startup_time = time.time() - start
+
+	def _wait_ready(self, timeout):
+		deadline = time.time() + timeout
+		while time.time() < deadline:
+			if self.process.poll() is not None:
+				raise RuntimeError('daemon exited with %d' %
+									self.process.returncode)
+			try:
+				_iface(self.connect(), MANAGER_OBJ,
+						'org.freedesktop.DBus.Properties').Get(
+					MANAGER_INT, 'Version')
+				return
+			except dbus.exceptions.DBusException:
+				time.sleep(0.1)
+		raise RuntimeError('daemon not ready after %d seconds' % timeout)
+
+	def connect(self):
+		return dbus.bus.BusConnection(self.address)
+
+	def lvm_refreshes(self):
+		try:
+			with open(self.sim_log) as f:
+				return sum(1 for line in f
+							if line.strip() in REFRESH_COMMANDS)
+		except IOError:
+			return 0
+
+	def rss_kb(self):
+		return _rss_kb(self.process.pid)
+
+	def stop(self):
+		for p in (self.process, self.bus_process):
+			p.terminate()
+			p.wait()
+
+
+class Client(object):
+	"""
+	One client, with its own connection and its own VG to work on
+	"""
+
+	def __init__(self, daemon, number, device):
+		self.bus = daemon.connect()
+		self.device = device
+		self.vg_name = 'bench_vg_%d' % number
+		self.vg_path = None
+		self.lvs = []
+		self.manager = _iface(self.bus, MANAGER_OBJ, MANAGER_INT)
+
+	def vg_create(self, i):
+		pv_path = self.manager.LookUpByLvmId(self.device)
+		self.vg_path = self.manager.VgCreate(
+			self.vg_name, dbus.Array([pv_path], 'o'), -1, {})[0]
+
+	def lv_create(self, i):
+		name = 'bench_lv_%d' % len(self.lvs)
+		path = _iface(self.bus, self.vg_path, VG_INT).LvCreate(
+			name, dbus.UInt64(LV_SIZE), dbus.Array([], '(ott)'), -1, {})[0]
+		self.lvs.append(('%s/%s' % (self.vg_name, name), path))
+
+	def tags_add(self, i):
+		path = self.lvs[i % len(self.lvs)][1]
+		_iface(self.bus, path, LV_INT).TagsAdd(
+			dbus.Array(['bench_%d' % i], 's'), -1, {})
+
+	def look_up(self, i):
+		self.manager.LookUpByLvmId(self.lvs[i % len(self.lvs)][0])
+
+	def get_managed_objects(self, i):
+		_iface(self.bus, BASE_OBJ,
+				'org.freedesktop.DBus.ObjectManager').GetManagedObjects()
+
+	def job_wait(self, i):
+		name = 'bench_job_lv_%d' % i
+		job_path = _iface(self.bus, self.vg_path, VG_INT).LvCreate(
+			name, dbus.UInt64(LV_SIZE), dbus.Array([], '(ott)'), 0, {})[1]
+		job = _iface(self.bus, job_path, JOB_INT)
+		while not job.Wait(1):
+			pass
+		job.Remove()
+
+
+def run_phase(daemon, clients, method, ops):
+	"""
+	Have every client make the call ops times, all at the same time
+	:return: dict of the results
+	"""
+	latencies = [[] for c in clients]
+	errors = []
+	start_barrier = threading.Barrier(len(clients))
+
+	def client_thread(c, result):
+		start_barrier.wait()
+		for i in range(0, ops):
+			start = time.time()
+			try:
+				getattr(c, method)(i)
+			except Exception as e:
+				# Likely a consequence of an earlier call failing
+				errors.append(str(e))
+				continue
+			result.append(time.time() - start)
+
+	threads = [threading.Thread(target=client_thread, args=(c, l))
+				for c, l in zip(clients, latencies)]
+
+	refreshes = daemon.lvm_refreshes()
+	start = time.time()
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	elapsed = time.time() - start
+	refreshes = daemon.lvm_refreshes() - refreshes
+
+	values = sorted(v for l in latencies for v in l)
+	rc = dict(calls=len(values), errors=len(errors),
+				calls_per_sec=len(values) / elapsed if elapsed else 0,
+				refreshes_per_call=refreshes / float(max(1, len(values))),
+				rss_kb=daemon.rss_kb())
+	if values:
+		rc.update(p50_ms=_percentile(values, 50) * 1000,
+					p99_ms=_percentile(values, 99) * 1000,
+					max_ms=values[-1] * 1000)
+	if errors:
+		rc['first_error'] = errors[0]
+	return rc
+
+
+# (Name in the results, Client method, calls per client or None for --ops)
+PHASES = (
+	('Manager.VgCreate', 'vg_create', 1),
+	('Vg.LvCreate', 'lv_create', None),
+	('Lv.TagsAdd', 'tags_add', None),
+	('Manager.LookUpByLvmId', 'look_up', None),
+	('GetManagedObjects', 'get_managed_objects', None),
+	('Job.Wait', 'job_wait', None))
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--lvs', type=int, default=10000,
+						help='LVs the simulator starts out with')
+	parser.add_argument('--vgs', type=int, default=8)
+	parser.add_argument('--devices', type=int, default=64)
+	parser.add_argument('--clients', type=int, default=8)
+	parser.add_argument('--ops', type=int, default=20,
+						help='Calls each client makes per call type')
+	parser.add_argument('--workers', type=int, default=4)
+	parser.add_argument('--latency', type=float, default=0.0,
+						help='Seconds each lvm command takes')
+	parser.add_argument('--device-latency', type=float, default=0.0,
+						help='Additional seconds per PV for each lvm command')
+	parser.add_argument('--shell', action='store_true', default=False,
+						help='Have the daemon use the lvm shell')
+	parser.add_argument('--startup-timeout', type=int, default=600)
+	parser.add_argument('--output', help='Write the JSON here, not stdout')
+	args = parser.parse_args()
+
+	work_dir = tempfile.mkdtemp(prefix='lvmdbus_bench_')
+	daemon = None
+	try:
+		daemon = Daemon(args, work_dir)
+
+		if args.shell:
+			_iface(daemon.connect(), MANAGER_OBJ, MANAGER_INT).UseLvmShell(
+				True)
+
+		results = OrderedDict(
+			config=vars(args), startup_seconds=daemon.startup_time,
+			rss_kb_start=daemon.rss_kb(), calls=OrderedDict())
+
+		# The simulator leaves the last devices as orphan PVs
+		clients = [Client(daemon, i, '/dev/sim%05d' % (args.devices + i))
+					for i in range(0, args.clients)]
+
+		for name, method, ops in PHASES:
+			results['calls'][name] = run_phase(
+				daemon, clients, method, ops or args.ops)
+
+		results['rss_kb_end'] = daemon.rss_kb()
+	finally:
+		if daemon:
+			daemon.stop()
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	text = json.dumps(results, indent=4)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(text + '\n')
+	else:
+		print(text)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,1215 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# A stand in for the lvm binary which works on a model of PVs, VGs and LVs
+# kept in a file instead of on block devices, so the daemon can be run
+# against tens of thousands of LVs on any box.  Point the daemon at it with
+# LVM_BINARY=/path/to/lvm_sim.py.
+#
+# It answers version, pvs, vgs, lvs and fullreport (separator and json
+# output) and the commands the daemon uses to change things, for linear and
+# (thick) snapshot LVs.  Anything else fails the way lvm does when it's
+# asked for something it can't do.  Run without arguments it behaves like
+# the lvm shell, so both ways of running lvm commands can be exercised.
+# Every invocation shares the model through the state file, reports take a
+# shared lock on it and the commands changing it an exclusive one.
+#
+# Environment:
+#   LVM_SIM_STATE           State file (default /tmp/lvm_sim.json)
+#   LVM_SIM_LATENCY         Seconds every command takes (default 0)
+#   LVM_SIM_DEVICE_LATENCY  Additional seconds per PV, as lvm scans them all
+#                           (default 0)
+#   LVM_SIM_VERSION         Version to claim, below 2.02.158 there is no
+#                           json or fullreport (default 2.02.166)
+#   LVM_SIM_LOG             File each command's name is appended to
+#
+# Create a model to work on with eg.
+#   lvm_sim.py --sim-init --devices 512 --vgs 8 --lvs 50000
+
+import sys
+import os
+import json
+import time
+import shlex
+import fcntl
+import random
+import argparse
+from collections import OrderedDict
+
+STATE_FILE = os.getenv('LVM_SIM_STATE', '/tmp/lvm_sim.json')
+LATENCY = float(os.getenv('LVM_SIM_LATENCY', '0'))
+DEVICE_LATENCY = float(os.getenv('LVM_SIM_DEVICE_LATENCY', '0'))
+VERSION = os.getenv('LVM_SIM_VERSION', '2.02.166')
+LOG_FILE = os.getenv('LVM_SIM_LOG')
+
+JSON_MIN_VERSION = (2, 2, 158)
+
+PE_START = 1048576
+MDA_SIZE = 1044480
+MDA_FREE = 520704
+DEFAULT_EXTENT_SIZE = 4194304
+
+SHELL_PROMPT = 'lvm> '
+
+_SIZE_COLUMNS = frozenset([
+	'pv_size', 'pv_free', 'pv_used', 'dev_size', 'pv_mda_size',
+	'pv_mda_free', 'pv_ba_start', 'pv_ba_size', 'pe_start', 'vg_size',
+	'vg_free', 'vg_extent_size', 'vg_mda_free', 'vg_mda_size', 'lv_size'])
+
+_PV_SEG_COLUMNS = frozenset(['pv_seg_start', 'pvseg_size', 'segtype'])
+_LV_SEG_COLUMNS = frozenset(['seg_pe_ranges', 'segtype'])
+
+# Options which take a value, everything else starting with '-' is a flag
+_VALUE_OPTIONS = frozenset([
+	'-o', '--options', '-S', '--select', '--separator', '--units',
+	'--reportformat', '--configreport', '-L', '--size', '-l', '--extents',
+	'-n', '--name', '--type', '-i', '--stripes', '-I', '--stripesize',
+	'-m', '--mirrors', '--alloc', '-p', '--maxphysicalvolumes',
+	'--addtag', '--deltag', '-x', '--allocatable',
+	'--setphysicalvolumesize', '--poolmetadata', '--cachepool',
+	'--activationmode', '-V', '--virtualsize', '--activate',
+	'-s', '--physicalextentsize', '--config'])
+
+
+class SimError(Exception):
+	def __init__(self, msg, rc=5):
+		super(SimError, self).__init__(msg)
+		self.rc = rc
+
+
+def _uuid():
+	chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+	s = ''.join(random.choice(chars) for i in range(0, 32))
+	return '-'.join((s[0:6], s[6:10], s[10:14], s[14:18], s[18:22],
+						s[22:26], s[26:32]))
+
+
+def _size_arg(value, default_unit='m'):
+	"""
+	:return: (sign, bytes) for an lvm size argument like +10G or 4096B
+	"""
+	sign = ''
+	if value and value[0] in '+-':
+		sign = value[0]
+		value = value[1:]
+
+	unit = default_unit
+	if value and value[-1].isalpha():
+		unit = value[-1].lower()
+		value = value[:-1]
+
+	multiplier = dict(b=1, s=512, k=1 << 10, m=1 << 20, g=1 << 30,
+						t=1 << 40, p=1 << 50, e=1 << 60)
+	if unit not in multiplier:
+		raise SimError('Invalid argument for --size: %s' % value, 3)
+
+	try:
+		return sign, int(float(value) * multiplier[unit])
+	except ValueError:
+		raise SimError('Invalid argument for --size: %s' % value, 3)
+
+
+def _parse_args(args, flags=()):
+	"""
+	:param flags: Options which are flags for this command even though
+					they take a value for others
+	:return: ([(option, value)] in the order given, [positional])
+	"""
+	opts = []
+	positional = []
+	i = 0
+	while i < len(args):
+		a = args[i]
+		if a.startswith('-L') and len(a) > 2 and a[2] in '+-0123456789':
+			opts.append(('-L', a[2:]))
+		elif a.startswith('-a') and len(a) > 2:
+			opts.append(('--activate', a[2:]))
+		elif a in _VALUE_OPTIONS and a not in flags:
+			if i + 1 >= len(args):
+				raise SimError('Option %s requires an argument' % a, 3)
+			opts.append((a, args[i + 1]))
+			i += 1
+		elif a.startswith('--') and '=' in a:
+			opts.append(tuple(a.split('=', 1)))
+		elif a.startswith('-') and len(a) > 1:
+			opts.append((a, None))
+		else:
+			positional.append(a)
+		i += 1
+	return opts, positional
+
+
+def _opt(opts, *names):
+	"""
+	:return: The value of the last of the options given, None if not given
+	"""
+	rc = None
+	for k, v in opts:
+		if k in names:
+			rc = v
+	return rc
+
+
+def _opt_all(opts, *names):
+	return [v for k, v in opts if k in names]
+
+
+def _has(opts, *names):
+	return any(k in names for k, v in opts)
+
+
+class Model(object):
+	"""
+	What we pretend is on the disks.  Extent ranges are inclusive.
+
+	devices: device -> size in bytes
+	pvs:     device -> dict(uuid, vg (uuid or ''), tags, alloc)
+	vgs:     vg uuid -> dict(name, extent_size, seqno, tags, pvs, alloc,
+				max_lv, max_pv)
+	lvs:     lv uuid -> dict(name, vg, segments [[device, start, end]],
+				tags, active, origin)
+	"""
+
+	def __init__(self, data=None):
+		data = data or {}
+		self.devices = data.get('devices', {})
+		self.pvs = data.get('pvs', {})
+		self.vgs = data.get('vgs', {})
+		self.lvs = data.get('lvs', {})
+		self._index()
+
+	def data(self):
+		return dict(devices=self.devices, pvs=self.pvs, vgs=self.vgs,
+					lvs=self.lvs)
+
+	def _index(self):
+		self.vg_by_name = dict((v['name'], u) for u, v in self.vgs.items())
+		self.lv_by_name = {}
+		self.vg_lvs = dict((u, []) for u in self.vgs)
+		self.used = dict((d, []) for d in self.pvs)
+		self.origins = set()
+		for u, l in self.lvs.items():
+			self.lv_by_name[(l['vg'], l['name'])] = u
+			self.vg_lvs[l['vg']].append(u)
+			if l['origin']:
+				self.origins.add(l['origin'])
+			for device, start, end in l['segments']:
+				self.used[device].append((start, end, u))
+		for d in self.used:
+			self.used[d].sort()
+
+	# Lookups
+
+	def vg(self, name):
+		if name in self.vg_by_name:
+			return self.vg_by_name[name]
+		if name in self.vgs:
+			return name
+		raise SimError('Volume group "%s" not found' % name)
+
+	def lv(self, full_name):
+		name = full_name
+		if name.startswith('/dev/'):
+			name = name[5:]
+		if '/' not in name:
+			raise SimError('"%s": Invalid path for Logical Volume' % full_name,
+							3)
+		vg_name, lv_name = name.split('/', 1)
+		vg_uuid = self.vg(vg_name)
+		key = (vg_uuid, lv_name)
+		if key not in self.lv_by_name:
+			raise SimError('Failed to find logical volume "%s"' % name)
+		return self.lv_by_name[key]
+
+	def pv(self, device):
+		if device not in self.pvs:
+			raise SimError('Failed to find physical volume "%s".' % device)
+		return self.pvs[device]
+
+	def full_name(self, lv_uuid):
+		l = self.lvs[lv_uuid]
+		return '%s/%s' % (self.vgs[l['vg']]['name'], l['name'])
+
+	# Extents
+
+	def pe_count(self, device):
+		p = self.pvs[device]
+		if not p['vg']:
+			return 0
+		return (self.devices[device] - PE_START) // \
+			self.vgs[p['vg']]['extent_size']
+
+	def lv_extents(self, lv_uuid):
+		return sum(e - s + 1 for d, s, e in self.lvs[lv_uuid]['segments'])
+
+	def pv_segments(self, device):
+		"""
+		:return: [(start, size, lv uuid or None for free)] covering the PV
+		"""
+		rc = []
+		pos = 0
+		for start, end, lv_uuid in self.used[device]:
+			if start > pos:
+				rc.append((pos, start - pos, None))
+			rc.append((start, end - start + 1, lv_uuid))
+			pos = end + 1
+		count = self.pe_count(device)
+		if count > pos:
+			rc.append((pos, count - pos, None))
+		return rc
+
+	def free_ranges(self, device):
+		return [(s, s + n - 1) for s, n, u in self.pv_segments(device)
+				if u is None]
+
+	def free_count(self, device):
+		return sum(e - s + 1 for s, e in self.free_ranges(device))
+
+	def allocate(self, vg_uuid, count, dests):
+		"""
+		First fit, from the destinations given (eg. /dev/sda:0-99) or any
+		allocatable PV in the VG
+		:return: List of [device, start, end]
+		"""
+		wanted = []
+		for d in dests:
+			device, first, last = d, 0, None
+			if ':' in d:
+				device, r = d.split(':', 1)
+				first, last = r.split('-') if '-' in r else (r, r)
+				first = int(first) if first else 0
+				last = int(last) if last else None
+			if device not in self.pvs or self.pvs[device]['vg'] != vg_uuid:
+				raise SimError(
+					'Physical Volume "%s" not found in Volume Group "%s".' %
+					(device, self.vgs[vg_uuid]['name']))
+			wanted.append((device, first, last))
+
+		if not wanted:
+			wanted = [(d, 0, None) for d in self.vgs[vg_uuid]['pvs']]
+
+		rc = []
+		for device, first, last in wanted:
+			if not self.pvs[device]['alloc']:
+				continue
+			for s, e in self.free_ranges(device):
+				s = max(s, first)
+				if last is not None:
+					e = min(e, last)
+				if s > e:
+					continue
+				take = min(count, e - s + 1)
+				rc.append([device, s, s + take - 1])
+				count -= take
+				if not count:
+					return rc
+
+		raise SimError(
+			'Volume group "%s" has insufficient free space.' %
+			self.vgs[vg_uuid]['name'])
+
+	def changed(self, vg_uuid):
+		self.vgs[vg_uuid]['seqno'] += 1
+		self._index()
+
+	# Report rows, column -> value as lvm reports them with --units b
+
+	def pv_row(self, device):
+		p = self.pvs[device]
+		vg_name = ''
+		extent_size = 0
+		if p['vg']:
+			vg_name = self.vgs[p['vg']]['name']
+			extent_size = self.vgs[p['vg']]['extent_size']
+
+		count = self.pe_count(device)
+		free = self.free_count(device) if p['vg'] else 0
+		if p['vg']:
+			size = count * extent_size
+		else:
+			size = self.devices[device] - PE_START
+
+		attr = '%s--' % ('a' if p['vg'] and p['alloc'] else '-')
+		return dict(
+			pv_name=device, pv_uuid=p['uuid'], pv_fmt='lvm2', pv_size=size,
+			pv_free=free * extent_size if p['vg'] else size,
+			pv_used=(count - free) * extent_size,
+			dev_size=self.devices[device], pv_mda_size=MDA_SIZE,
+			pv_mda_free=MDA_FREE, pv_ba_start=0, pv_ba_size=0,
+			pe_start=PE_START, pv_pe_count=count,
+			pv_pe_alloc_count=count - free, pv_attr=attr,
+			pv_tags=','.join(p['tags']), vg_name=vg_name, vg_uuid=p['vg'])
+
+	def pv_seg_rows(self, device):
+		segs = self.pv_segments(device)
+		if not segs:
+			return [dict(pv_seg_start=0, pvseg_size=0, segtype='free')]
+		return [dict(pv_seg_start=s, pvseg_size=n,
+						segtype='free' if u is None else 'linear')
+				for s, n, u in segs]
+
+	def vg_row(self, vg_uuid):
+		v = self.vgs[vg_uuid]
+		count = sum(self.pe_count(d) for d in v['pvs'])
+		free = sum(self.free_count(d) for d in v['pvs'])
+		lvs = self.vg_lvs[vg_uuid]
+		snaps = sum(1 for u in lvs if self.lvs[u]['origin'])
+		return dict(
+			vg_name=v['name'], vg_uuid=vg_uuid, vg_fmt='lvm2',
+			vg_size=count * v['extent_size'],
+			vg_free=free * v['extent_size'], vg_sysid='',
+			vg_extent_size=v['extent_size'], vg_extent_count=count,
+			vg_free_count=free, vg_profile='', max_lv=v['max_lv'],
+			max_pv=v['max_pv'], pv_count=len(v['pvs']), lv_count=len(lvs),
+			snap_count=snaps, vg_seqno=v['seqno'],
+			vg_mda_count=len(v['pvs']), vg_mda_free=MDA_FREE,
+			vg_mda_size=MDA_SIZE, vg_mda_used_count=len(v['pvs']),
+			vg_attr='wz--n-', vg_tags=','.join(v['tags']))
+
+	def lv_row(self, lv_uuid):
+		l = self.lvs[lv_uuid]
+		v = self.vgs[l['vg']]
+		active = 'a' if l['active'] else '-'
+
+		origin = ''
+		if l['origin']:
+			attr = 'swi-%s-s---' % active
+			role = 'public,snapshot,thicksnapshot'
+			origin = self.lvs[l['origin']]['name']
+		elif lv_uuid in self.origins:
+			attr = 'owi-%s-s---' % active
+			role = 'public,origin,thickorigin'
+		else:
+			attr = '-wi-%s-----' % active
+			role = 'public'
+
+		return dict(
+			lv_uuid=lv_uuid, lv_name=l['name'],
+			lv_path='/dev/%s/%s' % (v['name'], l['name']),
+			lv_size=self.lv_extents(lv_uuid) * v['extent_size'],
+			vg_name=v['name'], pool_lv_uuid='', pool_lv='',
+			origin_uuid=l['origin'], origin=origin,
+			data_percent='0.00' if l['origin'] else '', lv_attr=attr,
+			lv_tags=','.join(l['tags']), vg_uuid=l['vg'],
+			lv_active='active' if l['active'] else '', data_lv='',
+			metadata_lv='', lv_parent='', lv_role=role, lv_layout='linear')
+
+	def lv_seg_rows(self, lv_uuid):
+		return [dict(seg_pe_ranges='%s:%d-%d' % (d, s, e), segtype='linear')
+				for d, s, e in self.lvs[lv_uuid]['segments']]
+
+
+# Reports
+
+def _format_value(column, value, opts):
+	if column in _SIZE_COLUMNS and not _has(opts, '--nosuffix'):
+		return '%dB' % value
+	return str(value)
+
+
+def _rows(columns, records, opts):
+	"""
+	:param records: [(record, [segment records])]
+	:return: [OrderedDict] with a row per segment when segment columns are
+				asked for
+	"""
+	rc = []
+	for record, segs in records:
+		for seg in (segs or [{}]):
+			row = OrderedDict()
+			for c in columns:
+				if c in seg:
+					row[c] = _format_value(c, seg[c], opts)
+				elif c in record:
+					row[c] = _format_value(c, record[c], opts)
+				else:
+					raise SimError('Unrecognised field: %s' % c, 3)
+			rc.append(row)
+	return rc
+
+
+def _json_output(groups):
+	"""
+	:param groups: [[(report name, rows)]], fullreport has a group per VG
+	"""
+	out = ['  {', '      "report": [']
+	group_text = []
+	for reports in groups:
+		report_text = []
+		for name, rows in reports:
+			lines = ['              "%s": [' % name]
+			lines.append(',\n'.join(
+				'                  ' + json.dumps(
+					r, separators=(', ', ':')) for r in rows))
+			lines.append('              ]')
+			report_text.append('\n'.join(l for l in lines if l))
+		group_text.append('          {\n' + '\n              ,\n'.join(
+			report_text) + '\n          }')
+	out.append(',\n'.join(group_text))
+	out.extend(['      ]', '  }'])
+	return '\n'.join(out) + '\n'
+
+
+def _separator_output(rows, opts):
+	sep = _opt(opts, '--separator') or ' '
+	lines = []
+	if rows and not _has(opts, '--noheadings', '--noheading'):
+		lines.append('  ' + sep.join(c.upper() for c in rows[0].keys()))
+	for r in rows:
+		lines.append('  ' + sep.join(r.values()))
+	return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def _json(opts):
+	if _opt(opts, '--reportformat') != 'json':
+		return False
+	if _version() < JSON_MIN_VERSION:
+		raise SimError('Invalid argument for --reportformat: json', 3)
+	return True
+
+
+def _vg_selection(opts):
+	"""
+	The only selections the daemon uses are vg_uuid=X || vg_uuid=""
+	:return: Set of vg uuids or None for no selection
+	"""
+	sel = _opt(opts, '-S', '--select')
+	if sel is None:
+		return None
+	rc = set()
+	for term in sel.split('||'):
+		k, v = term.strip().split('=', 1)
+		if k.strip() != 'vg_uuid':
+			raise SimError('Unsupported selection: %s' % sel, 3)
+		rc.add(v.strip().strip('"'))
+	return rc
+
+
+def _pv_records(m, vg_uuids=None, devices=None):
+	rc = []
+	for device in sorted(m.pvs):
+		if vg_uuids is not None and m.pvs[device]['vg'] not in vg_uuids:
+			continue
+		if devices and device not in devices:
+			continue
+		rc.append(device)
+	return rc
+
+
+def _vgs_named(m, names):
+	if not names:
+		return sorted(m.vgs, key=lambda u: m.vgs[u]['name']), []
+	found = []
+	missing = []
+	for n in names:
+		try:
+			found.append(m.vg(n))
+		except SimError as e:
+			missing.append(str(e))
+	return found, missing
+
+
+def _columns(opts):
+	return [c.strip() for c in (_opt(opts, '-o', '--options') or '').split(',')
+			if c.strip()]
+
+
+def cmd_pvs(m, opts, args, out):
+	columns = _columns(opts)
+	segments = bool(_PV_SEG_COLUMNS.intersection(columns))
+	devices = _pv_records(m, _vg_selection(opts), args)
+	missing = [a for a in args if a not in m.pvs]
+
+	records = [(m.pv_row(d), m.pv_seg_rows(d) if segments else None)
+				for d in devices]
+	rows = _rows(columns, records, opts)
+
+	if _json(opts):
+		out.write(_json_output([[('pv', rows)]]))
+	else:
+		out.write(_separator_output(rows, opts))
+
+	for d in missing:
+		raise SimError('Failed to find physical volume "%s".' % d)
+
+
+def cmd_vgs(m, opts, args, out):
+	columns = _columns(opts)
+	vgs, missing = _vgs_named(m, args)
+	rows = _rows(columns, [(m.vg_row(u), None) for u in vgs], opts)
+
+	if _json(opts):
+		out.write(_json_output([[('vg', rows)]]))
+	else:
+		out.write(_separator_output(rows, opts))
+
+	if missing:
+		raise SimError('\n'.join(missing))
+
+
+def cmd_lvs(m, opts, args, out):
+	columns = _columns(opts)
+	segments = bool(_LV_SEG_COLUMNS.intersection(columns))
+
+	lvs = []
+	missing = []
+	if args:
+		for a in args:
+			try:
+				if '/' in a:
+					lvs.append(m.lv(a))
+				else:
+					lvs.extend(m.vg_lvs[m.vg(a)])
+			except SimError as e:
+				missing.append(str(e))
+	else:
+		lvs = list(m.lvs)
+
+	lvs.sort(key=lambda u: (m.vgs[m.lvs[u]['vg']]['name'], m.lvs[u]['name']))
+	records = [(m.lv_row(u), m.lv_seg_rows(u) if segments else None)
+				for u in lvs]
+	rows = _rows(columns, records, opts)
+
+	if _json(opts):
+		out.write(_json_output([[('lv', rows)]]))
+	else:
+		out.write(_separator_output(rows, opts))
+
+	if missing:
+		raise SimError('\n'.join(missing))
+
+
+def cmd_fullreport(m, opts, args, out):
+	if not _json(opts):
+		raise SimError('fullreport: only json output is simulated', 3)
+
+	# Each --configreport applies to the -o which follows it
+	columns = {}
+	report = None
+	for k, v in opts:
+		if k == '--configreport':
+			report = v
+		elif k in ('-o', '--options') and report:
+			columns[report] = [c.strip() for c in v.split(',')]
+
+	def report_rows(name, records):
+		return (name, _rows(columns.get(name, []), records, opts))
+
+	# The segment reports only carry the uuid of what they belong to
+	def pvseg_records(devices):
+		return [(dict(pv_uuid=m.pvs[d]['uuid']), m.pv_seg_rows(d))
+				for d in devices]
+
+	def seg_records(lvs):
+		return [(dict(lv_uuid=u), m.lv_seg_rows(u)) for u in lvs]
+
+	vgs, missing = _vgs_named(m, args)
+	groups = []
+	for u in vgs:
+		devices = _pv_records(m, set([u]))
+		lvs = sorted(m.vg_lvs[u], key=lambda x: m.lvs[x]['name'])
+		groups.append([
+			report_rows('vg', [(m.vg_row(u), None)]),
+			report_rows('pv', [(m.pv_row(d), None) for d in devices]),
+			report_rows('lv', [(m.lv_row(l), None) for l in lvs]),
+			report_rows('pvseg', pvseg_records(devices)),
+			report_rows('seg', seg_records(lvs))])
+
+	if not args:
+		devices = _pv_records(m, set(['']))
+		groups.append([
+			report_rows('vg', []),
+			report_rows('pv', [(m.pv_row(d), None) for d in devices]),
+			report_rows('lv', []),
+			report_rows('pvseg', pvseg_records(devices)),
+			report_rows('seg', [])])
+
+	out.write(_json_output(groups))
+
+	if missing:
+		raise SimError('\n'.join(missing))
+
+
+# Commands which change things
+
+def _tags(opts, tags):
+	for t in _opt_all(opts, '--addtag'):
+		if t not in tags:
+			tags.append(t)
+	for t in _opt_all(opts, '--deltag'):
+		if t in tags:
+			tags.remove(t)
+	tags.sort()
+
+
+def _yn(value, what):
+	if value not in ('y', 'n'):
+		raise SimError('Invalid argument for %s: %s' % (what, value), 3)
+	return value == 'y'
+
+
+def cmd_pvcreate(m, opts, args, out):
+	for device in args:
+		if device not in m.devices:
+			raise SimError('Device %s not found.' % device)
+		if device in m.pvs and m.pvs[device]['vg']:
+			raise SimError(
+				"Can't initialize physical volume \"%s\" of volume group "
+				"\"%s\" without -ff" %
+				(device, m.vgs[m.pvs[device]['vg']]['name']))
+	for device in args:
+		m.pvs[device] = dict(uuid=_uuid(), vg='', tags=[], alloc=True)
+		out.write('  Physical volume "%s" successfully created.\n' % device)
+	m._index()
+	return True
+
+
+def cmd_pvremove(m, opts, args, out):
+	for device in args:
+		if m.pv(device)['vg']:
+			raise SimError(
+				'PV %s is used by a VG so please use vgreduce first.' % device)
+	for device in args:
+		del m.pvs[device]
+		out.write('  Labels on physical volume "%s" successfully wiped.\n' %
+					device)
+	m._index()
+	return True
+
+
+def cmd_pvchange(m, opts, args, out):
+	alloc = _opt(opts, '-x', '--allocatable')
+	for device in args:
+		p = m.pv(device)
+		_tags(opts, p['tags'])
+		if alloc is not None:
+			if not p['vg']:
+				raise SimError('Allocatability not supported by orphan lvm2 '
+								'format PV %s' % device)
+			p['alloc'] = _yn(alloc, '--allocatable')
+		if p['vg']:
+			m.changed(p['vg'])
+		out.write('  Physical volume "%s" changed\n' % device)
+	return True
+
+
+def cmd_pvresize(m, opts, args, out):
+	size = _opt(opts, '--setphysicalvolumesize')
+	for device in args:
+		p = m.pv(device)
+		if size is not None:
+			new_size = _size_arg(size)[1]
+			if p['vg']:
+				extent_size = m.vgs[p['vg']]['extent_size']
+				used = max([e for s, e, u in m.used[device]] or [-1]) + 1
+				if (new_size - PE_START) // extent_size < used:
+					raise SimError('%s: cannot resize to %d extents as '
+									'later ones are allocated.' %
+									(device, used))
+			m.devices[device] = new_size
+		if p['vg']:
+			m.changed(p['vg'])
+		out.write('  Physical volume "%s" changed\n' % device)
+	return True
+
+
+def cmd_pvscan(m, opts, args, out):
+	return False
+
+
+def cmd_vgcreate(m, opts, args, out):
+	if len(args) < 2:
+		raise SimError('Please enter a volume group name and physical volume'
+						'(s)', 3)
+	name, devices = args[0], args[1:]
+	if name in m.vg_by_name:
+		raise SimError('A volume group called %s already exists.' % name)
+	for device in devices:
+		if m.pv(device)['vg']:
+			raise SimError('Physical volume \'%s\' is already in volume group'
+							' \'%s\'' % (device, m.vgs[m.pvs[device]['vg']][
+								'name']))
+
+	extent_size = DEFAULT_EXTENT_SIZE
+	if _opt(opts, '-s', '--physicalextentsize'):
+		extent_size = _size_arg(_opt(opts, '-s', '--physicalextentsize'))[1]
+
+	vg_uuid = _uuid()
+	m.vgs[vg_uuid] = dict(name=name, extent_size=extent_size, seqno=1,
+							tags=[], pvs=list(devices), alloc='normal',
+							max_lv=0, max_pv=0)
+	_tags(opts, m.vgs[vg_uuid]['tags'])
+	for device in devices:
+		m.pvs[device]['vg'] = vg_uuid
+	m._index()
+	out.write('  Volume group "%s" successfully created\n' % name)
+	return True
+
+
+def cmd_vgremove(m, opts, args, out):
+	for name in args:
+		vg_uuid = m.vg(name)
+		for lv_uuid in m.vg_lvs[vg_uuid]:
+			del m.lvs[lv_uuid]
+		for device in m.vgs[vg_uuid]['pvs']:
+			m.pvs[device]['vg'] = ''
+			m.pvs[device]['alloc'] = True
+		del m.vgs[vg_uuid]
+		m._index()
+		out.write('  Volume group "%s" successfully removed\n' % name)
+	return True
+
+
+def cmd_vgrename(m, opts, args, out):
+	if len(args) != 2:
+		raise SimError('Old and new volume group names need specifying', 3)
+	vg_uuid = m.vg(args[0])
+	if args[1] in m.vg_by_name:
+		raise SimError('New volume group "%s" already exists' % args[1])
+	m.vgs[vg_uuid]['name'] = args[1]
+	m.changed(vg_uuid)
+	out.write('  Volume group "%s" successfully renamed to "%s"\n' %
+				(args[0], args[1]))
+	return True
+
+
+def cmd_vgextend(m, opts, args, out):
+	vg_uuid = m.vg(args[0])
+	for device in args[1:]:
+		if m.pv(device)['vg']:
+			raise SimError('Physical volume \'%s\' is already in volume group'
+							' \'%s\'' % (device, m.vgs[m.pvs[device]['vg']][
+								'name']))
+	for device in args[1:]:
+		m.pvs[device]['vg'] = vg_uuid
+		m.vgs[vg_uuid]['pvs'].append(device)
+	m.changed(vg_uuid)
+	out.write('  Volume group "%s" successfully extended\n' % args[0])
+	return True
+
+
+def cmd_vgreduce(m, opts, args, out):
+	vg_uuid = m.vg(args[0])
+	v = m.vgs[vg_uuid]
+	if _has(opts, '--all', '-a'):
+		devices = [d for d in v['pvs'] if not m.used[d]]
+	else:
+		devices = args[1:]
+
+	for device in devices:
+		if m.pv(device)['vg'] != vg_uuid:
+			raise SimError('Physical Volume "%s" not found in Volume Group '
+							'"%s".' % (device, v['name']))
+		if m.used[device]:
+			raise SimError('Physical volume "%s" still in use' % device)
+
+	for device in devices:
+		v['pvs'].remove(device)
+		m.pvs[device]['vg'] = ''
+		m.pvs[device]['alloc'] = True
+		out.write('  Removed "%s" from volume group "%s"\n' %
+					(device, v['name']))
+	m.changed(vg_uuid)
+	return True
+
+
+def cmd_vgchange(m, opts, args, out):
+	for name in args:
+		vg_uuid = m.vg(name)
+		v = m.vgs[vg_uuid]
+		_tags(opts, v['tags'])
+
+		if _opt(opts, '--alloc'):
+			v['alloc'] = _opt(opts, '--alloc')
+		if _opt(opts, '-p', '--maxphysicalvolumes') is not None:
+			v['max_pv'] = int(_opt(opts, '-p', '--maxphysicalvolumes'))
+		if _opt(opts, '-l') is not None:
+			v['max_lv'] = int(_opt(opts, '-l'))
+
+		activate = _opt(opts, '--activate')
+		if activate is not None:
+			active = activate.endswith('y')
+			for lv_uuid in m.vg_lvs[vg_uuid]:
+				m.lvs[lv_uuid]['active'] = active
+
+		if _has(opts, '--uuid'):
+			new_uuid = _uuid()
+			m.vgs[new_uuid] = m.vgs.pop(vg_uuid)
+			for device in v['pvs']:
+				m.pvs[device]['vg'] = new_uuid
+			for lv_uuid in m.vg_lvs[vg_uuid]:
+				m.lvs[lv_uuid]['vg'] = new_uuid
+			vg_uuid = new_uuid
+
+		m.changed(vg_uuid)
+		out.write('  Volume group "%s" successfully changed\n' % name)
+	return True
+
+
+def _extents(m, vg_uuid, size_bytes):
+	extent_size = m.vgs[vg_uuid]['extent_size']
+	return max(1, (size_bytes + extent_size - 1) // extent_size)
+
+
+def cmd_lvcreate(m, opts, args, out):
+	lv_type = _opt(opts, '--type')
+	if _has(opts, '-T', '--thin', '-V', '--virtualsize') or \
+			lv_type not in (None, 'linear', 'striped', 'snapshot'):
+		raise SimError('lvcreate: only linear and snapshot LVs are '
+						'simulated', 3)
+
+	if not args:
+		raise SimError('Please specify a volume group', 3)
+
+	name = _opt(opts, '-n', '--name')
+	size = _opt(opts, '-L', '--size')
+	extents = _opt(opts, '-l', '--extents')
+
+	origin = ''
+	if _has(opts, '-s', '--snapshot') or lv_type == 'snapshot':
+		origin = m.lv(args[0])
+		vg_uuid = m.lvs[origin]['vg']
+		if size is None:
+			raise SimError('lvcreate: thin snapshots are not simulated', 3)
+	else:
+		vg_uuid = m.vg(args[0])
+
+	if size is not None:
+		count = _extents(m, vg_uuid, _size_arg(size)[1])
+	elif extents is not None:
+		count = int(extents)
+	else:
+		raise SimError('Please specify either size or extents', 3)
+
+	if not name:
+		name = 'lvol%d' % len(m.vg_lvs[vg_uuid])
+	if (vg_uuid, name) in m.lv_by_name:
+		raise SimError('Logical Volume "%s" already exists in volume group '
+						'"%s"' % (name, m.vgs[vg_uuid]['name']))
+
+	segments = m.allocate(vg_uuid, count, args[1:])
+	l = dict(name=name, vg=vg_uuid, segments=segments, tags=[], active=True,
+				origin=origin)
+	_tags(opts, l['tags'])
+	m.lvs[_uuid()] = l
+	m.changed(vg_uuid)
+	out.write('  Logical volume "%s" created.\n' % name)
+	return True
+
+
+def cmd_lvremove(m, opts, args, out):
+	for full_name in args:
+		lv_uuid = m.lv(full_name)
+		vg_uuid = m.lvs[lv_uuid]['vg']
+		# Taking the origin away takes its snapshots with it
+		for u in [u for u in m.vg_lvs[vg_uuid]
+					if m.lvs[u]['origin'] == lv_uuid] + [lv_uuid]:
+			out.write('  Logical volume "%s" successfully removed\n' %
+						m.lvs[u]['name'])
+			del m.lvs[u]
+		m.changed(vg_uuid)
+	return True
+
+
+def cmd_lvrename(m, opts, args, out):
+	if len(args) != 2:
+		raise SimError('Old and new logical volume names required', 3)
+	lv_uuid = m.lv(args[0])
+	l = m.lvs[lv_uuid]
+	new_name = args[1].split('/')[-1]
+	if (l['vg'], new_name) in m.lv_by_name:
+		raise SimError('Logical Volume "%s" already exists in volume group '
+						'"%s"' % (new_name, m.vgs[l['vg']]['name']))
+	old_name = l['name']
+	l['name'] = new_name
+	m.changed(l['vg'])
+	out.write('  Renamed "%s" to "%s" in volume group "%s"\n' %
+				(old_name, new_name, m.vgs[l['vg']]['name']))
+	return True
+
+
+def cmd_lvresize(m, opts, args, out):
+	size = _opt(opts, '-L', '--size')
+	if size is None or not args:
+		raise SimError('Please specify either size or extents', 3)
+
+	lv_uuid = m.lv(args[0])
+	l = m.lvs[lv_uuid]
+	sign, size_bytes = _size_arg(size)
+	current = m.lv_extents(lv_uuid)
+	count = _extents(m, l['vg'], size_bytes)
+	if sign == '+':
+		target = current + count
+	elif sign == '-':
+		target = current - count
+	else:
+		target = count
+
+	if target < 1:
+		raise SimError('New size given (%d extents) not larger than existing '
+						'size' % target)
+
+	if target > current:
+		l['segments'].extend(m.allocate(l['vg'], target - current, args[1:]))
+	else:
+		remove = current - target
+		while remove:
+			d, s, e = l['segments'][-1]
+			if e - s + 1 <= remove:
+				l['segments'].pop()
+				remove -= e - s + 1
+			else:
+				l['segments'][-1] = [d, s, e - remove]
+				remove = 0
+
+	m.changed(l['vg'])
+	out.write('  Size of logical volume %s changed from %d extents to %d '
+				'extents.\n' % (m.full_name(lv_uuid), current, target))
+	out.write('  Logical volume %s successfully resized.\n' % l['name'])
+	return True
+
+
+def cmd_lvchange(m, opts, args, out):
+	activate = _opt(opts, '--activate')
+	for full_name in args:
+		lv_uuid = m.lv(full_name)
+		l = m.lvs[lv_uuid]
+		_tags(opts, l['tags'])
+		if activate is not None:
+			l['active'] = activate.endswith('y')
+		m.changed(l['vg'])
+		out.write('  Logical volume %s changed.\n' % m.full_name(lv_uuid))
+	return True
+
+
+def _version():
+	return tuple(int(x) for x in VERSION.split('.'))
+
+
+def cmd_version(m, opts, args, out):
+	out.write('  LVM version:     %s(2) (2016-09-28)\n'
+				'  Library version: 1.02.135 (2016-09-26)\n'
+				'  Driver version:  4.34.0\n' % VERSION)
+
+
+_REPORTS = dict(pvs=cmd_pvs, vgs=cmd_vgs, lvs=cmd_lvs,
+				fullreport=cmd_fullreport, version=cmd_version)
+
+_CHANGES = dict(
+	pvcreate=cmd_pvcreate, pvremove=cmd_pvremove, pvchange=cmd_pvchange,
+	pvresize=cmd_pvresize, pvscan=cmd_pvscan, vgcreate=cmd_vgcreate,
+	vgremove=cmd_vgremove, vgrename=cmd_vgrename, vgextend=cmd_vgextend,
+	vgreduce=cmd_vgreduce, vgchange=cmd_vgchange, lvcreate=cmd_lvcreate,
+	lvremove=cmd_lvremove, lvrename=cmd_lvrename, lvresize=cmd_lvresize,
+	lvextend=cmd_lvresize, lvreduce=cmd_lvresize, lvchange=cmd_lvchange)
+
+
+# lvcreate -s is --snapshot, for the VG commands it's the extent size
+_FLAGS = dict(lvcreate=('-s',))
+
+
+class State(object):
+	"""
+	The model in the state file, re-read only when someone else changed it
+	"""
+
+	def __init__(self, file_name):
+		self.file_name = file_name
+		self._lock_file = None
+		self._stamp = None
+		self.model = None
+
+	def _lock(self, exclusive):
+		if self._lock_file is None:
+			self._lock_file = open(self.file_name + '.lock', 'a')
+		fcntl.flock(self._lock_file,
+					fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+	def _unlock(self):
+		fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+	def _load(self):
+		try:
+			st = os.stat(self.file_name)
+		except OSError:
+			self.model = Model()
+			self._stamp = None
+			return
+
+		stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+		if stamp != self._stamp:
+			with open(self.file_name, 'r') as f:
+				self.model = Model(json.load(f))
+			self._stamp = stamp
+
+	def _save(self):
+		tmp = self.file_name + '.tmp'
+		with open(tmp, 'w') as f:
+			json.dump(self.model.data(), f)
+		os.rename(tmp, self.file_name)
+		st = os.stat(self.file_name)
+		self._stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+	def run(self, argv, out, err):
+		"""
+		Run one lvm command
+		:return: Exit code
+		"""
+		if not argv:
+			return 0
+
+		cmd = argv[0]
+		if LOG_FILE:
+			with open(LOG_FILE, 'a') as f:
+				f.write(cmd + '\n')
+
+		if cmd not in _REPORTS and cmd not in _CHANGES:
+			err.write('  No such command \'%s\'.  Try \'help\'.\n' % cmd)
+			return 3
+
+		exclusive = cmd in _CHANGES
+		self._lock(exclusive)
+		try:
+			self._load()
+			time.sleep(LATENCY + DEVICE_LATENCY * len(self.model.pvs))
+
+			opts, args = _parse_args(argv[1:], _FLAGS.get(cmd, ()))
+			try:
+				if exclusive:
+					if _CHANGES[cmd](self.model, opts, args, out):
+						self._save()
+				else:
+					_REPORTS[cmd](self.model, opts, args, out)
+			except SimError as e:
+				# Whatever a failing command did to the model is thrown away
+				if exclusive:
+					self._stamp = None
+				err.write('  %s\n' % str(e))
+				return e.rc
+			except (KeyError, ValueError, IndexError) as e:
+				if exclusive:
+					self._stamp = None
+				err.write('  %s: %s\n' % (cmd, repr(e)))
+				return 5
+		finally:
+			self._unlock()
+		return 0
+
+
+def shell(state):
+	"""
+	Read commands from stdin like the lvm shell, the prompt after each one
+	includes its exit code
+	"""
+	sys.stdout.write(SHELL_PROMPT)
+	sys.stdout.flush()
+
+	while True:
+		line = sys.stdin.readline()
+		if not line:
+			break
+
+		try:
+			argv = shlex.split(line)
+		except ValueError as e:
+			sys.stderr.write('  %s\n' % str(e))
+			argv = None
+			rc = 3
+
+		if argv and argv[0] in ('exit', 'quit'):
+			break
+
+		if argv is not None:
+			rc = state.run(argv, sys.stdout, sys.stderr)
+
+		sys.stderr.flush()
+		sys.stdout.write('[%d] %s' % (rc, SHELL_PROMPT))
+		sys.stdout.flush()
+	return 0
+
+
+def init(argv):
+	"""
+	Create a fresh model: the devices, some VGs made out of them and the
+	LVs spread over the VGs
+	"""
+	parser = argparse.ArgumentParser(prog='lvm_sim.py --sim-init')
+	parser.add_argument('--devices', type=int, default=64)
+	parser.add_argument('--device-size', type=int, default=1 << 40)
+	parser.add_argument('--vgs', type=int, default=4,
+						help='VGs to create, each gets an equal share of '
+						'the devices, the rest are left as orphan PVs')
+	parser.add_argument('--orphans', type=int, default=0,
+						help='Devices to leave as orphan PVs')
+	parser.add_argument('--lvs', type=int, default=1000)
+	parser.add_argument('--lv-extents', type=int, default=1)
+	args = parser.parse_args(argv)
+
+	m = Model()
+	devices = ['/dev/sim%05d' % i for i in range(0, args.devices)]
+	for d in devices:
+		m.devices[d] = args.device_size
+		m.pvs[d] = dict(uuid=_uuid(), vg='', tags=[], alloc=True)
+
+	in_vgs = devices[:len(devices) - args.orphans]
+	per_vg = len(in_vgs) // max(1, args.vgs)
+	vg_uuids = []
+	for i in range(0, args.vgs if per_vg else 0):
+		vg_uuid = _uuid()
+		members = in_vgs[i * per_vg:(i + 1) * per_vg]
+		m.vgs[vg_uuid] = dict(name='vg%d' % i,
+								extent_size=DEFAULT_EXTENT_SIZE, seqno=1,
+								tags=[], pvs=members, alloc='normal',
+								max_lv=0, max_pv=0)
+		for d in members:
+			m.pvs[d]['vg'] = vg_uuid
+		vg_uuids.append(vg_uuid)
+
+	# Hand out extents sequentially rather than searching for free space
+	next_extent = dict((d, 0) for d in devices)
+	for i in range(0, args.lvs if vg_uuids else 0):
+		vg_uuid = vg_uuids[i % len(vg_uuids)]
+		members = m.vgs[vg_uuid]['pvs']
+		d = members[(i // len(vg_uuids)) % len(members)]
+		start = next_extent[d]
+		next_extent[d] += args.lv_extents
+		if next_extent[d] > m.pe_count(d):
+			sys.stderr.write('Devices too small for %d LVs\n' % args.lvs)
+			return 1
+		m.lvs[_uuid()] = dict(name='lv_%07d' % i, vg=vg_uuid,
+								segments=[[d, start, next_extent[d] - 1]],
+								tags=[], active=True, origin='')
+
+	state = State(STATE_FILE)
+	state.model = m
+	state._lock(True)
+	try:
+		state._save()
+	finally:
+		state._unlock()
+
+	print('%s: %d devices, %d vgs, %d lvs' %
+			(STATE_FILE, len(m.devices), len(m.vgs), len(m.lvs)))
+	return 0
+
+
+def main(argv):
+	if argv and argv[0] == '--sim-init':
+		return init(argv[1:])
+
+	state = State(STATE_FILE)
+	if not argv:
+		return shell(state)
+	return state.run(argv, sys.stdout, sys.stderr)
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
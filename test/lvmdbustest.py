@@ -20,6 +20,7 @@ import functools
 import time
 import pyudev
 import os
+import fcntl
 import xml.etree.ElementTree as Et
 from collections import OrderedDict
 
@@ -38,6 +39,9 @@ CACHE_LV_INT = BUSNAME + ".CachedLv"
 
 THINPOOL_LV_PATH = '/' + THINPOOL_INT.replace('.', '/')
 
+# Where lvm keeps its file locks (global/locking_dir)
+LVM_LOCK_DIR = os.getenv('LVM_DBUS_TEST_LOCK_DIR', '/run/lock/lvm')
+
 
 def rs(length, suffix, character_set=string.ascii_lowercase):
 	return ''.join(random.choice(character_set)
@@ -327,6 +331,85 @@ class TestDbusService(unittest.TestCase):
 		rc = self._lookup('/dev/null')
 		self.assertTrue(rc == '/')
 
+	def test_get_statistics(self):
+		mgr = self._manager().Manager
+		before = mgr.GetStatistics()
+		self.assertEqual(self._refresh(), 0)
+		after = mgr.GetStatistics()
+
+		def refreshes(s):
+			return sum(h['count'] for h in s['refreshes'].values())
+
+		self.assertTrue(refreshes(after) > refreshes(before))
+		self.assertTrue(after['lvm_total_count'] > before['lvm_total_count'])
+		self.assertTrue(len(after['lvm_commands']) > 0)
+
+		for name, c in after['lvm_commands'].items():
+			for h in (c['wall_time'], c['lock_wait'], c['stdout_bytes']):
+				self.assertEqual(len(h['buckets']), len(h['bounds']) + 1)
+				self.assertEqual(sum(h['buckets']), h['count'])
+
+	def test_request_traces(self):
+		mgr = self._manager().Manager
+		self.assertEqual(self._refresh(), 0)
+		rc = mgr.GetRequestTraces()
+
+		refreshes = [t for t in rc['requests']
+						if t['method'] == 'Manager._refresh']
+		self.assertTrue(len(refreshes) > 0)
+
+		t = refreshes[-1]
+		self.assertTrue(t['enqueue'] <= t['dequeue'] <= t['reply'])
+		self.assertTrue(t['reply'] <= t['done'])
+		self.assertTrue(t['refreshes'] > 0)
+
+		m = rc['methods'][t['method']]
+		self.assertTrue(m['count'] > 0)
+		self.assertEqual(m['latency']['count'], m['count'])
+
+	def test_managed_objects_filtered(self):
+		vg = self._vg_create().Vg
+		lvs = []
+
+		for i in range(0, 3):
+			lvs.append(self._test_lv_create(
+				vg.LvCreateLinear,
+				(rs(8, '_lv'), 1024 * 1024 * 4, False, -1, {}),
+				vg))
+		lv_paths = sorted([l.object_path for l in lvs])
+
+		lvs[0].Lv.TagsAdd(['filtered'], -1, {})
+
+		mgr = self._manager().Manager
+
+		# The VG, it's PV(s) and LVs
+		objs, cursor = mgr.GetManagedObjectsFiltered({'vg': vg.Name}, '', 0)
+		self.assertEqual(len(objs), 1 + len(vg.Pvs) + len(lvs))
+		self.assertEqual(cursor, '')
+
+		objs, cursor = mgr.GetManagedObjectsFiltered(
+			{'vg': vg.object_path, 'interface': LV_INT}, '', 0)
+		self.assertEqual(sorted(objs.keys()), lv_paths)
+
+		objs, cursor = mgr.GetManagedObjectsFiltered(
+			{'tag': 'filtered'}, '', 0)
+		self.assertEqual(list(objs.keys()), [lvs[0].object_path])
+
+		objs, cursor = mgr.GetManagedObjectsFiltered({'name': vg.Name}, '', 0)
+		self.assertEqual(list(objs.keys()), [vg.object_path])
+
+		# Page through the LVs one at a time
+		found = []
+		cursor = ''
+		while True:
+			objs, cursor = mgr.GetManagedObjectsFiltered(
+				{'interface': LV_INT}, cursor, 1)
+			self.assertTrue(len(objs) <= 1)
+			found.extend(objs.keys())
+			if not cursor:
+				break
+		self.assertEqual(sorted(found), lv_paths)
+
 	def test_vg_extend(self):
 		# Create a VG
 		self.assertTrue(len(self.objs[PV_INT]) >= 2)
@@ -672,6 +755,28 @@ class TestDbusService(unittest.TestCase):
 				(rs(8, '_lv'), 1024 * 1024 * 4,
 				dbus.Array([[pv[0], 0, 100]], '(ott)'), -1, {}), vg)
 
+	def test_vg_free_extent_ranges(self):
+		vg = self._vg_create().Vg
+
+		ranges = vg.FreeExtentRanges()
+		self.assertTrue(len(ranges) > 0)
+		self.assertEqual(sum(r[2] - r[1] + 1 for r in ranges), vg.FreeCount)
+		for r in ranges:
+			self.assertTrue(r[0] in vg.Pvs)
+
+		# Use the start of the first run, which should then no longer be free
+		pv, start, end = ranges[0]
+		self._test_lv_create(vg.LvCreate,
+				(rs(8, '_lv'), vg.ExtentSizeBytes * 4,
+				dbus.Array([[pv, start, start + 3]], '(ott)'), -1, {}), vg)
+		vg.update()
+
+		ranges = vg.FreeExtentRanges()
+		self.assertEqual(sum(r[2] - r[1] + 1 for r in ranges), vg.FreeCount)
+		for r in ranges:
+			if r[0] == pv:
+				self.assertTrue(r[2] < start or r[1] > start + 3)
+
 	def test_lv_resize(self):
 
 		pv_paths = []
@@ -807,6 +912,87 @@ class TestDbusService(unittest.TestCase):
 
 		self._wait_for_job(vg_job)
 
+	@staticmethod
+	def _lock_vg(vg_name):
+		# Holding lvm's own lock on the VG makes the daemon's lvm commands
+		# for it wait, so requests queued behind them stay queued until the
+		# returned fd is closed
+		fd = os.open(os.path.join(LVM_LOCK_DIR, 'V_%s' % vg_name),
+						os.O_RDWR | os.O_CREAT, 0o600)
+		fcntl.flock(fd, fcntl.LOCK_EX)
+		return fd
+
+	def _wait_for_idle(self, mgr):
+		for i in range(0, 120):
+			s = mgr.GetStatistics()['requests']
+			if s['queue_depth'] == 0 and s['running'] == 0:
+				return s
+			time.sleep(0.5)
+		self.fail('Requests still outstanding')
+
+	def test_job_cancel(self):
+		vg = self._vg_create().Vg
+		names = [rs(8, '_lv') for i in range(0, 8)]
+		jobs = []
+
+		# Requests on a VG run one at a time, the first one can't get past
+		# lvm while we hold the lock so the last one is still queued
+		fd = self._lock_vg(vg.Name)
+		try:
+			for n in names:
+				jobs.append(vg.LvCreateLinear(
+					n, 1024 * 1024 * 4, False, 0, {})[1])
+
+			j = ClientProxy(self.bus, jobs[-1]).Job
+			j.Cancel()
+			j.update()
+			self.assertTrue(j.Complete)
+			self.assertTrue(j.GetError[0] != 0)
+			j.Remove()
+		finally:
+			os.close(fd)
+
+		for job in jobs[:-1]:
+			self._wait_for_job(job)
+
+		vg.update()
+		self.assertEqual(len(vg.Lvs), len(jobs) - 1)
+		self.assertEqual(self._lookup('%s/%s' % (vg.Name, names[-1])), '/')
+
+	def test_caller_gone(self):
+		vg = self._vg_create().Vg
+		mgr = self._manager().Manager
+		before = mgr.GetStatistics()['requests']['dropped']
+		num_lvs = 16
+
+		fd = self._lock_vg(vg.Name)
+		try:
+			# Queue up requests on a connection of its own and go away
+			# without waiting for them, all but the first one which may be
+			# stuck in lvm have to get dropped
+			conn = dbus.bus.BusConnection(dbus.bus.BUS_SYSTEM)
+			other = dbus.Interface(
+				conn.get_object(BUSNAME, vg.object_path), VG_INT)
+			for i in range(0, num_lvs):
+				other.LvCreateLinear(
+					rs(8, '_lv'), 1024 * 1024 * 4, False, -1, {},
+					ignore_reply=True)
+			conn.close()
+
+			for i in range(0, 120):
+				dropped = mgr.GetStatistics()['requests']['dropped'] - before
+				if dropped >= num_lvs - 1:
+					break
+				time.sleep(0.5)
+		finally:
+			os.close(fd)
+
+		dropped = self._wait_for_idle(mgr)['dropped'] - before
+		self.assertTrue(dropped >= num_lvs - 1)
+
+		vg.update()
+		self.assertEqual(len(vg.Lvs) + dropped, num_lvs)
+
 	def _test_expired_timer(self, num_lvs):
 		rc = False
 		pv_paths = []
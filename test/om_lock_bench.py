@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Measures object manager lookup latency while other threads are walking
+# the whole tree with GetManagedObjects, using the reader/writer lock and
+# a single recursive lock like the object manager used to have.  The objects
+# are never exported so no bus is needed.
+#
+# Usage: om_lock_bench.py [number of objects] [seconds]  (default 20000 5)
+
+import sys
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+								'..'))
+
+from lvmdbus import cfg, utils							# noqa
+from lvmdbus.objectmanager import ObjectManager, RwLock	# noqa
+from lvmdbus.automatedproperties import AutomatedProperties	# noqa
+from lvmdbus.state import State						# noqa
+
+BENCH_INTERFACE = cfg.BASE_INTERFACE + '.Bench'
+LOOKUP_THREADS = 4
+SCRAPE_THREADS = 2
+
+
+class BenchState(State):
+	def __init__(self, Uuid, Name, vg_uuid):
+		self.Uuid = Uuid
+		self.Name = Name
+		self.Tags = ['bench']
+		self.vg_uuid = vg_uuid
+
+	@property
+	def lvm_id(self):
+		return self.Name
+
+	def identifiers(self):
+		return (self.Uuid, self.lvm_id)
+
+	def create_dbus_object(self, path):
+		return BenchObject(path, self)
+
+	def containing_vg_uuid(self):
+		return self.vg_uuid
+
+
+@utils.dbus_property(BENCH_INTERFACE, 'Uuid', 's')
+@utils.dbus_property(BENCH_INTERFACE, 'Name', 's')
+@utils.dbus_property(BENCH_INTERFACE, 'Tags', 'as')
+class BenchObject(AutomatedProperties):
+	def __init__(self, object_path, object_state):
+		super(BenchObject, self).__init__(object_path)
+		self.set_interface(BENCH_INTERFACE)
+		self.state = object_state
+
+	@property
+	def lvm_id(self):
+		return self.state.lvm_id
+
+
+class SingleLock(object):
+	"""
+	What the object manager had before, everything behind one RLock
+	"""
+
+	def __init__(self):
+		self._lock = threading.RLock()
+
+	def acquire_write(self):
+		self._lock.acquire()
+
+	def release_write(self):
+		self._lock.release()
+
+	@contextmanager
+	def read_locked(self):
+		with self._lock:
+			yield
+
+	@contextmanager
+	def write_locked(self):
+		with self._lock:
+			yield
+
+
+def _populate(count):
+	om = ObjectManager(cfg.BASE_OBJ_PATH, cfg.BASE_INTERFACE)
+	ids = []
+	for i in range(0, count):
+		uuid = 'uuid-%08d' % i
+		name = 'vg%d/lv_%08d' % (i % 16, i)
+		path = '%s/Bench/%d' % (cfg.BASE_OBJ_PATH, i)
+		om.register_object(
+			BenchState(uuid, name, 'vg-uuid-%d' % (i % 16)).create_dbus_object(
+				path))
+		ids.append((uuid, name))
+	return om, ids
+
+
+def _percentile(values, pct):
+	return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def bench(om, ids, lock, duration, cached):
+	om.rwlock = lock
+	stop = threading.Event()
+	latencies = [[] for i in range(0, LOOKUP_THREADS)]
+	scrapes = [0]
+
+	def lookup(result):
+		rand = random.Random(len(result))
+		while not stop.is_set():
+			uuid, name = rand.choice(ids)
+			start = time.time()
+			path = om.get_object_path_by_lvm_id(uuid, name, gen_new=False)
+			om.get_object_by_path(path)
+			result.append(time.time() - start)
+
+	def scrape():
+		while not stop.is_set():
+			if not cached:
+				om._managed.clear()
+			om.GetManagedObjects()
+			scrapes[0] += 1
+
+	threads = [threading.Thread(target=lookup, args=(l,)) for l in latencies]
+	threads.extend(
+		threading.Thread(target=scrape) for i in range(0, SCRAPE_THREADS))
+	for t in threads:
+		t.start()
+	time.sleep(duration)
+	stop.set()
+	for t in threads:
+		t.join()
+
+	values = sorted(v for l in latencies for v in l)
+	return (len(values) / duration, scrapes[0] / duration,
+			_percentile(values, 50), _percentile(values, 99), values[-1])
+
+
+if __name__ == '__main__':
+	num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+	cfg.DEBUG = False
+	cfg.om, lvm_ids = _populate(num_objects)
+
+	print('%d objects, %d lookup threads, %d GetManagedObjects threads' %
+			(num_objects, LOOKUP_THREADS, SCRAPE_THREADS))
+	print('    %-26s %10s %10s %10s %10s %10s' %
+			('', 'lookups/s', 'scrapes/s', 'p50 ms', 'p99 ms', 'max ms'))
+
+	for c in (True, False):
+		for lock_name, lock_class in (('single lock', SingleLock),
+										('reader/writer', RwLock)):
+			r = bench(cfg.om, lvm_ids, lock_class(), seconds, c)
+			print('    %-26s %10d %10.1f %10.3f %10.3f %10.3f' %
+					('%s%s' % (lock_name, '' if c else ' (uncached)'),
+						r[0], r[1], r[2] * 1000, r[3] * 1000, r[4] * 1000))
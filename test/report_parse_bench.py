@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Compares the separator and json report parsers on synthetic 'lvs -a'
+# output, both the parse by itself and parse + DataStore._parse_lvs.  The
+# separator parser wins, which is why pvs/vgs/lvs use it and json is only
+# used for fullreport.
+#
+# Usage: report_parse_bench.py [number of lvs ...]  (default 10000 50000)
+
+import sys
+import os
+import time
+import json
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+								'..'))
+
+from lvmdbus import cmdhandler		# noqa
+from lvmdbus.lvmdb import DataStore	# noqa
+
+LV_COLUMNS = cmdhandler.LV_COLUMNS + cmdhandler.LV_SEG_COLUMNS
+
+ITERATIONS = 3
+
+
+def _rows(count):
+	vg_uuid = str(uuid.uuid4())
+	for i in range(0, count):
+		name = 'lv_%07d' % i
+		yield [str(uuid.uuid4()), name, '/dev/vg/%s' % name, '4194304',
+				'vg', '', '', '', '', '', '-wi-a-----', '', vg_uuid,
+				'active', '', '', '', 'public', 'linear',
+				'/dev/sdb:%d-%d' % (i, i), 'linear']
+
+
+def separator_output(rows):
+	sep = cmdhandler.SEP
+	return '\n'.join(
+		'  ' + sep.join(r) for r in rows) + '\n'
+
+
+def json_output(rows):
+	lines = ['  {', '      "report": [', '          {', '              "lv": [']
+	body = []
+	for r in rows:
+		body.append('                  ' +
+					json.dumps(dict(zip(LV_COLUMNS, r)), sort_keys=False,
+								separators=(', ', ':')))
+	lines.append(',\n'.join(body))
+	lines.extend(['              ]', '          }', '      ]', '  }'])
+	return '\n'.join(lines) + '\n'
+
+
+def _time(fn):
+	best = None
+	for i in range(0, ITERATIONS):
+		start = time.time()
+		fn()
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def bench(count):
+	rows = list(_rows(count))
+	sep_out = separator_output(rows)
+	json_out = json_output(rows)
+
+	# Make sure both give the same answer before we time them
+	assert cmdhandler.parse_column_names(sep_out, LV_COLUMNS) == \
+		cmdhandler.parse_json_column_names(json_out, LV_COLUMNS)
+
+	results = (
+		('separator parse',
+			lambda: cmdhandler.parse_column_names(sep_out, LV_COLUMNS)),
+		('json parse',
+			lambda: cmdhandler.parse_json_column_names(json_out, LV_COLUMNS)),
+		('separator parse + _parse_lvs',
+			lambda: DataStore._parse_lvs(
+				cmdhandler.parse_column_names(sep_out, LV_COLUMNS))),
+		('json parse + _parse_lvs',
+			lambda: DataStore._parse_lvs(
+				cmdhandler.parse_json_column_names(json_out, LV_COLUMNS))),
+	)
+
+	print('%d lvs (separator output %d bytes, json output %d bytes)' %
+			(count, len(sep_out), len(json_out)))
+	for name, fn in results:
+		print('    %-32s %8.3f s' % (name, _time(fn)))
+
+
+if __name__ == '__main__':
+	counts = [int(x) for x in sys.argv[1:]] or [10000, 50000]
+	for c in counts:
+		bench(c)
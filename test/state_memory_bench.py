@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Copyright (C) 2016 Red Hat, Inc. All rights reserved.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Measures the memory used by the object state and the dbus objects for a
+# synthetic system with lots of LVs.  The objects are never exported so no
+# bus or lvm is needed.
+#
+# Usage: state_memory_bench.py [number of lvs ...]  (default 10000 50000)
+
+import sys
+import os
+import gc
+import uuid
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+								'..'))
+
+from lvmdbus import cfg, cmdhandler						# noqa
+from lvmdbus.lvmdb import DataStore						# noqa
+from lvmdbus.objectmanager import ObjectManager			# noqa
+from lvmdbus.fetch import load								# noqa
+from lvmdbus.lv import lvs_state_retrieve					# noqa
+
+LVS_PER_PV = 100
+
+
+def _report(num_lvs):
+	"""
+	:return: (pvs, vgs, lvs) records like lvm would give us, one VG with
+			each LV having a segment on one of the PVs
+	"""
+	vg_uuid = str(uuid.uuid4())
+	num_pvs = num_lvs // LVS_PER_PV + 1
+
+	pvs = []
+	for i in range(0, num_pvs):
+		r = dict.fromkeys(cmdhandler.PV_COLUMNS, '0')
+		r.update(pv_name='/dev/sd%d' % i, pv_uuid=str(uuid.uuid4()),
+					pv_fmt='lvm2', pv_attr='a--', pv_tags='', vg_name='vg',
+					vg_uuid=vg_uuid, pv_seg_start='0',
+					pvseg_size=str(LVS_PER_PV), segtype='linear')
+		pvs.append(r)
+
+	vg = dict.fromkeys(cmdhandler.VG_COLUMNS, '0')
+	vg.update(vg_name='vg', vg_uuid=vg_uuid, vg_fmt='lvm2',
+				vg_attr='wz--n-', vg_tags='', vg_sysid='', vg_profile='',
+				pv_count=str(num_pvs), lv_count=str(num_lvs), vg_seqno='1')
+
+	lvs = []
+	for i in range(0, num_lvs):
+		name = 'lv_%07d' % i
+		r = dict.fromkeys(cmdhandler.LV_COLUMNS, '')
+		r.update(lv_uuid=str(uuid.uuid4()), lv_name=name,
+					lv_path='/dev/vg/%s' % name, lv_size='4194304',
+					vg_name='vg', vg_uuid=vg_uuid, lv_attr='-wi-a-----',
+					lv_active='active', lv_role='public', lv_layout='linear',
+					seg_pe_ranges='/dev/sd%d:%d-%d' % (
+						i // LVS_PER_PV, i % LVS_PER_PV, i % LVS_PER_PV),
+					segtype='linear')
+		lvs.append(r)
+
+	return pvs, [vg], lvs
+
+
+def _traced(fn):
+	gc.collect()
+	start = tracemalloc.get_traced_memory()[0]
+	result = fn()
+	gc.collect()
+	return result, tracemalloc.get_traced_memory()[0] - start
+
+
+def bench(num_lvs):
+	report = _report(num_lvs)
+
+	cfg.om = ObjectManager(cfg.BASE_OBJ_PATH, cfg.BASE_INTERFACE)
+	cfg.db = DataStore()
+	cfg.db._fetch = lambda *args: report
+
+	tracemalloc.start()
+	_, db_size = _traced(cfg.db.refresh)
+	_, load_size = _traced(
+		lambda: load(refresh=False, emit_signal=False, cache_refresh=False))
+	states, state_size = _traced(
+		lambda: lvs_state_retrieve(None, cache_refresh=False))
+	tracemalloc.stop()
+
+	print('%d lvs' % num_lvs)
+	print('    %-34s %10.1f MiB' % ('lvm data store', db_size / 1048576.0))
+	print('    %-34s %10.1f MiB %8d bytes/lv' %
+			('dbus objects + state', load_size / 1048576.0,
+				load_size / num_lvs))
+	print('    %-34s %10.1f MiB %8d bytes/lv' %
+			('lv state only', state_size / 1048576.0,
+				state_size / len(states)))
+
+
+if __name__ == '__main__':
+	cfg.DEBUG = False
+	counts = [int(x) for x in sys.argv[1:]] or [10000, 50000]
+	for c in counts:
+		bench(c)